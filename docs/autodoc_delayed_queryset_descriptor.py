@@ -1,6 +1,6 @@
-from django_delayed_union.base import DelayedQuerySetDescriptor
 from sphinx.ext.autodoc import AttributeDocumenter
 from sphinx.ext.autodoc import DocstringSignatureMixin
+from sphinx.util.docstrings import prepare_docstring
 
 
 class DelayedQuerySetDescriptorDocumenter(AttributeDocumenter):
@@ -10,7 +10,16 @@ class DelayedQuerySetDescriptorDocumenter(AttributeDocumenter):
 
     @classmethod
     def can_document_member(cls, member, membername, isattr, parent):
-        return isinstance(member, DelayedQuerySetDescriptor)
+        # The descriptors are replaced by generated methods and properties
+        # when the class is created, but they are kept in _descriptors.
+        descriptors = getattr(getattr(parent, 'object', None), '_descriptors', {})
+        return membername in descriptors
+
+    def get_doc(self, *args, **kwargs):
+        # The full docstrings are only built when they are needed for the
+        # documentation since they are expensive to compute.
+        descriptor = self.parent._descriptors[self.objpath[-1]]
+        return [prepare_docstring(descriptor.docstring)]
 
     def format_signature(self):
         return DocstringSignatureMixin.format_signature(self)
@@ -1,5 +1,8 @@
 from .difference import DelayedDifferenceQuerySet
+from .heterogeneous import DelayedHeterogeneousUnionQuerySet
 from .intersection import DelayedIntersectionQuerySet
+from .mixins import DelayedQuerySetMixin
+from .sharded import DelayedShardedUnionQuerySet
 from .union import DelayedUnionQuerySet
 
 __version__ = '0.1.7'
@@ -7,6 +10,9 @@ __version__ = '0.1.7'
 __all__ = [
     '__version__',
     'DelayedDifferenceQuerySet',
+    'DelayedHeterogeneousUnionQuerySet',
     'DelayedIntersectionQuerySet',
+    'DelayedQuerySetMixin',
+    'DelayedShardedUnionQuerySet',
     'DelayedUnionQuerySet',
 ]
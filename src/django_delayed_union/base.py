@@ -1,10 +1,48 @@
 import abc
 import inspect
-from functools import partial
-
+import itertools
+from types import FunctionType
+
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.db import connections
+from django.db.models import Exists
+from django.db.models import OuterRef
+from django.db.models import Q
 from django.db.models import QuerySet
-
+from django.utils.functional import cached_property
+
+from .counting import get_cached_count
+from .counting import get_estimated_count
+from .counting import set_cached_count
+from .expressions import factor_in_lookups
+from .frozen import FrozenDelayedQuerySet
+from .hints import add_hints
+from .materialize import INSERT_BATCH_SIZE
+from .materialize import materialize_queryset
+from .memo import call_memoized
+from .memo import fetch_memoized
+from .routing import get_read_db
+from .routing import pin
+from .routing import route_for_read
+from .streaming import chunked
+from .streaming import execute_chunks
+from .streaming import get_column_names
+from .streaming import to_columns
 from .utils import get_formatted_function_signature
+from .utils import get_hidden_columns_iterable
+from .utils import get_ordering_annotations
+from .utils import get_ordering_key
+from .utils import get_queryset_from_state
+from .utils import get_queryset_state
+
+#: The strategy which :meth:`DelayedQuerySet.resolve_expression` uses for
+#: each database vendor.  The others use ``'projection'``.  MySQL plans
+#: compound subqueries poorly, so ``EXISTS`` subqueries are used instead.
+SEMI_JOIN_STRATEGIES = {'mysql': 'exists'}
+
+#: The name of the annotation for the ``EXISTS`` subquery for each component
+#: queryset.
+EXISTS_ALIAS = 'delayed_union_exists_{}'
 
 
 class DelayedQuerySetDescriptor(abc.ABC):
@@ -25,8 +63,28 @@ class DelayedQuerySetDescriptor(abc.ABC):
         :param str name: the name of the descriptor
         """
         self.name = name
-        if name is not None:
-            self.__doc__ = self.get_docstring()
+        self.__dict__.pop('docstring', None)
+
+    @cached_property
+    def docstring(self):
+        """
+        The full docstring for this descriptor as returned by
+        :meth:`get_docstring`.
+
+        This is computed lazily since inspecting the corresponding methods
+        on :class:`django.db.models.QuerySet` for every descriptor would
+        slow down the creation of each :class:`DelayedQuerySet` subclass.
+        It is used when building the documentation with Sphinx.
+        """
+        return self.get_docstring()
+
+    @abc.abstractmethod
+    def make_attribute(self):
+        """
+        Returns the attribute (such as a function or a property) which
+        :class:`DelayedQuerySetBase` puts on the class in place of this
+        descriptor.
+        """
 
     @abc.abstractmethod
     def get_base_docstring(self):
@@ -35,6 +93,14 @@ class DelayedQuerySetDescriptor(abc.ABC):
         the corresponding method on :class:`django.db.models.QuerySet`.
         """
 
+    def get_short_docstring(self):
+        """
+        Returns the docstring from :meth:`get_base_docstring` with the
+        name of this descriptor filled in.  This is cheap to compute, so it
+        is used for the attributes generated by :meth:`make_attribute`.
+        """
+        return self.get_base_docstring().strip().format(name=self.name)
+
     def get_docstring(self):
         """
         Returns a docstring for this descriptor based on the corresponding
@@ -60,28 +126,47 @@ class DelayedQuerySetDescriptor(abc.ABC):
 
 class DelayedQuerySetMethod(DelayedQuerySetDescriptor):
     """
-    A descriptor which acts like a method on a class.  When accessed
-    as an attribute on *obj*, it returns its ``__call__`` method with
-    *obj* being passed in as the first argument.
+    A descriptor which acts like a method on a class.  When the class is
+    created, :class:`DelayedQuerySetBase` replaces it with the function
+    returned by :meth:`make_method` so that there is no descriptor
+    overhead when the method is accessed.
     """
-    def __get__(self, obj, cls=None):
-        if obj is None:
-            return self
-        return partial(self.__call__, obj)
+    def make_method(self):
+        """
+        Returns a function which takes the :class:`DelayedQuerySet` as its
+        first argument.  By default, this calls ``__call__`` on the
+        descriptor, but subclasses should return a specialized function
+        where possible.
+        """
+        call = self.__call__
+
+        def method(obj, *args, **kwargs):
+            return call(obj, *args, **kwargs)
+        return method
+
+    def make_attribute(self):
+        method = self.make_method()
+        method.__name__ = self.name
+        method.__doc__ = self.get_short_docstring()
+        return method
 
 
 class PostApplyMethod(DelayedQuerySetMethod):
     """
-    When this descriptor is called, it runs :meth:`DelayedQuerySet._apply`
+    When this method is called, it runs :meth:`DelayedQuerySet._apply`
     first, and then calls the corresponding method on that result of
     that operation.
 
     For example, with a :class:`DelayedUnionQuerySet`, when we call
-    ``count()`` on it, then this descriptor will first take the union
+    ``count()`` on it, then this method will first take the union
     of its component querysets and then call ``.count()`` on the result.
     """
-    def __call__(self, obj, *args, **kwargs):
-        return getattr(obj._apply(), self.name)(*args, **kwargs)
+    def make_method(self):
+        name = self.name
+
+        def method(obj, *args, **kwargs):
+            return getattr(obj._apply(), name)(*args, **kwargs)
+        return method
 
     def get_base_docstring(self):
         return """
@@ -90,32 +175,65 @@ class PostApplyMethod(DelayedQuerySetMethod):
         """
 
 
+class MemoizedFetchPostApplyMethod(PostApplyMethod):
+    """
+    A :class:`PostApplyMethod` for the methods which fetch all of the rows,
+    such as ``__iter__``.  Inside :func:`~django_delayed_union.memo.memoize`,
+    the rows are shared with the other evaluations of the same query.
+    """
+    def make_method(self):
+        name = self.name
+
+        def method(obj, *args, **kwargs):
+            applied = obj._apply()
+            fetch_memoized(applied)
+            return getattr(applied, name)(*args, **kwargs)
+        return method
+
+
+class MemoizedPostApplyMethod(PostApplyMethod):
+    """
+    A :class:`PostApplyMethod` whose result is shared with the other calls
+    with the same query inside :func:`~django_delayed_union.memo.memoize`.
+    """
+    def make_method(self):
+        name = self.name
+
+        def method(obj, *args):
+            return call_memoized(obj._apply(), name, *args)
+        return method
+
+
 class PostApplyProperty(DelayedQuerySetDescriptor):
     """
-    When this descriptor is called, it runs :meth:`DelayedQuerySet._apply`
+    When this property is accessed, it runs :meth:`DelayedQuerySet._apply`
     first, and then returns the corresponding property on the result of
     that operation.
 
     For example, with a :class:`DelayedUnionQuerySet`, when we access
-    ``db`` on it, then this descriptor will first take the union
+    ``db`` on it, then this property will first take the union
     of its component querysets and then return the ``db`` property on the
     result.
     """
-    def __get__(self, obj, cls=None):
-        if obj is None:
-            return self
-        return getattr(obj._apply(), self.name)
+    def make_attribute(self):
+        name = self.name
 
-    def __set__(self, obj, value):
-        return setattr(obj._apply(), self.name, value)
+        def fget(obj):
+            return getattr(obj._apply(), name)
+
+        def fset(obj, value):
+            setattr(obj._apply(), name, value)
+        return property(fget, fset, doc=self.get_short_docstring())
 
     def get_base_docstring(self):
-        return ""
+        return """
+        Returns ``{name}`` after having applied the delayed operation.
+        """
 
 
 class PassthroughMethod(DelayedQuerySetMethod):
     """
-    When this descriptor is called, it calls the corresponding operation
+    When this method is called, it calls the corresponding operation
     on all of the component querysets and then returns a clone of *obj*
     with those querysets.
 
@@ -124,10 +242,14 @@ class PassthroughMethod(DelayedQuerySetMethod):
     querysets and then returns a :class:`DelayedUnionQuerySet` using
     those.
     """
-    def __call__(self, obj, *args, **kwargs):
-        return obj._clone([
-            getattr(qs, self.name)(*args, **kwargs) for qs in obj._querysets
-        ])
+    def make_method(self):
+        name = self.name
+
+        def method(obj, *args, **kwargs):
+            return obj._clone([
+                getattr(qs, name)(*args, **kwargs) for qs in obj._querysets
+            ])
+        return method
 
     def get_base_docstring(self):
         return """
@@ -136,9 +258,28 @@ class PassthroughMethod(DelayedQuerySetMethod):
         """
 
 
+class FilterPassthroughMethod(PassthroughMethod):
+    """
+    A :class:`PassthroughMethod` for ``filter()`` and ``exclude()`` where
+    the ``__in`` lookups with many values are sent to the database as a
+    single parameter for each component queryset.  See
+    :class:`~django_delayed_union.expressions.ValueList`.
+    """
+    def make_method(self):
+        name = self.name
+
+        def method(obj, *args, **kwargs):
+            querysets = []
+            for qs in obj._querysets:
+                qs_args, qs_kwargs = factor_in_lookups(qs, args, kwargs)
+                querysets.append(getattr(qs, name)(*qs_args, **qs_kwargs))
+            return obj._clone(querysets)
+        return method
+
+
 class FirstQuerySetPassthroughMethod(DelayedQuerySetMethod):
     """
-    When this descriptor is called, returns a :class:`DelayedQuerySet`
+    When this method is called, returns a :class:`DelayedQuerySet`
     where the corresponding method has been applied to just the first
     component queryset.
 
@@ -147,11 +288,15 @@ class FirstQuerySetPassthroughMethod(DelayedQuerySetMethod):
     on the first queryset.  After the union is applied, then Django will
     use the prefetches from just that first queryset.
     """
-    def __call__(self, obj, *args, **kwargs):
-        querysets = (
-            getattr(obj._querysets[0], self.name)(*args, **kwargs),
-        ) + obj._querysets[1:]
-        return obj._clone(querysets)
+    def make_method(self):
+        name = self.name
+
+        def method(obj, *args, **kwargs):
+            querysets = (
+                getattr(obj._querysets[0], name)(*args, **kwargs),
+            ) + obj._querysets[1:]
+            return obj._clone(querysets)
+        return method
 
     def get_base_docstring(self):
         return """
@@ -162,11 +307,15 @@ class FirstQuerySetPassthroughMethod(DelayedQuerySetMethod):
 
 class FirstQuerySetMethod(DelayedQuerySetMethod):
     """
-    When this descriptor is called, returns the result when calling the
+    When this method is called, returns the result when calling the
     corresponding method on the first queryset.
     """
-    def __call__(self, obj, *args, **kwargs):
-        return getattr(obj._querysets[0], self.name)(*args, **kwargs)
+    def make_method(self):
+        name = self.name
+
+        def method(obj, *args, **kwargs):
+            return getattr(obj._querysets[0], name)(*args, **kwargs)
+        return method
 
     def get_base_docstring(self):
         return """
@@ -175,12 +324,30 @@ class FirstQuerySetMethod(DelayedQuerySetMethod):
         """
 
 
+class FirstQuerySetWriteMethod(FirstQuerySetMethod):
+    """
+    A :class:`FirstQuerySetMethod` for the methods which write to the
+    database.  Afterwards, the reads of the model are sent to the database
+    for writes inside :func:`~django_delayed_union.routing.read_your_writes`.
+    """
+    def make_method(self):
+        name = self.name
+
+        def method(obj, *args, **kwargs):
+            result = getattr(obj._querysets[0], name)(*args, **kwargs)
+            pin(obj.model)
+            return result
+        return method
+
+
 class NotImplementedMethod(DelayedQuerySetMethod):
     """
-    A descriptor which raises a :class:`NotImplementedError` when called.
+    A method which raises a :class:`NotImplementedError` when called.
     """
-    def __call__(self, obj, *args, **kwargs):
-        raise NotImplementedError()
+    def make_method(self):
+        def method(obj, *args, **kwargs):
+            raise NotImplementedError()
+        return method
 
     def get_base_docstring(self):
         return """
@@ -189,28 +356,79 @@ class NotImplementedMethod(DelayedQuerySetMethod):
 
 
 class CountPostApplyMethod(PostApplyMethod):
-    def __call__(self, obj, *args, **kwargs):
-        # We make sure there are no select_related calls before calling
-        # count to ensure we don't get an error on MySQL when doing
-        # SELECT COUNT(*) from subquery where there are multiple columns
-        # with the same name in subquery.
-        if obj._result_cache is not None:
-            return len(obj._result_cache)
+    def make_method(self):
+        def method(obj, approximate=False, cache_timeout=None,
+                   cache_alias=DEFAULT_CACHE_ALIAS):
+            if obj._result_cache is not None:
+                return len(obj._result_cache)
+
+            if approximate:
+                estimate = obj._estimate_count()
+                if estimate is not None:
+                    return estimate
+
+            if cache_timeout is not None:
+                cached = get_cached_count(obj, cache_alias)
+                if cached is not None:
+                    return cached
+
+            # We make sure there are no select_related calls before calling
+            # count to ensure we don't get an error on MySQL when doing
+            # SELECT COUNT(*) from subquery where there are multiple columns
+            # with the same name in subquery.
+            counted = obj
+            if any(qs.query.select_related for qs in obj._querysets):
+                counted = obj.select_related(None)
+            result = call_memoized(counted._apply(), 'count')
+
+            if cache_timeout is not None:
+                set_cached_count(obj, result, cache_timeout, cache_alias)
+            return result
+        return method
 
-        obj = obj.select_related(None)
-        return super(CountPostApplyMethod, self).__call__(obj, *args, **kwargs)
+    def get_base_docstring(self):
+        return """
+        Returns the number of rows.  The delayed operation is applied
+        first, as with :class:`PostApplyMethod`.
+
+        :param bool approximate: if True, returns the query planner's
+           estimate of the number of rows on backends which provide one
+           (PostgreSQL and MySQL), and the exact count otherwise
+        :param cache_timeout: if not ``None``, the exact count is cached for
+           this many seconds in the cache *cache_alias*.  The cached counts
+           are invalidated when an instance of a component model is saved or
+           deleted.
+        """
 
 
 class DelayedQuerySetBase(abc.ABCMeta):
     """
     This is the metaclass for :`DelayedQuerySet`.  It's purpose is to make
     sure that the names are set for all :class:`DelayedQuerySetDescriptor`
-    instances in the class.
+    instances in the class, and to replace each of them with the method or
+    property that it generates.  The descriptors are kept in the
+    ``_descriptors`` dictionary on the class.
     """
     def __new__(cls, name, bases, attrs):
-        for key, value in attrs.items():
+        descriptors = {}
+        for base in reversed(bases):
+            descriptors.update(getattr(base, '_descriptors', {}))
+
+        for key, value in list(attrs.items()):
+            descriptors.pop(key, None)
             if isinstance(value, DelayedQuerySetDescriptor):
                 value.set_name(key)
+                attribute = value.make_attribute()
+                if isinstance(attribute, FunctionType):
+                    attribute.__module__ = attrs.get('__module__')
+                    attribute.__qualname__ = '{}.{}'.format(
+                        attrs.get('__qualname__', name),
+                        key
+                    )
+                attrs[key] = attribute
+                descriptors[key] = value
+
+        attrs['_descriptors'] = descriptors
         return super(DelayedQuerySetBase, cls).__new__(cls, name, bases, attrs)
 
 
@@ -233,6 +451,18 @@ class DelayedQuerySet(metaclass=DelayedQuerySetBase):
     Subclasses need to implement the :meth:`_apply_operation`, which performs
     the operation such as ``.union()`` that is being delayed.
     """
+    __slots__ = (
+        '_querysets',
+        '_kwargs',
+        '_order_by',
+        '_standard_ordering',
+        '_applied',
+    )
+
+    #: The attributes which are copied by :meth:`_clone` and when pickling.
+    #: Subclasses which add state should extend this.
+    _clone_attrs = ('_order_by', '_standard_ordering')
+
     def __init__(self, *querysets, **kwargs):
         """
         :param tuple querysets: the component querysets
@@ -262,8 +492,20 @@ class DelayedQuerySet(metaclass=DelayedQuerySetBase):
         if self._applied is not None:
             return self._applied
 
-        qs = self._apply_operation().order_by(*self._order_by)
+        annotations, ordering = get_ordering_annotations(self._order_by)
+        delayed = self
+        if annotations:
+            delayed = self._clone(querysets=[
+                qs.annotate(**annotations) for qs in self._querysets
+            ])
+
+        qs = route_for_read(delayed._apply_operation().order_by(*ordering))
         qs.query.standard_ordering = self._standard_ordering
+        if annotations:
+            qs._iterable_class = get_hidden_columns_iterable(
+                qs._iterable_class,
+                annotations
+            )
 
         self._applied = qs
         return self._applied
@@ -300,20 +542,61 @@ class DelayedQuerySet(metaclass=DelayedQuerySetBase):
         if querysets is None:
             querysets = [qs._clone() for qs in self._querysets]
         clone = type(self)(*querysets, **self._kwargs)
-        clone._order_by = self._order_by
-        clone._standard_ordering = self._standard_ordering
+        for attr in self._clone_attrs:
+            setattr(clone, attr, getattr(self, attr))
         return clone
 
+    def __deepcopy__(self, memo):
+        """
+        Returns a clone of this :class:`DelayedQuerySet`.  As with
+        :meth:`django.db.models.QuerySet.__deepcopy__`, the result cache
+        is not copied, and the component querysets are cloned without being
+        evaluated.
+        """
+        clone = self._clone()
+        memo[id(self)] = clone
+        return clone
+
+    def __getstate__(self):
+        """
+        Returns the state used to pickle this :class:`DelayedQuerySet`.
+        Unlike :meth:`django.db.models.QuerySet.__getstate__`, this does not
+        evaluate the queryset; the results are only included if they have
+        already been fetched.
+        """
+        result_cache = None
+        if self._applied is not None:
+            result_cache = self._applied._result_cache
+        state = {
+            'querysets': [get_queryset_state(qs) for qs in self._querysets],
+            'kwargs': self._kwargs,
+            'result_cache': result_cache,
+        }
+        for attr in self._clone_attrs:
+            state[attr] = getattr(self, attr)
+        return state
+
+    def __setstate__(self, state):
+        self._querysets = tuple(
+            get_queryset_from_state(qs_state)
+            for qs_state in state['querysets']
+        )
+        self._kwargs = state['kwargs']
+        for attr in self._clone_attrs:
+            setattr(self, attr, state[attr])
+        self._applied = None
+        if state['result_cache'] is not None:
+            applied = self._apply()
+            applied._result_cache = state['result_cache']
+            applied._prefetch_done = True
+
     __repr__ = PostApplyMethod()
-    __len__ = PostApplyMethod()
-    __iter__ = PostApplyMethod()
-    __bool__ = PostApplyMethod()
+    __len__ = MemoizedFetchPostApplyMethod()
+    __iter__ = MemoizedFetchPostApplyMethod()
+    __bool__ = MemoizedFetchPostApplyMethod()
     __nonzero__ = PostApplyMethod()
     __getitem__ = PostApplyMethod()
 
-    __deepcopy__ = NotImplementedMethod()
-    __getstate__ = NotImplementedMethod()
-    __setstate__ = NotImplementedMethod()
     __and__ = NotImplementedMethod()
     __or__ = NotImplementedMethod()
 
@@ -329,21 +612,20 @@ class DelayedQuerySet(metaclass=DelayedQuerySetBase):
     count = CountPostApplyMethod()
     earliest = PostApplyMethod()
     latest = PostApplyMethod()
-    first = PostApplyMethod()
+    first = MemoizedPostApplyMethod()
     last = PostApplyMethod()
     delete = PostApplyMethod()
-    exists = PostApplyMethod()
+    exists = MemoizedPostApplyMethod()
     contains = PostApplyMethod()
     none = PassthroughMethod()
     raw = PostApplyMethod()
     explain = PostApplyMethod()
-    resolve_expression = PostApplyMethod()
 
     db = PostApplyProperty()
 
     all = PassthroughMethod()
-    filter = PassthroughMethod()
-    exclude = PassthroughMethod()
+    filter = FilterPassthroughMethod()
+    exclude = FilterPassthroughMethod()
     values = PassthroughMethod()
     values_list = PassthroughMethod()
     annotate = PassthroughMethod()
@@ -358,9 +640,9 @@ class DelayedQuerySet(metaclass=DelayedQuerySetBase):
     prefetch_related = FirstQuerySetPassthroughMethod()
     as_manager = FirstQuerySetPassthroughMethod()
 
-    create = FirstQuerySetMethod()
-    bulk_create = FirstQuerySetMethod()
-    bulk_update = FirstQuerySetMethod()
+    create = FirstQuerySetWriteMethod()
+    bulk_create = FirstQuerySetWriteMethod()
+    bulk_update = FirstQuerySetWriteMethod()
 
     # These are left as not implemented at the moment.
     # We explicity put it here so that it is obvious to
@@ -375,11 +657,6 @@ class DelayedQuerySet(metaclass=DelayedQuerySetBase):
     get_or_create = NotImplementedMethod()
     update_or_create = NotImplementedMethod()
 
-    # These rely on sorting on an annotated field which is not available
-    # once the union is applied
-    dates = NotImplementedMethod()
-    datetimes = NotImplementedMethod()
-
     def get(self, *args, **kwargs):
         """
         Performs the query and returns a single object matching the given
@@ -417,6 +694,12 @@ class DelayedQuerySet(metaclass=DelayedQuerySetBase):
            We need to have a custom implementation for this because we
            want to change the ordering of the final queryset, not just
            the ordering within each component queryset.
+
+           Expressions such as ``F('name').desc(nulls_last=True)`` or
+           ``Lower('name')`` are added as annotations to each component
+           queryset so that the final queryset can be ordered by the
+           corresponding column.  These annotations are not included in
+           the results.
         """
         qs = self._clone()
         qs._order_by = field_names
@@ -459,3 +742,269 @@ class DelayedQuerySet(metaclass=DelayedQuerySetBase):
         else:
             qs = self._clone()
         return {obj._get_pk_val(): obj for obj in qs}
+
+    def dates(self, field_name, kind, order='ASC'):
+        """
+        Returns a list of the distinct dates (truncated to *kind*) of the
+        field *field_name* in this :class:`DelayedQuerySet`, sorted in
+        *order*.  See :meth:`django.db.models.QuerySet.dates`.
+
+        .. note::
+
+           Unlike :meth:`django.db.models.QuerySet.dates`, this is evaluated
+           immediately and returns a list.
+        """
+        return self._get_truncated_dates(
+            'dates',
+            field_name,
+            kind,
+            order=order
+        )
+
+    def datetimes(self, field_name, kind, order='ASC', **kwargs):
+        """
+        Returns a list of the distinct datetimes (truncated to *kind*) of
+        the field *field_name* in this :class:`DelayedQuerySet`, sorted in
+        *order*.  Any other keyword arguments (such as *tzinfo*) are passed
+        through to :meth:`django.db.models.QuerySet.datetimes`.
+
+        .. note::
+
+           Unlike :meth:`django.db.models.QuerySet.datetimes`, this is
+           evaluated immediately and returns a list.
+        """
+        return self._get_truncated_dates(
+            'datetimes',
+            field_name,
+            kind,
+            order=order,
+            **kwargs
+        )
+
+    def _estimate_count(self):
+        """
+        Returns the query planner's estimate of the number of rows in this
+        :class:`DelayedQuerySet`, or ``None`` if there is no estimate.
+        """
+        queryset = self._apply()
+        if not isinstance(queryset, QuerySet):
+            return None
+        return get_estimated_count(queryset)
+
+    def _get_truncated_dates(self, method, *args, **kwargs):
+        """
+        Returns a list of the results of calling the
+        :class:`django.db.models.QuerySet` method *method* (``'dates'`` or
+        ``'datetimes'``) with the given arguments on the queryset from
+        :meth:`_get_pk_filtered_queryset`.
+        """
+        queryset = self._get_pk_filtered_queryset()
+        return list(getattr(queryset, method)(*args, **kwargs))
+
+    def _get_pk_filtered_queryset(self):
+        """
+        Returns a :class:`django.db.models.QuerySet` for the rows of this
+        :class:`DelayedQuerySet` which filters the first component queryset
+        with a primary key subquery for each of the others.  This is used
+        for operations which cannot be run on the combined query.
+        """
+        raise NotImplementedError(
+            '{} does not support primary key subqueries'.format(
+                type(self).__name__
+            )
+        )
+
+    def freeze(self):
+        """
+        Returns a :class:`~django_delayed_union.frozen.FrozenDelayedQuerySet`
+        with the current state of this :class:`DelayedQuerySet`, which can be
+        shared between threads and requests.  The combined query is built
+        once.
+        """
+        return FrozenDelayedQuerySet(self)
+
+    def materialize(self, batch_size=INSERT_BATCH_SIZE):
+        """
+        Returns a context manager which writes the primary keys of the rows
+        of this :class:`DelayedQuerySet`, in order, into a temporary table
+        once, and returns a :class:`django.db.models.QuerySet` which reads
+        the rows from that table::
+
+            >>> with qs.order_by('-created').materialize() as materialized:
+            ...     for page in range(10):
+            ...         export(materialized[page * 100:(page + 1) * 100])
+
+        Slicing, ``count()``, and filters on the returned queryset join with
+        the temporary table rather than applying the delayed operation again.
+        The table is dropped when the context manager exits.
+
+        .. note::
+
+           The returned queryset yields instances of :attr:`model` with the
+           ``select_related()`` and ``prefetch_related()`` of the first
+           component queryset.  Other annotations and ``values()`` are not
+           kept.  The rows are read and the table is created on the
+           database for writes rather than on a read replica.
+
+        :param int batch_size: the number of rows inserted with each
+           statement
+        """
+        return materialize_queryset(self, batch_size)
+
+    def hint(self, index, *hints):
+        """
+        Returns a new :class:`DelayedQuerySet` where *hints* are added to the
+        component queryset at *index*, such as to choose the index which
+        each component queryset uses on MySQL::
+
+            >>> from django_delayed_union.hints import ForceIndex
+            >>> qs.hint(0, ForceIndex('auth_user_is_staff')).hint(
+            ...     1, OptimizerHint('NO_RANGE_OPTIMIZATION(auth_user)')
+            ... )
+
+        The hints are kept by later calls such as ``filter()``.  See
+        :func:`django_delayed_union.hints.add_hints`.
+
+        :param int index: the index of the component queryset
+        :param hints: instances of
+           :class:`~django_delayed_union.hints.IndexHint` or
+           :class:`~django_delayed_union.hints.OptimizerHint`
+        """
+        querysets = list(self._querysets)
+        querysets[index] = add_hints(querysets[index], *hints)
+        return self._clone(querysets=querysets)
+
+    def resolve_expression(self, *args, **kwargs):
+        """
+        Resolves this :class:`DelayedQuerySet` as a subquery, such as in
+        ``Other.objects.filter(user__in=delayed_queryset)``.  Unless
+        ``values()`` or ``values_list()`` has been used, the subquery only
+        selects primary keys with the strategy in
+        :data:`SEMI_JOIN_STRATEGIES` for the database:
+
+        * ``'projection'``: the operation is applied to the primary keys
+          of the component querysets rather than to the full rows
+        * ``'exists'``: the component querysets are combined with an
+          ``EXISTS`` subquery for each of them, such as an ``OR`` of them
+          for a union, which avoids a compound subquery
+        """
+        return self._get_semi_join_queryset().resolve_expression(*args, **kwargs)
+
+    def _get_semi_join_queryset(self):
+        """
+        Returns the :class:`django.db.models.QuerySet` which is used by
+        :meth:`resolve_expression`.
+        """
+        queryset = self._apply()
+        if not isinstance(queryset, QuerySet) or queryset._fields:
+            return queryset
+
+        db = get_read_db(self._querysets[0])
+        strategy = SEMI_JOIN_STRATEGIES.get(connections[db].vendor, 'projection')
+        if strategy == 'projection':
+            return self._get_pk_projection()
+
+        names = []
+        annotations = {}
+        for index, qs in enumerate(self._querysets):
+            name = EXISTS_ALIAS.format(index)
+            names.append(name)
+            annotations[name] = Exists(
+                qs.order_by().filter(pk=OuterRef('pk')).values('pk')
+            )
+        return self.model._base_manager.using(db).annotate(
+            **annotations
+        ).filter(
+            self._get_exists_condition([Q(**{name: True}) for name in names])
+        ).values('pk')
+
+    def _get_pk_projection(self):
+        """
+        Returns the operation applied to the primary keys of the component
+        querysets.
+        """
+        return self._clone(querysets=[
+            qs.values('pk') for qs in self._querysets
+        ])._apply_operation()
+
+    def _get_exists_condition(self, conditions):
+        """
+        Returns a :class:`django.db.models.Q` which combines *conditions*,
+        which check whether a row is in each of the component querysets, in
+        the same way as the operation.
+        """
+        raise NotImplementedError(
+            '{} does not support EXISTS subqueries'.format(type(self).__name__)
+        )
+
+    def stream(self, *fields, chunk_size=2000, columnar=False, strategy='sql'):
+        """
+        Returns an iterator over chunks of rows for reading large results
+        without creating a model instance or dictionary for each row.  Each
+        chunk is a list of up to *chunk_size* tuples which come straight from
+        the database cursor, with values only converted where the backend
+        needs it.
+
+        :param fields: if given, the rows are for
+           ``values_list(*fields)``; otherwise they contain the columns that
+           are selected by the component querysets
+        :param bool columnar: if True, each chunk is instead a list of
+           columns.  Columns for integer and float fields are
+           :class:`array.array` instances (unless they contain ``None``), and
+           other columns are lists.
+        :param str strategy: ``'sql'`` runs the delayed operation in the
+           database.  ``'merge'`` runs each component queryset on its own
+           and applies the operation (and ordering by any of *fields*) in
+           Python, which avoids the cost of the operation in the database at
+           the cost of fetching every row of every component queryset.
+        """
+        qs = self.values_list(*fields) if fields else self
+        if strategy == 'sql':
+            typecodes, chunks = qs._execute_chunks(chunk_size)
+        elif strategy == 'merge':
+            typecodes, chunks = qs._merge_chunks(chunk_size)
+        else:
+            raise ValueError('unknown strategy {!r}'.format(strategy))
+
+        if columnar:
+            return (to_columns(rows, typecodes) for rows in chunks)
+        return chunks
+
+    def _execute_chunks(self, chunk_size):
+        """
+        Returns a tuple ``(typecodes, chunks)`` from
+        :func:`~django_delayed_union.streaming.execute_chunks` for the
+        combined query.
+        """
+        return execute_chunks(self._apply(), chunk_size)
+
+    def _merge_chunks(self, chunk_size):
+        """
+        Returns a tuple ``(typecodes, chunks)`` like
+        :func:`~django_delayed_union.streaming.execute_chunks` where the
+        component querysets are run separately and combined with
+        :meth:`_merge_rows`.
+        """
+        results = [execute_chunks(qs, chunk_size) for qs in self._querysets]
+        rows = self._merge_rows([
+            itertools.chain.from_iterable(chunks) for _, chunks in results
+        ])
+        if self._order_by:
+            rows = sorted(rows, key=get_ordering_key(
+                self._order_by,
+                self._standard_ordering,
+                get_column_names(self._querysets[0])
+            ))
+        return results[0][0], chunked(rows, chunk_size)
+
+    def _merge_rows(self, branches):
+        """
+        Returns an iterable of the row tuples that result from applying the
+        delayed operation in Python to the iterables of rows *branches*
+        from each of the component querysets.
+        """
+        raise NotImplementedError(
+            '{} does not support merging rows in Python'.format(
+                type(self).__name__
+            )
+        )
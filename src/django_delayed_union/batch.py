@@ -0,0 +1,120 @@
+from collections import OrderedDict
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import QuerySet
+
+from .base import DelayedQuerySet
+
+#: The operations supported by :func:`evaluate_many`.
+OPERATIONS = ('count', 'exists')
+
+
+def evaluate_many(requests):
+    """
+    Returns a list with the result of each of *requests*, which are tuples
+    ``(queryset, operation)`` where *operation* is ``'count'`` or
+    ``'exists'``::
+
+        >>> active_count, has_staff = evaluate_many([
+        ...     (active_users, 'count'),
+        ...     (staff_users, 'exists'),
+        ... ])
+
+    The requests for each database are run with a single query, where each
+    of them is a scalar subquery.  This is the same as calling ``count()``
+    or ``exists()`` on each of the querysets, which may be delayed
+    querysets or regular ones, but with a single round trip to each
+    database.
+
+    When a :class:`~django_delayed_union.base.DelayedQuerySet` turns out to
+    be empty, its result cache is filled so that iterating over it does
+    not run another query.
+    """
+    requests = [tuple(request) for request in requests]
+    results = [None] * len(requests)
+    subqueries_by_db = OrderedDict()
+    for index, (queryset, operation) in enumerate(requests):
+        if operation not in OPERATIONS:
+            raise ValueError(
+                'operation must be one of {}, not {!r}'.format(
+                    OPERATIONS,
+                    operation
+                )
+            )
+
+        applied = queryset
+        if isinstance(queryset, DelayedQuerySet):
+            applied = queryset._apply()
+        if not isinstance(applied, QuerySet) or applied._result_cache is not None:
+            results[index] = getattr(queryset, operation)()
+            continue
+
+        try:
+            subquery = get_subquery(
+                get_applied_without_select_related(queryset),
+                operation,
+                index
+            )
+        except EmptyResultSet:
+            results[index] = 0 if operation == 'count' else False
+            continue
+        subqueries_by_db.setdefault(applied.db, []).append((index, subquery))
+
+    for db, subqueries in subqueries_by_db.items():
+        connection = connections[db]
+        sql = 'SELECT {}{}'.format(
+            ', '.join(sql for _, (sql, _) in subqueries),
+            connection.features.bare_select_suffix
+        )
+        params = [param for _, (_, params) in subqueries for param in params]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        for (index, _), value in zip(subqueries, row):
+            results[index] = int(value) if requests[index][1] == 'count' else bool(value)
+
+    for (queryset, _), result in zip(requests, results):
+        if isinstance(queryset, DelayedQuerySet) and not result:
+            applied = queryset._apply()
+            if isinstance(applied, QuerySet):
+                applied._result_cache = []
+    return results
+
+
+def get_applied_without_select_related(queryset):
+    """
+    Returns the applied queryset of *queryset*, or *queryset* itself if it
+    is not delayed, without any ``select_related()``.  As with
+    ``DelayedQuerySet.count()``, this avoids an error on MySQL when the
+    joined tables have columns with the same name in the derived table.
+    """
+    if isinstance(queryset, DelayedQuerySet):
+        if any(qs.query.select_related for qs in queryset._querysets):
+            queryset = queryset.select_related(None)
+        return queryset._apply()
+    if queryset.query.select_related and not queryset.query.combinator:
+        queryset = queryset.select_related(None)
+    return queryset
+
+
+def get_subquery(queryset, operation, index):
+    """
+    Returns a tuple ``(sql, params)`` for a scalar subquery which computes
+    the result of *operation* on *queryset*.  *index* is used to give the
+    derived table a unique alias.
+
+    :raises EmptyResultSet: if *queryset* cannot have any rows
+    """
+    if not queryset.query.low_mark and queryset.query.high_mark is None:
+        queryset = queryset.order_by()
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    alias = 'delayed_union_batch_{}'.format(index)
+    if operation == 'count':
+        sql = '(SELECT COUNT(*) FROM ({}) {})'.format(sql, alias)
+    else:
+        sql = '(CASE WHEN EXISTS (SELECT 1 FROM ({}) {}) THEN 1 ELSE 0 END)'.format(
+            sql,
+            alias
+        )
+    return sql, list(params)
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import uuid
+
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+
+#: The cache aliases which hold count versions for each model, keyed by
+#: model.  See :func:`track_counts`.
+_versioned_models = {}
+
+
+def get_version_key(model):
+    return 'django_delayed_union.count_version.{}'.format(
+        model._meta.label_lower
+    )
+
+
+def invalidate_counts(sender, **kwargs):
+    """
+    A receiver for :data:`post_save` and :data:`post_delete` which
+    invalidates the cached counts for any query with *sender* as a
+    component model in the caches passed to :func:`track_counts`.
+    """
+    for cache_alias in _versioned_models.get(sender, ()):
+        caches[cache_alias].set(get_version_key(sender), uuid.uuid4().hex, None)
+
+
+def track_counts(model, cache_alias=DEFAULT_CACHE_ALIAS):
+    """
+    Connects the receivers which invalidate the counts cached in
+    *cache_alias* for any query with *model* as a component model.
+
+    This is done when a count is first cached for *model*, but a process
+    which saves *model* without caching any of its counts only invalidates
+    the counts cached by other processes if this is called on startup, such
+    as in ``AppConfig.ready()``::
+
+        >>> track_counts(User, 'counts')
+    """
+    aliases = _versioned_models.setdefault(model, set())
+    if not aliases:
+        dispatch_uid = 'django_delayed_union.counting.{}'.format(
+            model._meta.label_lower
+        )
+        post_save.connect(invalidate_counts, sender=model, dispatch_uid=dispatch_uid)
+        post_delete.connect(invalidate_counts, sender=model, dispatch_uid=dispatch_uid)
+    aliases.add(cache_alias)
+
+
+def get_model_version(model, cache_alias):
+    """
+    Returns the current count version for *model* in the cache
+    *cache_alias*, connecting the invalidation receivers if needed.
+    """
+    track_counts(model, cache_alias)
+    cache = caches[cache_alias]
+    key = get_version_key(model)
+    cache.add(key, uuid.uuid4().hex, None)
+    return cache.get(key)
+
+
+def get_count_cache_key(delayed_queryset, cache_alias=DEFAULT_CACHE_ALIAS):
+    """
+    Returns the cache key for the total count of *delayed_queryset*, or
+    ``None`` if it cannot be cached.  The key depends on the SQL and
+    parameters of the query as well as the count versions of the component
+    models, which change whenever an instance of one of them is saved or
+    deleted.
+    """
+    queryset = delayed_queryset._apply()
+    if not isinstance(queryset, QuerySet):
+        return None
+    try:
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    except EmptyResultSet:
+        return None
+
+    models = sorted(
+        {qs.model for qs in delayed_queryset._querysets},
+        key=lambda model: model._meta.label_lower
+    )
+    versions = [get_model_version(model, cache_alias) for model in models]
+    digest = hashlib.md5(
+        repr((queryset.db, sql, tuple(params), versions)).encode('utf-8')
+    ).hexdigest()
+    return 'django_delayed_union.count.{}'.format(digest)
+
+
+def get_cached_count(delayed_queryset, cache_alias=DEFAULT_CACHE_ALIAS):
+    """
+    Returns the cached total count of *delayed_queryset*, or ``None`` if it
+    is not cached.
+    """
+    cache_key = get_count_cache_key(delayed_queryset, cache_alias)
+    if cache_key is None:
+        return None
+    return caches[cache_alias].get(cache_key)
+
+
+def set_cached_count(delayed_queryset, count, timeout,
+                     cache_alias=DEFAULT_CACHE_ALIAS):
+    """
+    Stores *count* as the total count of *delayed_queryset* for *timeout*
+    seconds.
+    """
+    cache_key = get_count_cache_key(delayed_queryset, cache_alias)
+    if cache_key is not None:
+        caches[cache_alias].set(cache_key, count, timeout)
+
+
+def get_estimated_count(queryset):
+    """
+    Returns the number of rows the query planner estimates that *queryset*
+    returns, or ``None`` if the backend does not provide an estimate.
+    PostgreSQL and MySQL are supported.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor not in ('postgresql', 'mysql'):
+        return None
+
+    try:
+        sql, params = queryset.query.get_compiler(
+            connection=connection
+        ).as_sql()
+    except EmptyResultSet:
+        return 0
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+
+        cursor.execute('EXPLAIN ' + sql, params)
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    # The rows in the plan for the outermost query are joined, so their
+    # estimates are multiplied.
+    estimate = 1.0
+    for row in rows:
+        if row.get('id') != rows[0].get('id') or row.get('rows') is None:
+            continue
+        estimate *= float(row['rows']) * float(row.get('filtered') or 100) / 100
+    return int(round(estimate))
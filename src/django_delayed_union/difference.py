@@ -1,7 +1,12 @@
+import itertools
+
 from .base import DelayedQuerySet
+from .streaming import iter_unique
 
 
 class DelayedDifferenceQuerySet(DelayedQuerySet):
+    __slots__ = ()
+
     def __init__(self, *querysets):
         return super(DelayedDifferenceQuerySet, self).__init__(*querysets)
 
@@ -11,6 +16,34 @@ class DelayedDifferenceQuerySet(DelayedQuerySet):
         """
         return self._querysets[0].difference(*self._querysets[1:])
 
+    def _get_pk_filtered_queryset(self):
+        """
+        Returns the first component queryset excluding the primary keys
+        which are in any of the other component querysets.
+        """
+        queryset = self._querysets[0]
+        for other in self._querysets[1:]:
+            queryset = queryset.exclude(pk__in=other.values('pk'))
+        return queryset
+
+    def _get_exists_condition(self, conditions):
+        """
+        Returns a condition which is true for the rows in the first
+        component queryset which are not in any of the others.
+        """
+        condition = conditions[0]
+        for other in conditions[1:]:
+            condition &= ~other
+        return condition
+
+    def _merge_rows(self, branches):
+        """
+        Returns the distinct rows from the first component queryset which
+        are not in any of the others.
+        """
+        others = set(itertools.chain.from_iterable(branches[1:]))
+        return iter_unique(row for row in branches[0] if row not in others)
+
     def distinct(self):
         """
         Returns a new :class:`DelayedDifferenceQuerySet` instance that will
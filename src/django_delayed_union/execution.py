@@ -0,0 +1,190 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import OperationalError
+from django.db import connections
+from django.db import transaction
+
+#: The number of SQLite virtual machine instructions between the checks of
+#: the deadline in :func:`statement_timeout`.
+SQLITE_PROGRESS_INSTRUCTIONS = 1000
+
+#: The SQLSTATE of a cancelled statement on PostgreSQL.
+POSTGRESQL_QUERY_CANCELED = '57014'
+
+#: The error codes of a statement which took longer than
+#: ``max_execution_time`` on MySQL and ``max_statement_time`` on MariaDB.
+MYSQL_QUERY_TIMEOUT = 3024
+MARIADB_STATEMENT_TIMEOUT = 1969
+
+
+class StatementTimeout(OperationalError):
+    """
+    Raised when the queries of a function run by :func:`call_with_timeout`
+    take longer than the timeout.
+    """
+    def __init__(self, db, timeout):
+        super(StatementTimeout, self).__init__(
+            'queries on {!r} took longer than {} seconds'.format(db, timeout)
+        )
+        self.db = db
+        self.timeout = timeout
+
+
+def call_in_thread(function):
+    """
+    Returns the result of calling *function* in a worker thread.  The
+    database connections opened by the worker thread are closed afterwards
+    since Django's connections are per-thread and would otherwise leak.
+    """
+    try:
+        return function()
+    finally:
+        connections.close_all()
+
+
+def run_all(functions, parallel=False):
+    """
+    Returns a list of the results of calling each of *functions* with no
+    arguments, in the same order.  If *parallel* is True and there is more
+    than one function, each function is called in its own thread so that
+    queries against different databases run concurrently.
+    """
+    functions = list(functions)
+    if not parallel or len(functions) < 2:
+        return [function() for function in functions]
+
+    with ThreadPoolExecutor(max_workers=len(functions)) as executor:
+        return list(executor.map(call_in_thread, functions))
+
+
+def run_branches(functions, dbs, timeout=None, partial_ok=False,
+                 parallel=False):
+    """
+    Returns a tuple of a list of the results of calling each of *functions*
+    as with :func:`run_all`, and a list of the indexes of the functions
+    which were dropped.  Each function runs its queries on the database with
+    the same index in *dbs*, with a statement timeout of *timeout* seconds
+    if it is given.  If *partial_ok* is True, the result of a function which
+    times out is ``None`` and its index is included in the dropped
+    indexes; otherwise, :class:`StatementTimeout` is raised.
+    """
+    results = run_all(
+        [
+            partial(call_branch, function, db, timeout, partial_ok)
+            for function, db in zip(functions, dbs)
+        ],
+        parallel=parallel
+    )
+    dropped = [index for index, (_, ok) in enumerate(results) if not ok]
+    return [result for result, _ in results], dropped
+
+
+def call_branch(function, db, timeout, partial_ok):
+    """
+    Returns a tuple of the result of calling *function* and True, or
+    ``(None, False)`` if it timed out and *partial_ok* is True.
+    """
+    if timeout is None:
+        return function(), True
+    try:
+        return call_with_timeout(function, db, timeout), True
+    except StatementTimeout:
+        if not partial_ok:
+            raise
+        return None, False
+
+
+def call_with_timeout(function, db, timeout):
+    """
+    Returns the result of calling *function* with a statement timeout of
+    *timeout* seconds on the database *db*.  The queries run in a
+    transaction or savepoint so that a cancelled query does not break an
+    enclosing transaction.  Raises :class:`StatementTimeout` if a query is
+    cancelled; other errors, such as deadlocks, are raised as they are.
+    """
+    try:
+        with statement_timeout(db, timeout), transaction.atomic(using=db):
+            return function()
+    except OperationalError as error:
+        if not is_timeout_error(connections[db], error):
+            raise
+        raise StatementTimeout(db, timeout) from error
+
+
+def is_timeout_error(connection, error):
+    """
+    Returns True if *error*, which was raised by a query on *connection*, is
+    the error for a statement cancelled by :func:`statement_timeout`.
+    """
+    cause = error.__cause__ or error
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        return 'interrupted' in str(cause)
+    if vendor == 'postgresql':
+        sqlstate = getattr(cause, 'sqlstate', None) or getattr(cause, 'pgcode', None)
+        return sqlstate == POSTGRESQL_QUERY_CANCELED
+    if vendor == 'mysql':
+        code = cause.args[0] if cause.args else None
+        if connection.mysql_is_mariadb:
+            return code == MARIADB_STATEMENT_TIMEOUT
+        return code == MYSQL_QUERY_TIMEOUT
+    return False
+
+
+@contextmanager
+def statement_timeout(db, timeout):
+    """
+    A context manager which cancels the statements on the database *db*
+    which run for longer than *timeout* seconds, using
+    ``statement_timeout`` on PostgreSQL, ``max_execution_time`` on MySQL,
+    and ``max_statement_time`` on MariaDB.  SQLite has no statement
+    timeout, so a progress handler interrupts the statements which are
+    running after the deadline instead.  The timeout is not enforced on
+    other databases.
+    """
+    connection = connections[db]
+    connection.ensure_connection()
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        deadline = time.monotonic() + timeout
+        connection.connection.set_progress_handler(
+            lambda: time.monotonic() > deadline,
+            SQLITE_PROGRESS_INSTRUCTIONS
+        )
+        try:
+            yield
+        finally:
+            connection.connection.set_progress_handler(None, 0)
+        return
+
+    if vendor == 'postgresql':
+        variable = 'statement_timeout'
+        value = '{}ms'.format(int(timeout * 1000))
+        get_sql = 'SELECT current_setting(%s)'
+        set_sql = 'SELECT set_config(%s, %s, false)'
+    elif vendor == 'mysql':
+        if connection.mysql_is_mariadb:
+            variable = 'max_statement_time'
+            value = timeout
+        else:
+            variable = 'max_execution_time'
+            value = int(timeout * 1000)
+        get_sql = 'SELECT @@SESSION.{}'.format(variable)
+        set_sql = 'SET SESSION {} = %s'.format(variable)
+    else:
+        yield
+        return
+
+    params = [variable] if vendor == 'postgresql' else []
+    with connection.cursor() as cursor:
+        cursor.execute(get_sql, params)
+        previous = cursor.fetchone()[0]
+        cursor.execute(set_sql, params + [value])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(set_sql, params + [previous])
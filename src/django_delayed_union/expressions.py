@@ -0,0 +1,196 @@
+import copy
+import json
+
+from django.core.exceptions import EmptyResultSet
+from django.core.exceptions import FieldError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Model
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.expressions import Expression
+
+#: ``__in`` lookups with more values than this are passed to the database as
+#: a single parameter with :class:`ValueList`.
+MAX_IN_PARAMETERS = 500
+
+#: The column types on MySQL whose comparisons depend on the collation.
+MYSQL_TEXT_TYPES = ('char', 'varchar', 'tinytext', 'text', 'mediumtext', 'longtext')
+
+#: The default collation of the database for each MySQL database alias.
+_mysql_collations = {}
+
+
+class ValueList(Expression):
+    """
+    An expression for the right-hand side of an ``__in`` lookup which sends
+    all of *values* as a single query parameter, rather than one parameter
+    for each value::
+
+        >>> User.objects.filter(pk__in=ValueList(ids, User._meta.pk))
+
+    This keeps large lookups under SQLite's limit on the number of
+    parameters and keeps MySQL packets small.  The values are expanded by
+    the database with ``json_each()`` on SQLite, ``unnest()`` on PostgreSQL
+    and ``JSON_TABLE()`` on MySQL 8 and MariaDB 10.6.  Other databases use a
+    parameter for each value as usual.  As with Django's ``__in`` lookup,
+    an empty list matches no rows, so excluding it matches every row.
+
+    :param values: the values to look up
+    :param field: the field which the values are for, which is used to
+       prepare them for the database
+    """
+    def __init__(self, values, field):
+        super(ValueList, self).__init__(output_field=field)
+        self.values = values
+
+    def __repr__(self):
+        return '{}(<{} values>)'.format(type(self).__name__, len(self.values))
+
+    def get_db_prep_values(self, connection):
+        """
+        Returns the distinct values which are not ``None``, prepared for
+        *connection*.
+
+        :raises EmptyResultSet: if there are no such values
+        """
+        values = []
+        seen = set()
+        for value in self.values:
+            if value is None or value in seen:
+                continue
+            seen.add(value)
+            values.append(
+                self.output_field.get_db_prep_value(value, connection)
+            )
+        if not values:
+            raise EmptyResultSet
+        return values
+
+    def get_json_parameter(self, connection):
+        return json.dumps(
+            self.get_db_prep_values(connection),
+            cls=DjangoJSONEncoder
+        )
+
+    def as_sql(self, compiler, connection):
+        values = self.get_db_prep_values(connection)
+        return '({})'.format(', '.join(['%s'] * len(values))), values
+
+    def as_sqlite(self, compiler, connection):
+        if not getattr(connection.features, 'supports_json_field', False):
+            return self.as_sql(compiler, connection)
+        return (
+            '(SELECT value FROM json_each(%s))',
+            [self.get_json_parameter(connection)]
+        )
+
+    def as_postgresql(self, compiler, connection):
+        return (
+            '(SELECT unnest(%s::{}[]))'.format(
+                self.output_field.rel_db_type(connection)
+            ),
+            [self.get_db_prep_values(connection)]
+        )
+
+    def as_mysql(self, compiler, connection):
+        minimum_version = (10, 6) if connection.mysql_is_mariadb else (8, 0, 4)
+        if connection.mysql_version < minimum_version:
+            return self.as_sql(compiler, connection)
+        parameter = self.get_json_parameter(connection)
+        db_type = self.output_field.rel_db_type(connection)
+        # The text columns of JSON_TABLE() use a binary collation, which
+        # cannot be compared with the column of the lookup otherwise.
+        if db_type.split('(')[0].lower() in MYSQL_TEXT_TYPES:
+            db_type += ' COLLATE {}'.format(
+                get_mysql_collation(connection, self.output_field)
+            )
+        return (
+            "(SELECT value FROM JSON_TABLE(%s, '$[*]' COLUMNS "
+            "(value {} PATH '$')) AS delayed_union_values)".format(db_type),
+            [parameter]
+        )
+
+
+def get_mysql_collation(connection, field):
+    """
+    Returns the collation of the column for *field* on the MySQL
+    *connection*, which is its ``db_collation`` if it has one and the
+    default collation of the database otherwise.
+    """
+    collation = getattr(field, 'db_collation', None)
+    if collation:
+        return collation
+    if connection.alias not in _mysql_collations:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT @@collation_database')
+            _mysql_collations[connection.alias] = cursor.fetchone()[0]
+    return _mysql_collations[connection.alias]
+
+
+def get_lookup_field(queryset, name):
+    """
+    Returns the field which the values of the lookup *name* (such as
+    ``'user__id'`` for ``user__id__in``) are compared with, or ``None`` if
+    *name* is not a path to a field or annotation.
+    """
+    query = queryset.query
+    try:
+        _, _, targets, rest = query.names_to_path(
+            name.split(LOOKUP_SEP),
+            query.get_meta()
+        )
+    except FieldError:
+        return None
+    if rest or len(targets) != 1:
+        return None
+    return targets[0]
+
+
+def factor_in_lookup(queryset, key, value):
+    """
+    Returns *value* for the keyword argument *key* of ``filter()`` on
+    *queryset*, or a :class:`ValueList` if *key* is an ``__in`` lookup with
+    more than :data:`MAX_IN_PARAMETERS` values.
+    """
+    name, _, lookup = key.rpartition(LOOKUP_SEP)
+    if lookup != 'in' or not isinstance(value, (list, tuple, set, frozenset)):
+        return value
+    if len(value) <= MAX_IN_PARAMETERS:
+        return value
+    if any(isinstance(item, Model) for item in value):
+        return value
+    field = get_lookup_field(queryset, name)
+    if field is None:
+        return value
+    return ValueList(list(value), field)
+
+
+def factor_q(queryset, q):
+    """
+    Returns a copy of the :class:`django.db.models.Q` *q* where the large
+    ``__in`` lookups are replaced by :func:`factor_in_lookup`.
+    """
+    clone = copy.copy(q)
+    clone.children = [
+        factor_q(queryset, child) if isinstance(child, Q)
+        else (child[0], factor_in_lookup(queryset, *child))
+        for child in q.children
+    ]
+    return clone
+
+
+def factor_in_lookups(queryset, args, kwargs):
+    """
+    Returns a tuple ``(args, kwargs)`` for ``filter()`` or ``exclude()`` on
+    *queryset* where the ``__in`` lookups with more than
+    :data:`MAX_IN_PARAMETERS` values are replaced by a :class:`ValueList`.
+    """
+    args = tuple(
+        factor_q(queryset, arg) if isinstance(arg, Q) else arg
+        for arg in args
+    )
+    kwargs = {
+        key: factor_in_lookup(queryset, key, value)
+        for key, value in kwargs.items()
+    }
+    return args, kwargs
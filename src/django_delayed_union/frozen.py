@@ -0,0 +1,81 @@
+from django.db.models import QuerySet
+
+
+class FrozenDelayedQuerySet(object):
+    """
+    An immutable template for a delayed queryset which can be defined once,
+    such as at module level, and shared between threads::
+
+        >>> ACTIVE_MEMBERS = DelayedUnionQuerySet(
+        ...     User.objects.filter(is_staff=True),
+        ...     User.objects.filter(groups__name='members'),
+        ... ).order_by('username').freeze()
+
+    The combined query is built once, when the template is created, but it
+    is still compiled to SQL for each evaluation.  It has no result cache, and it is never modified afterwards.
+    Instead, each method call or evaluation (including iteration and
+    slicing) is done on a new delayed queryset from :meth:`thaw`, which
+    starts with a copy of the combined query rather than building it again.
+    Since the results are not cached, ``len()`` is not supported; use
+    ``count()`` or evaluate a queryset from :meth:`thaw` instead.
+
+    Use :meth:`DelayedQuerySet.freeze` rather than creating this directly.
+    """
+    __slots__ = ('_template', '_applied')
+
+    def __init__(self, delayed_queryset):
+        template = delayed_queryset._clone()
+        applied = template._apply()
+        if not isinstance(applied, QuerySet):
+            applied = None
+
+        set_attr = super(FrozenDelayedQuerySet, self).__setattr__
+        set_attr('_template', template)
+        set_attr('_applied', applied)
+
+    def thaw(self):
+        """
+        Returns a new delayed queryset which is independent of this template
+        and of any other delayed queryset returned by this method.
+        """
+        template = self._template
+        clone = type(template).__new__(type(template))
+        clone._querysets = template._querysets
+        clone._kwargs = dict(template._kwargs)
+        for attr in template._clone_attrs:
+            setattr(clone, attr, getattr(template, attr))
+        clone._applied = None
+        if self._applied is not None:
+            clone._applied = self._applied._chain()
+        return clone
+
+    def freeze(self):
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self.thaw(), name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(
+            '{} is immutable'.format(type(self).__name__)
+        )
+
+    def __delattr__(self, name):
+        raise AttributeError(
+            '{} is immutable'.format(type(self).__name__)
+        )
+
+    def __reduce__(self):
+        return (type(self), (self._template,))
+
+    def __repr__(self):
+        return repr(self.thaw())
+
+    def __iter__(self):
+        return iter(self.thaw())
+
+    def __bool__(self):
+        return bool(self.thaw())
+
+    def __getitem__(self, k):
+        return self.thaw()[k]
@@ -0,0 +1,259 @@
+from collections import defaultdict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F
+from django.db.models import IntegerField
+from django.db.models import Value
+from django.db.models.base import DEFERRED
+from django.db.models.query import BaseIterable
+from django.db.models.query import ValuesListIterable
+
+from .routing import route_for_read
+from .union import DelayedUnionQuerySet
+
+BRANCH_COLUMN = 'delayed_union_branch'
+PK_COLUMN = 'delayed_union_pk'
+
+
+class DelayedHeterogeneousUnionQuerySet(DelayedUnionQuerySet):
+    """
+    A :class:`DelayedUnionQuerySet` whose component querysets may be for
+    different models, such as for an activity feed::
+
+        >>> feed = DelayedHeterogeneousUnionQuerySet(
+        ...     Article.objects.filter(author=user),
+        ...     Comment.objects.filter(author=user),
+        ...     User.objects.filter(id=user.id).annotate(created=F('date_joined')),
+        ...     fields=['created'],
+        ... ).order_by('-created')[:20]
+
+    Each component queryset is projected down to its primary key, the
+    *fields*, and a column which identifies the component queryset.  These
+    are combined with a single ``UNION ALL`` (which can be ordered by any of
+    the *fields*), and then each row is turned into an instance of the model
+    of the component queryset it came from.
+
+    :param fields: the names of the fields or annotations which are
+       selected from every component queryset.  The other fields on the
+       instances are deferred unless *load* is True.
+    :param bool load: if True, the instances are loaded in a single query for
+       each component queryset (by primary key) after the rows are fetched.
+       This also applies any ``select_related()`` and ``prefetch_related()``
+       on the component querysets.
+    :param bool all: passed through to
+       :meth:`django.db.models.QuerySet.union`.  Since the rows from
+       different component querysets are always distinct, this defaults to
+       True.
+    """
+    __slots__ = ()
+    allowed_kwargs = ('all', 'fields', 'load')
+
+    def __init__(self, *querysets, **kwargs):
+        kwargs.setdefault('all', True)
+        kwargs['fields'] = tuple(kwargs.get('fields', ()))
+        kwargs.setdefault('load', False)
+        super(DelayedHeterogeneousUnionQuerySet, self).__init__(
+            *querysets,
+            **kwargs
+        )
+
+    def _apply(self):
+        """
+        Returns the ordered union of the projected component querysets,
+        which yields model instances through a
+        :class:`HeterogeneousModelIterable`.
+        """
+        if self._applied is not None:
+            return self._applied
+
+        qs = route_for_read(self._apply_operation().order_by(
+            *[self._get_column_ordering(name) for name in self._order_by]
+        ))
+        qs.query.standard_ordering = self._standard_ordering
+
+        self._applied = qs
+        return self._applied
+
+    def _apply_operation(self):
+        """
+        Returns the ``UNION ALL`` of each component queryset projected to
+        the columns in :meth:`get_columns`.
+        """
+        fields = self._kwargs['fields']
+        projected = [
+            qs.annotate(**{
+                BRANCH_COLUMN: Value(index, output_field=IntegerField()),
+                PK_COLUMN: F('pk'),
+            }).annotate(**{
+                get_column_name(name): F(name) for name in fields
+            }).values_list(*self.get_columns())
+            for index, qs in enumerate(self._querysets)
+        ]
+
+        qs = projected[0].union(*projected[1:], all=self._kwargs['all'])
+        # The prefetching is done for each component queryset if the
+        # instances are loaded since the instances are for different models.
+        qs._prefetch_related_lookups = ()
+        qs._iterable_class = type(
+            HeterogeneousModelIterable.__name__,
+            (HeterogeneousModelIterable,),
+            {
+                'querysets': self._querysets,
+                'fields': fields,
+                'load': self._kwargs['load'],
+            }
+        )
+        return qs
+
+    def with_branch_label(self, name='branch', labels=None):
+        """
+        Not supported since each result is already an instance of the model
+        for its component queryset.
+        """
+        raise NotImplementedError(
+            'with_branch_label() is not supported for {}'.format(
+                type(self).__name__
+            )
+        )
+
+    def interleave(self, per_branch, *order_by, policy='ordered', weights=None):
+        """
+        Not supported since the component querysets are for different
+        models.
+        """
+        raise NotImplementedError(
+            'interleave() is not supported for {}'.format(type(self).__name__)
+        )
+
+    def materialize(self, batch_size=None):
+        """
+        Not supported since the component querysets are for different
+        models.
+        """
+        raise NotImplementedError(
+            'materialize() is not supported for {}'.format(type(self).__name__)
+        )
+
+    def get_columns(self):
+        """
+        Returns the names of the columns selected from each component
+        queryset.
+        """
+        return [BRANCH_COLUMN, PK_COLUMN] + [
+            get_column_name(name) for name in self._kwargs['fields']
+        ]
+
+    def _get_column_ordering(self, name):
+        """
+        Returns the ordering for the column for the field *name*, which is
+        optionally prefixed with ``'-'``.
+        """
+        if not isinstance(name, str):
+            return name
+        prefix = '-' if name.startswith('-') else ''
+        name = name.lstrip('-')
+        if name == 'pk':
+            return prefix + PK_COLUMN
+        if name in self._kwargs['fields']:
+            return prefix + get_column_name(name)
+        raise ValueError(
+            'can only order by pk or one of the fields {!r}, not {!r}'.format(
+                self._kwargs['fields'],
+                name
+            )
+        )
+
+
+def get_column_name(name):
+    """
+    Returns the name of the column which is selected for the field *name*.
+    A different name is used so that it does not clash with the field.
+    """
+    return 'delayed_union_{}'.format(name)
+
+
+class HeterogeneousModelIterable(BaseIterable):
+    """
+    An iterable which yields a model instance for each row of a
+    :class:`DelayedHeterogeneousUnionQuerySet`.  A subclass with the
+    following attributes is created for each queryset.
+    """
+    #: the component querysets, in the order of the branch column
+    querysets = ()
+    #: the names of the projected fields after the branch and pk columns
+    fields = ()
+    #: whether to load the full instances after fetching the rows
+    load = False
+
+    def __iter__(self):
+        rows = ValuesListIterable(
+            self.queryset,
+            chunked_fetch=self.chunked_fetch,
+            chunk_size=self.chunk_size
+        )
+        if not self.load:
+            for row in rows:
+                yield self.make_instance(row)
+            return
+
+        rows = list(rows)
+        instances = self.load_instances(rows)
+        for row in rows:
+            branch, pk, values = row[0], row[1], row[2:]
+            instance = instances[branch].get(pk)
+            if instance is None:
+                # The row was deleted after the union was evaluated.
+                continue
+            for name, value in zip(self.fields, values):
+                if not hasattr(instance, name):
+                    setattr(instance, name, value)
+            yield instance
+
+    def make_instance(self, row):
+        """
+        Returns an instance of the model for the branch of *row* with only
+        the projected fields loaded.  The projected values which are not
+        fields on the model are set as attributes.
+        """
+        branch, pk, values = row[0], row[1], row[2:]
+        model = self.querysets[branch].model
+        opts = model._meta
+
+        data = {opts.pk.attname: pk}
+        extra = []
+        for name, value in zip(self.fields, values):
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                field = None
+            if field is not None and field.concrete and not field.many_to_many:
+                data[field.attname] = value
+            else:
+                extra.append((name, value))
+
+        instance = model.from_db(
+            self.queryset.db,
+            list(data),
+            [data.get(f.attname, DEFERRED) for f in opts.concrete_fields]
+        )
+        for name, value in extra:
+            setattr(instance, name, value)
+        return instance
+
+    def load_instances(self, rows):
+        """
+        Returns a dictionary mapping each branch to a dictionary of its
+        loaded instances keyed by primary key.  The instances for each
+        branch are loaded with a single query using the component queryset.
+        """
+        pks = defaultdict(list)
+        for row in rows:
+            pks[row[0]].append(row[1])
+
+        instances = {}
+        for branch, branch_pks in pks.items():
+            queryset = self.querysets[branch].order_by()
+            instances[branch] = {
+                obj.pk: obj for obj in queryset.filter(pk__in=branch_pks)
+            }
+        return instances
@@ -0,0 +1,169 @@
+from django.db.models.sql import Query
+
+
+class Hint(object):
+    """
+    A base class for the optimizer hints which are added to a query with
+    :func:`add_hints`.
+    """
+    def __eq__(self, other):
+        return type(self) is type(other) and self.__dict__ == other.__dict__
+
+    def __hash__(self):
+        return hash(repr(self))
+
+    def as_sql(self, connection):
+        raise NotImplementedError()
+
+
+class IndexHint(Hint):
+    """
+    A MySQL index hint, such as ``USE INDEX (...)``, for the base table of
+    the query.  It is ignored by other databases.
+
+    :param names: the names of the indexes
+    """
+    keyword = None
+
+    def __init__(self, *names):
+        if not names:
+            raise ValueError('{} needs at least one index name'.format(
+                type(self).__name__
+            ))
+        self.names = names
+
+    def __repr__(self):
+        return '{}({})'.format(
+            type(self).__name__,
+            ', '.join(repr(name) for name in self.names)
+        )
+
+    def as_sql(self, connection):
+        return '{} ({})'.format(
+            self.keyword,
+            ', '.join(connection.ops.quote_name(name) for name in self.names)
+        )
+
+
+class UseIndex(IndexHint):
+    keyword = 'USE INDEX'
+
+
+class ForceIndex(IndexHint):
+    keyword = 'FORCE INDEX'
+
+
+class IgnoreIndex(IndexHint):
+    keyword = 'IGNORE INDEX'
+
+
+class OptimizerHint(Hint):
+    """
+    An optimizer hint comment, such as ``/*+ NO_RANGE_OPTIMIZATION(t1) */``,
+    which is added after the ``SELECT`` of the query.  MySQL reads it for
+    each ``SELECT``, while PostgreSQL with ``pg_hint_plan`` only reads the
+    comment at the start of the statement.
+
+    :param str text: the text of the comment
+    """
+    def __init__(self, text):
+        if '*/' in text:
+            raise ValueError('optimizer hints cannot contain "*/"')
+        self.text = text
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.text)
+
+    def as_sql(self, connection):
+        return '/*+ {} */'.format(self.text)
+
+
+class HintedQuery(Query):
+    """
+    A :class:`django.db.models.sql.Query` which compiles its
+    :attr:`optimizer_hints` into its SQL.  Since the class and the hints are
+    copied when the query is cloned, the hints are kept through chaining,
+    such as with ``filter()``, and in compound queries.
+    """
+    optimizer_hints = ()
+
+    def get_compiler(self, *args, **kwargs):
+        compiler = super(HintedQuery, self).get_compiler(*args, **kwargs)
+        compiler.__class__ = get_hinted_compiler_class(type(compiler))
+        return compiler
+
+
+class HintedCompilerMixin(object):
+    """
+    A mixin for the SQL compiler of a :class:`HintedQuery`.
+    """
+    def as_sql(self, *args, **kwargs):
+        sql, params = super(HintedCompilerMixin, self).as_sql(*args, **kwargs)
+        comments = [
+            hint.as_sql(self.connection)
+            for hint in self.query.optimizer_hints
+            if isinstance(hint, OptimizerHint)
+        ]
+        # The SQL for a compound query starts with its first component
+        # query, which adds its own comments.
+        if comments and not self.query.combinator and sql.startswith('SELECT '):
+            sql = 'SELECT {} {}'.format(' '.join(comments), sql[len('SELECT '):])
+        return sql, params
+
+    def get_from_clause(self):
+        result, params = super(HintedCompilerMixin, self).get_from_clause()
+        if self.connection.vendor == 'mysql' and result:
+            result[0] = ' '.join([result[0]] + [
+                hint.as_sql(self.connection)
+                for hint in self.query.optimizer_hints
+                if isinstance(hint, IndexHint)
+            ])
+        return result, params
+
+
+_hinted_compiler_classes = {}
+
+
+def get_hinted_compiler_class(compiler_class):
+    """
+    Returns a subclass of *compiler_class* with
+    :class:`HintedCompilerMixin`.
+    """
+    if issubclass(compiler_class, HintedCompilerMixin):
+        return compiler_class
+    if compiler_class not in _hinted_compiler_classes:
+        _hinted_compiler_classes[compiler_class] = type(
+            'Hinted' + compiler_class.__name__,
+            (HintedCompilerMixin, compiler_class),
+            {}
+        )
+    return _hinted_compiler_classes[compiler_class]
+
+
+def add_hints(queryset, *hints):
+    """
+    Returns a copy of the :class:`django.db.models.QuerySet` *queryset*
+    whose SQL includes *hints*, which are instances of :class:`IndexHint`
+    or :class:`OptimizerHint`::
+
+        >>> add_hints(User.objects.filter(is_staff=True), ForceIndex('auth_user_is_staff'))
+    """
+    for hint in hints:
+        if not isinstance(hint, Hint):
+            raise TypeError('expected a Hint, got {!r}'.format(hint))
+    clone = queryset._chain()
+    # The query was already copied by _chain(), so its class can be changed
+    # in place.
+    query = clone.query
+    if not isinstance(query, HintedQuery):
+        query.__class__ = HintedQuery
+    query.optimizer_hints = query.optimizer_hints + hints
+    return clone
+
+
+def get_hints(queryset):
+    """
+    Returns a tuple of the hints which were added to *queryset* with
+    :func:`add_hints`.
+    """
+    return getattr(queryset.query, 'optimizer_hints', ())
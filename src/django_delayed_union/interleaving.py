@@ -0,0 +1,120 @@
+import heapq
+import itertools
+
+#: The policies accepted by :meth:`DelayedUnionQuerySet.interleave`.
+POLICIES = ('ordered', 'round_robin', 'weighted')
+
+_SENTINEL = object()
+
+
+def merge_ordered(branches, key):
+    """
+    Yields the rows from the sorted lists *branches* in the order given by
+    the key function *key*.
+    """
+    return heapq.merge(*branches, key=key)
+
+
+def merge_round_robin(branches):
+    """
+    Yields the first row from each of *branches* in turn, then the second
+    row from each, and so on, skipping the branches which have run out.
+    """
+    iterators = [iter(rows) for rows in branches]
+    while iterators:
+        active = []
+        for iterator in iterators:
+            row = next(iterator, _SENTINEL)
+            if row is not _SENTINEL:
+                active.append(iterator)
+                yield row
+        iterators = active
+
+
+def merge_weighted(branches, weights):
+    """
+    Yields the rows from *branches* so that each branch appears in
+    proportion to its weight in *weights*, using a smooth weighted
+    round-robin.  The branches which have run out are skipped.
+    """
+    iterators = [iter(rows) for rows in branches]
+    weights = list(weights)
+    current = [0] * len(iterators)
+    active = set(index for index, weight in enumerate(weights) if weight > 0)
+    while active:
+        total = sum(weights[index] for index in active)
+        for index in active:
+            current[index] += weights[index]
+        chosen = max(active, key=lambda index: (current[index], -index))
+        current[chosen] -= total
+
+        row = next(iterators[chosen], _SENTINEL)
+        if row is _SENTINEL:
+            active.discard(chosen)
+            current[chosen] = 0
+        else:
+            yield row
+
+
+def get_row_key(row):
+    """
+    Returns a hashable key which identifies *row*, which is a model
+    instance, a dictionary, a tuple or a single value.  Model instances
+    from different databases are different rows.
+    """
+    if isinstance(row, dict):
+        return tuple(sorted(row.items()))
+    if hasattr(row, '_meta'):
+        return (type(row), row._state.db, row.pk)
+    return row
+
+
+def unique_rows(rows):
+    """
+    Yields each of *rows* the first time it is seen, as identified by
+    :func:`get_row_key`.
+    """
+    seen = set()
+    for row in rows:
+        key = get_row_key(row)
+        if key not in seen:
+            seen.add(key)
+            yield row
+
+
+def check_policy(policy, weights, count):
+    """
+    Raises :exc:`ValueError` unless *policy* is one of :data:`POLICIES` and,
+    for ``'weighted'``, *weights* has a non-negative weight for each of the
+    *count* branches.
+    """
+    if policy not in POLICIES:
+        raise ValueError(
+            'policy must be one of {}, not {!r}'.format(POLICIES, policy)
+        )
+    if policy != 'weighted':
+        return
+    if weights is None or len(weights) != count:
+        raise ValueError('expected {} weights'.format(count))
+    if any(weight < 0 for weight in weights):
+        raise ValueError('weights cannot be negative')
+
+
+def interleave_rows(branches, policy, key=None, weights=None, unique=False):
+    """
+    Returns an iterator over the rows from the lists *branches* merged with
+    *policy*, which has been checked with :func:`check_policy`.  Duplicate
+    rows after the first are skipped if *unique* is True.
+    """
+    if policy == 'ordered':
+        if key is None:
+            rows = itertools.chain.from_iterable(branches)
+        else:
+            rows = merge_ordered(branches, key)
+    elif policy == 'round_robin':
+        rows = merge_round_robin(branches)
+    else:
+        rows = merge_weighted(branches, weights)
+    if unique:
+        rows = unique_rows(rows)
+    return rows
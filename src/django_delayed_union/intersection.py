@@ -1,7 +1,13 @@
+import operator
+from functools import reduce
+
 from .base import DelayedQuerySet
+from .streaming import iter_unique
 
 
 class DelayedIntersectionQuerySet(DelayedQuerySet):
+    __slots__ = ()
+
     def __init__(self, *querysets):
         # Handle the case when a DelayedIntersectionQuerySet is passed in
         expanded_querysets = []
@@ -21,6 +27,33 @@ class DelayedIntersectionQuerySet(DelayedQuerySet):
         """
         return self._querysets[0].intersection(*self._querysets[1:])
 
+    def _get_pk_filtered_queryset(self):
+        """
+        Returns the first component queryset filtered to the primary keys
+        which are in each of the other component querysets.
+        """
+        queryset = self._querysets[0]
+        for other in self._querysets[1:]:
+            queryset = queryset.filter(pk__in=other.values('pk'))
+        return queryset
+
+    def _get_exists_condition(self, conditions):
+        """
+        Returns a condition which is true for the rows in every component
+        queryset.
+        """
+        return reduce(operator.and_, conditions)
+
+    def _merge_rows(self, branches):
+        """
+        Returns the distinct rows which are in every component queryset.
+        """
+        others = [set(rows) for rows in branches[1:]]
+        return iter_unique(
+            row for row in branches[0]
+            if all(row in rows for rows in others)
+        )
+
     def distinct(self):
         """
         Returns a new :class:`DelayedIntersectionQuerySet` instance that will
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from django_delayed_union.shadow import registry
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds or checks the registered shadow tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help='The names of the shadow tables.  Defaults to all of them.'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Checks the shadow tables instead of rebuilding them.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            shadow_tables = [registry[name] for name in options['names']]
+        except KeyError as e:
+            raise CommandError('unknown shadow table {}'.format(e))
+        if not shadow_tables:
+            shadow_tables = list(registry)
+
+        inconsistent = []
+        for shadow_table in shadow_tables:
+            if not options['check']:
+                count = shadow_table.rebuild()
+                self.stdout.write('Rebuilt {} with {} rows'.format(
+                    shadow_table.name,
+                    count
+                ))
+                continue
+
+            missing, extra = shadow_table.check()
+            if missing or extra:
+                inconsistent.append(shadow_table.name)
+            self.stdout.write('{}: {} missing, {} extra'.format(
+                shadow_table.name,
+                len(missing),
+                len(extra)
+            ))
+
+        if inconsistent:
+            raise CommandError('inconsistent shadow tables: {}'.format(
+                ', '.join(inconsistent)
+            ))
@@ -0,0 +1,108 @@
+import uuid
+from contextlib import contextmanager
+
+from django.db import connections
+
+from .routing import get_write_db
+
+#: The number of rows inserted into the temporary table with each statement.
+INSERT_BATCH_SIZE = 500
+
+
+@contextmanager
+def materialize_queryset(delayed_queryset, batch_size=INSERT_BATCH_SIZE):
+    """
+    A context manager which writes the primary keys of the rows of
+    *delayed_queryset*, in order, into a temporary table, and returns a
+    :class:`django.db.models.QuerySet` which reads the rows in that order by
+    joining with the temporary table.  The table is dropped on exit.  See
+    :meth:`DelayedQuerySet.materialize`.
+
+    Since creating a table is a write, which read replicas such as a
+    PostgreSQL hot standby reject, everything runs on the database for
+    writes.
+    """
+    dbs = {get_write_db(qs) for qs in delayed_queryset._querysets}
+    if len(dbs) > 1:
+        raise NotImplementedError(
+            'cannot materialize querysets from more than one database'
+        )
+    db = dbs.pop()
+    connection = connections[db]
+    model = delayed_queryset.model
+    table = 'delayed_union_{}'.format(uuid.uuid4().hex)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMPORARY TABLE {} ({} integer NOT NULL PRIMARY KEY, '
+            '{} {} NOT NULL)'.format(
+                connection.ops.quote_name(table),
+                connection.ops.quote_name('position'),
+                connection.ops.quote_name('object_id'),
+                model._meta.pk.rel_db_type(connection)
+            )
+        )
+    try:
+        insert_pks(
+            connection,
+            table,
+            delayed_queryset.using(db).values_list('pk', flat=True),
+            batch_size
+        )
+        yield get_materialized_queryset(delayed_queryset, db, table)
+    finally:
+        # After an error which aborts the transaction, the table is removed
+        # by the rollback on databases with transactional DDL.
+        if not connection.needs_rollback:
+            with connection.cursor() as cursor:
+                cursor.execute('DROP {}TABLE {}'.format(
+                    'TEMPORARY ' if connection.vendor == 'mysql' else '',
+                    connection.ops.quote_name(table)
+                ))
+
+
+def insert_pks(connection, table, pks, batch_size):
+    """
+    Inserts each of *pks* with its position, starting at 1, into the
+    temporary *table*, with *batch_size* rows in each statement.
+    """
+    sql = 'INSERT INTO {} ({}, {}) VALUES '.format(
+        connection.ops.quote_name(table),
+        connection.ops.quote_name('position'),
+        connection.ops.quote_name('object_id')
+    )
+    batch = []
+    with connection.cursor() as cursor:
+        for position, pk in enumerate(pks, 1):
+            batch.extend((position, pk))
+            if len(batch) == 2 * batch_size:
+                cursor.execute(sql + ', '.join(['(%s, %s)'] * batch_size), batch)
+                batch = []
+        if batch:
+            cursor.execute(sql + ', '.join(['(%s, %s)'] * (len(batch) // 2)), batch)
+
+
+def get_materialized_queryset(delayed_queryset, db, table):
+    """
+    Returns a :class:`django.db.models.QuerySet` for the model of
+    *delayed_queryset* which is joined with the temporary *table* and
+    ordered by position.  The ``select_related()`` and
+    ``prefetch_related()`` of the first component queryset are kept.
+    """
+    model = delayed_queryset.model
+    quote_name = connections[db].ops.quote_name
+    first = delayed_queryset._querysets[0]
+
+    queryset = model._base_manager.using(db).extra(
+        tables=[table],
+        where=['{}.{} = {}.{}'.format(
+            quote_name(table),
+            quote_name('object_id'),
+            quote_name(model._meta.db_table),
+            quote_name(model._meta.pk.column)
+        )],
+        order_by=['{}.position'.format(table)]
+    )
+    queryset.query.select_related = first.query.select_related
+    queryset._prefetch_related_lookups = first._prefetch_related_lookups
+    return queryset
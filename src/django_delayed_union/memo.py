@@ -0,0 +1,137 @@
+import copy
+from contextlib import ExitStack
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import QuerySet
+
+#: The statements which do not invalidate the memo.  Any other statement is
+#: treated as a write.
+READ_STATEMENTS = ('SELECT', 'EXPLAIN', 'SAVEPOINT', 'RELEASE SAVEPOINT')
+
+_memo = ContextVar('django_delayed_union_memo', default=None)
+
+
+@contextmanager
+def memoize():
+    """
+    A context manager which memoizes the evaluations of delayed querysets
+    with the same SQL, parameters, and database inside it::
+
+        >>> with memoize():
+        ...     qs.count()  # runs a query
+        ...     qs.count()  # does not run a query
+
+    The memo is cleared whenever a statement other than a ``SELECT`` is
+    run, such as by ``save()``, ``update()``, or raw SQL.  Nested uses share
+    the outermost memo.  See :class:`MemoizeMiddleware` to memoize for each
+    request.
+    """
+    if _memo.get() is not None:
+        yield
+        return
+
+    token = _memo.set({})
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(invalidate_on_write)
+                )
+            yield
+    finally:
+        _memo.reset(token)
+
+
+class MemoizeMiddleware(object):
+    """
+    A middleware which runs each request inside :func:`memoize`.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with memoize():
+            return self.get_response(request)
+
+
+def invalidate_on_write(execute, sql, params, many, context):
+    """
+    A database execute wrapper which clears the memo before any statement
+    which is not in :data:`READ_STATEMENTS`.
+    """
+    memo = _memo.get()
+    if memo and (many or not sql.lstrip().upper().startswith(READ_STATEMENTS)):
+        memo.clear()
+    return execute(sql, params, many, context)
+
+
+def get_memo_key(queryset, name, args=()):
+    """
+    Returns the key in the memo for calling the method *name* with *args*
+    on the :class:`django.db.models.QuerySet` *queryset*, or ``None`` if
+    it is not memoized.
+    """
+    if _memo.get() is None or not isinstance(queryset, QuerySet):
+        return None
+    try:
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    except EmptyResultSet:
+        return None
+    return (
+        name,
+        repr(args),
+        queryset.db,
+        sql,
+        repr(params),
+        queryset._iterable_class,
+        repr(queryset._prefetch_related_lookups),
+    )
+
+
+def copy_row(row):
+    """
+    Returns a copy of *row* so that changes to a model instance or
+    dictionary are not seen by later evaluations.
+    """
+    if isinstance(row, dict) or hasattr(row, '_meta'):
+        return copy.copy(row)
+    return row
+
+
+def fetch_memoized(queryset):
+    """
+    Fills the result cache of *queryset* with copies of the rows in the
+    memo, or stores copies of its rows in the memo after fetching them.
+    """
+    if queryset._result_cache is not None:
+        return
+    key = get_memo_key(queryset, 'results')
+    if key is None:
+        return
+
+    memo = _memo.get()
+    rows = memo.get(key)
+    if rows is None:
+        queryset._fetch_all()
+        memo[key] = [copy_row(row) for row in queryset._result_cache]
+    else:
+        queryset._result_cache = [copy_row(row) for row in rows]
+        queryset._prefetch_done = True
+
+
+def call_memoized(queryset, name, *args):
+    """
+    Returns the result of calling the method *name* with *args* on
+    *queryset*, using the memo if possible.
+    """
+    key = get_memo_key(queryset, name, args)
+    if key is None:
+        return getattr(queryset, name)(*args)
+
+    memo = _memo.get()
+    if key not in memo:
+        memo[key] = getattr(queryset, name)(*args)
+    return copy_row(memo[key])
@@ -0,0 +1,207 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from django.db.models import UniqueConstraint
+from django.db.models.constants import LOOKUP_SEP
+
+from .union import DelayedUnionQuerySet
+
+#: The lookups which are able to use a B-tree index on the field.
+INDEXABLE_LOOKUPS = frozenset([
+    'exact',
+    'in',
+    'gt',
+    'gte',
+    'lt',
+    'lte',
+    'range',
+    'startswith',
+    'isnull',
+])
+
+
+class DelayedQuerySetMixin(object):
+    """
+    A mixin for subclasses of :class:`django.db.models.QuerySet` which adds
+    methods that return delayed querysets.  Since Django copies the
+    queryset methods onto managers created with ``as_manager()`` or
+    ``from_queryset()``, they are available on the manager as well::
+
+        class ArticleQuerySet(DelayedQuerySetMixin, QuerySet):
+            pass
+
+        class Article(models.Model):
+            objects = ArticleQuerySet.as_manager()
+    """
+    def split_or(self, *args, indexed_only=False, all=False, **kwargs):
+        """
+        Returns a :class:`DelayedUnionQuerySet` which contains the same rows
+        as ``self.filter(*args, **kwargs)``, but where each condition in the
+        top-level ``OR`` is filtered in its own component queryset.  Any
+        conditions which are combined with the ``OR`` using ``AND`` are
+        applied to every component queryset.  For example::
+
+            >>> Article.objects.split_or(Q(published=True), Q(author=a) | Q(editor=a))
+
+        is equivalent to::
+
+            >>> DelayedUnionQuerySet(
+            ...     Article.objects.filter(Q(published=True), Q(author=a)),
+            ...     Article.objects.filter(Q(published=True), Q(editor=a)),
+            ... )
+
+        This works around database query planners (MySQL in particular)
+        which do not use indexes well for ``OR`` conditions.
+
+        :param bool indexed_only: if True, only the conditions whose fields
+           are covered by an index get their own component queryset; the
+           rest are kept together in a single component queryset
+        :param bool all: passed through to :class:`DelayedUnionQuerySet`.
+           Note that a row matching more than one condition will be
+           duplicated if this is True.
+        :rtype: :class:`DelayedUnionQuerySet`
+        """
+        shared, disjuncts = split_disjunction(Q(*args, **kwargs))
+        if indexed_only:
+            disjuncts = group_unindexed_disjuncts(self.model, disjuncts)
+
+        queryset = self.filter(*shared)
+        return DelayedUnionQuerySet(
+            *[queryset.filter(disjunct) for disjunct in disjuncts],
+            all=all
+        )
+
+
+def as_q(condition):
+    """
+    Returns *condition*, which is a child of a :class:`Q` object, as a
+    :class:`Q` object.
+    """
+    if isinstance(condition, Q):
+        return condition
+    return Q(condition)
+
+
+def is_disjunction(condition):
+    return (
+        isinstance(condition, Q) and
+        condition.connector == Q.OR and
+        not condition.negated and
+        len(condition.children) > 1
+    )
+
+
+def split_disjunction(q):
+    """
+    Returns a tuple ``(shared, disjuncts)`` of lists of :class:`Q` objects
+    such that *q* is equivalent to the ``OR`` of each of the disjuncts
+    combined with all of the shared conditions.  Only the top-level ``OR``
+    (or the first ``OR`` in a top-level ``AND``) is split.
+    """
+    if is_disjunction(q):
+        return [], [as_q(child) for child in q.children]
+
+    if q.connector == Q.AND and not q.negated:
+        for index, child in enumerate(q.children):
+            if is_disjunction(child):
+                shared = q.children[:index] + q.children[index + 1:]
+                return (
+                    [as_q(condition) for condition in shared],
+                    [as_q(disjunct) for disjunct in child.children]
+                )
+
+    return [], [q]
+
+
+def get_indexed_field_names(model):
+    """
+    Returns the set of names of the fields on *model* which are the
+    leftmost column of an index.
+    """
+    opts = model._meta
+    names = {
+        field.name
+        for field in opts.concrete_fields
+        if field.primary_key or field.unique or field.db_index
+    }
+    names.update(
+        index.fields[0].lstrip('-') for index in opts.indexes if index.fields
+    )
+    names.update(fields[0] for fields in opts.unique_together)
+    names.update(fields[0] for fields in getattr(opts, 'index_together', ()))
+    names.update(
+        constraint.fields[0]
+        for constraint in opts.constraints
+        if isinstance(constraint, UniqueConstraint) and constraint.fields
+    )
+    return names
+
+
+def is_lookup_indexed(model, lookup):
+    """
+    Returns True if the filter *lookup* (such as ``'author__name__in'``)
+    on *model* can use an index.  Relations are followed, and the last
+    field in the lookup needs to be indexed on its model.
+    """
+    indexed = False
+    lookup_name = 'exact'
+    parts = lookup.split(LOOKUP_SEP)
+    for index, part in enumerate(parts):
+        opts = model._meta
+        if part == 'pk':
+            part = opts.pk.name
+        try:
+            field = opts.get_field(part)
+        except FieldDoesNotExist:
+            lookup_name = LOOKUP_SEP.join(parts[index:])
+            break
+
+        if field.many_to_many or field.one_to_many or not field.concrete:
+            # A many-to-many or reverse relation, which joins on the
+            # (indexed) foreign keys of another table.
+            indexed = True
+        else:
+            indexed = part in get_indexed_field_names(model)
+
+        if not field.is_relation:
+            lookup_name = LOOKUP_SEP.join(parts[index + 1:]) or lookup_name
+            break
+        model = field.related_model
+
+    return indexed and lookup_name in INDEXABLE_LOOKUPS
+
+
+def is_condition_indexed(model, condition):
+    """
+    Returns True if *condition*, which is a child of a :class:`Q` object,
+    can be satisfied using an index on *model*.  An ``AND`` needs one of its
+    conditions to be indexed, while an ``OR`` needs all of them to be.
+    """
+    if isinstance(condition, tuple):
+        return is_lookup_indexed(model, condition[0])
+    if not isinstance(condition, Q) or condition.negated:
+        return False
+
+    indexed = (
+        is_condition_indexed(model, child) for child in condition.children
+    )
+    if condition.connector == Q.OR:
+        return all(indexed)
+    return any(indexed)
+
+
+def group_unindexed_disjuncts(model, disjuncts):
+    """
+    Returns a list of disjuncts where those which cannot use an index on
+    *model* have been combined with ``OR`` into the last disjunct.
+    """
+    indexed = []
+    unindexed = Q()
+    for disjunct in disjuncts:
+        if is_condition_indexed(model, disjunct):
+            indexed.append(disjunct)
+        else:
+            unindexed |= disjunct
+
+    if unindexed:
+        indexed.append(unindexed)
+    return indexed
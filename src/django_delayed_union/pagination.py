@@ -0,0 +1,93 @@
+"""
+Pagination classes for `Django REST Framework
+<https://www.django-rest-framework.org/>`_ which are tuned for
+:class:`DelayedQuerySet`.  Django REST Framework must be installed in order
+to use this module.
+"""
+from functools import partial
+
+from django.db.models import F
+from django.db.models.expressions import OrderBy
+from rest_framework.pagination import CursorPagination
+from rest_framework.pagination import PageNumberPagination
+
+from .base import DelayedQuerySet
+from .paginator import DelayedPaginator
+
+
+class DelayedPageNumberPagination(PageNumberPagination):
+    """
+    A :class:`rest_framework.pagination.PageNumberPagination` which uses
+    :class:`DelayedPaginator` so that the rows for a page and the total
+    count are fetched in a single query where possible.
+
+    Set :attr:`count_cache_timeout` to cache the total counts.
+    """
+    count_cache_timeout = None
+
+    @property
+    def django_paginator_class(self):
+        return partial(
+            DelayedPaginator,
+            count_cache_timeout=self.count_cache_timeout
+        )
+
+
+class DelayedCursorPagination(CursorPagination):
+    """
+    A :class:`rest_framework.pagination.CursorPagination` which defaults to
+    the ordering of the :class:`DelayedQuerySet` being paginated.
+
+    Since the cursor position is applied with ``filter()``, it is pushed
+    down into each of the component querysets so that each of them can use
+    an index on the ordering field.  The ordering may use field names and
+    ``F()`` expressions with ``asc()`` or ``desc()``; other expressions
+    raise :exc:`ValueError` since the cursor cannot encode them.
+    """
+    def get_ordering(self, request, queryset, view):
+        if isinstance(queryset, DelayedQuerySet) and queryset.ordered:
+            return tuple(
+                get_field_ordering(field, queryset._standard_ordering)
+                for field in queryset._order_by
+            )
+        return super(DelayedCursorPagination, self).get_ordering(
+            request,
+            queryset,
+            view
+        )
+
+
+def get_field_ordering(field, standard_ordering=True):
+    """
+    Returns the ordering for *field* as a field name with an optional
+    ``'-'`` prefix, with the direction reversed if *standard_ordering* is
+    False.  *field* is a field name, an :class:`F` expression, or an
+    :class:`OrderBy` of one.
+
+    :raises ValueError: if *field* is another expression, or is ordered
+       with *nulls_first* or *nulls_last*
+    """
+    field = get_field_name(field)
+    if standard_ordering:
+        return field
+    if field.startswith('-'):
+        return field[1:]
+    return '-' + field
+
+
+def get_field_name(field):
+    """
+    Returns the field name, with a ``'-'`` prefix for descending order, for
+    the ordering *field*.
+    """
+    if isinstance(field, str):
+        return field
+    if isinstance(field, F):
+        return field.name
+    if (isinstance(field, OrderBy) and isinstance(field.expression, F) and
+            not field.nulls_first and not field.nulls_last):
+        return ('-' if field.descending else '') + field.expression.name
+    raise ValueError(
+        'cursor pagination only supports ordering by field names, '
+        'not {!r}'.format(field)
+    )
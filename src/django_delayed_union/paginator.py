@@ -0,0 +1,178 @@
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.query import ModelIterable
+from django.utils.functional import cached_property
+
+from .base import DelayedQuerySet
+from .counting import get_cached_count
+from .counting import set_cached_count
+from .utils import get_ordering_sql
+
+COUNT_COLUMN = 'delayed_union_count'
+
+
+class DelayedPaginator(Paginator):
+    """
+    A :class:`django.core.paginator.Paginator` which is tuned for
+    :class:`DelayedQuerySet`.
+
+    When the total count is not yet known, the rows for a page are fetched
+    along with the total count in a single query by using a
+    ``COUNT(*) OVER ()`` window on backends which support it.  Otherwise,
+    this behaves like :class:`django.core.paginator.Paginator` which
+    runs the delayed operation once for ``count()`` and once for the page.
+
+    If *count_cache_timeout* is not ``None``, then the total counts are
+    stored in the cache *cache_alias* as with the *cache_timeout* argument
+    of :meth:`DelayedQuerySet.count` so that other paginators for the same
+    query do not need to count the rows again.
+    """
+    count_cache_timeout = None
+    cache_alias = DEFAULT_CACHE_ALIAS
+
+    def __init__(self, *args, **kwargs):
+        for attr in ('count_cache_timeout', 'cache_alias'):
+            if attr in kwargs:
+                setattr(self, attr, kwargs.pop(attr))
+        super(DelayedPaginator, self).__init__(*args, **kwargs)
+
+    @cached_property
+    def count(self):
+        """
+        Returns the total number of objects, across all pages.
+        """
+        if not isinstance(self.object_list, DelayedQuerySet):
+            return super(DelayedPaginator, self).count
+
+        return self.object_list.count(
+            cache_timeout=self.count_cache_timeout,
+            cache_alias=self.cache_alias
+        )
+
+    def page(self, number):
+        """
+        Returns a :class:`django.core.paginator.Page` for the given 1-based
+        page number.  If the total count is not yet known, then it is
+        fetched in the same query as the rows for the page when possible,
+        unless it is in the cache.
+        """
+        self._load_cached_count()
+        if 'count' in self.__dict__ or not self._can_fetch_page_with_count():
+            return super(DelayedPaginator, self).page(number)
+
+        try:
+            index = int(number)
+        except (TypeError, ValueError):
+            return super(DelayedPaginator, self).page(number)
+
+        bottom = (index - 1) * self.per_page
+        if bottom < 0:
+            return super(DelayedPaginator, self).page(number)
+
+        rows = self._fetch_page_with_count(
+            bottom,
+            bottom + self.per_page + self.orphans
+        )
+        if not rows:
+            # We cannot tell the total count from an empty page, so we
+            # fall back to counting the rows separately.
+            return super(DelayedPaginator, self).page(number)
+
+        count = getattr(rows[0], COUNT_COLUMN)
+        for row in rows:
+            delattr(row, COUNT_COLUMN)
+        self.__dict__['count'] = count
+        self._set_cached_count(count)
+
+        number = self.validate_number(number)
+        top = bottom + self.per_page
+        if top + self.orphans >= count:
+            top = count
+        return self._get_page(rows[:top - bottom], number, self)
+
+    def _load_cached_count(self):
+        """
+        Sets :attr:`count` from the cache if *count_cache_timeout* is set
+        and the total count was cached, so that :meth:`page` only needs to
+        fetch the rows.
+        """
+        if (
+            'count' in self.__dict__ or
+            self.count_cache_timeout is None or
+            not isinstance(self.object_list, DelayedQuerySet)
+        ):
+            return
+
+        count = get_cached_count(self.object_list, self.cache_alias)
+        if count is not None:
+            self.__dict__['count'] = count
+
+    def _set_cached_count(self, count):
+        if self.count_cache_timeout is not None:
+            set_cached_count(
+                self.object_list,
+                count,
+                self.count_cache_timeout,
+                self.cache_alias
+            )
+
+    def _can_fetch_page_with_count(self):
+        """
+        Returns True if the rows for a page and the total count can be
+        fetched in a single query.  This requires window function support
+        as well as a queryset which returns model instances without any
+        ``select_related()`` since the rows are loaded with
+        :meth:`django.db.models.query.QuerySet.raw`.
+        """
+        if not isinstance(self.object_list, DelayedQuerySet):
+            return False
+
+        queryset = self.object_list._apply()
+        return (
+            isinstance(queryset, QuerySet) and
+            queryset._result_cache is None and
+            queryset._iterable_class is ModelIterable and
+            not queryset.query.select_related and
+            connections[queryset.db].features.supports_over_clause
+        )
+
+    def _fetch_page_with_count(self, low, high):
+        """
+        Returns a list of the model instances between *low* and *high*, each
+        of which has an additional attribute containing the total number
+        of rows in :attr:`object_list`.
+        """
+        queryset = self.object_list._apply()
+        connection = connections[queryset.db]
+        quote_name = connection.ops.quote_name
+
+        inner_query = queryset.query.chain()
+        inner_query.clear_ordering(True)
+        try:
+            inner_sql, inner_params = inner_query.get_compiler(
+                connection=connection
+            ).as_sql()
+        except EmptyResultSet:
+            return []
+        order_sql, order_params = get_ordering_sql(
+            queryset.query.get_compiler(connection=connection)
+        )
+
+        sql = 'SELECT {alias}.*, COUNT(*) OVER () AS {count} FROM ({inner}) {alias}'.format(
+            alias=quote_name('delayed_union'),
+            count=quote_name(COUNT_COLUMN),
+            inner=inner_sql,
+        )
+        if order_sql:
+            sql += ' ORDER BY ' + order_sql
+        sql += ' ' + connection.ops.limit_offset_sql(low, high)
+
+        raw_queryset = queryset.model._default_manager.db_manager(
+            queryset.db
+        ).raw(sql, tuple(inner_params) + tuple(order_params))
+        return list(raw_queryset.prefetch_related(
+            *queryset._prefetch_related_lookups
+        ))
@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import router
+
+#: The hint which is passed to the ``db_for_read()`` method of the database
+#: routers with the index of the component queryset when the component
+#: querysets are run separately, such as by
+#: :class:`~django_delayed_union.DelayedShardedUnionQuerySet`.
+BRANCH_HINT = 'delayed_branch'
+
+_pinned = ContextVar('django_delayed_union_pinned', default=None)
+
+
+@contextmanager
+def read_your_writes():
+    """
+    A context manager where, after a delayed queryset writes to a model, such
+    as with ``update()`` or ``create()``, the delayed querysets for that
+    model read from the database for writes instead of a replica::
+
+        >>> with read_your_writes():
+        ...     qs.update(is_active=False)
+        ...     list(qs)  # reads from the database from db_for_write()
+
+    Nested uses share the outermost context.  See
+    :class:`ReadYourWritesMiddleware` to use it for each request.
+    """
+    if _pinned.get() is not None:
+        yield
+        return
+
+    token = _pinned.set(set())
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class ReadYourWritesMiddleware(object):
+    """
+    A middleware which runs each request inside :func:`read_your_writes`.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with read_your_writes():
+            return self.get_response(request)
+
+
+def pin(model):
+    """
+    Sends the reads of *model* to the database for writes for the rest of
+    the current :func:`read_your_writes` context, if any.
+    """
+    pinned = _pinned.get()
+    if pinned is not None:
+        pinned.add(model._meta.label)
+
+
+def is_pinned(model):
+    """
+    Returns True if the reads of *model* are sent to the database for
+    writes.
+
+    :rtype: bool
+    """
+    pinned = _pinned.get()
+    return pinned is not None and model._meta.label in pinned
+
+
+def get_read_db(queryset, branch=None):
+    """
+    Returns the database alias which *queryset* reads from.  The alias from
+    :meth:`django.db.models.QuerySet.using` is always used.  Otherwise, the
+    database routers choose the database with ``db_for_write()`` if the
+    model is pinned by :func:`read_your_writes`, and with ``db_for_read()``
+    otherwise.  *branch* is passed to ``db_for_read()`` as the
+    :data:`BRANCH_HINT` hint.
+
+    :rtype: str
+    """
+    if queryset._db is not None:
+        return queryset._db
+    if is_pinned(queryset.model):
+        return router.db_for_write(queryset.model, **queryset._hints)
+    hints = dict(queryset._hints)
+    if branch is not None:
+        hints[BRANCH_HINT] = branch
+    return router.db_for_read(queryset.model, **hints)
+
+
+def get_write_db(queryset):
+    """
+    Returns the database alias which *queryset* writes to.
+
+    :rtype: str
+    """
+    if queryset._db is not None:
+        return queryset._db
+    return router.db_for_write(queryset.model, **queryset._hints)
+
+
+def route_for_read(queryset, branch=None):
+    """
+    Returns a copy of *queryset* which uses the database from
+    :func:`get_read_db`.
+    """
+    return queryset.using(get_read_db(queryset, branch))
@@ -0,0 +1,73 @@
+import math
+import random
+
+from .streaming import TYPECODES
+
+#: The most primary key candidates to try for each row that is needed
+#: before falling back to ``ORDER BY RANDOM()``.
+MAX_CANDIDATES_PER_ROW = 20
+
+#: The number of rounds of primary key candidates to try.
+MAX_ROUNDS = 3
+
+
+def allocate(n, counts):
+    """
+    Returns a list with the number of rows to sample from each component
+    queryset such that the total is ``min(n, sum(counts))`` and each is
+    proportional to the corresponding number of rows in *counts*.  The
+    remainders are allocated with the largest remainder method.
+    """
+    total = sum(counts)
+    n = min(n, total)
+    if not n:
+        return [0] * len(counts)
+
+    quotas = [n * count / total for count in counts]
+    allocation = [int(quota) for quota in quotas]
+    remainders = sorted(
+        range(len(counts)),
+        key=lambda index: quotas[index] - allocation[index],
+        reverse=True
+    )
+    for index in remainders[:n - sum(allocation)]:
+        allocation[index] += 1
+    return allocation
+
+
+def sample_pks(queryset, k, count, low, high):
+    """
+    Returns a list of *k* random primary keys from *queryset*, which has
+    *count* rows with primary keys between *low* and *high*.
+
+    For integer primary keys, random values in the range are looked up with
+    ``pk__in`` which can use the primary key index.  If the primary keys
+    are too sparse for that, or are not integers, this falls back to
+    ``ORDER BY RANDOM()`` on *queryset*.
+    """
+    pks = queryset.order_by().values_list('pk', flat=True)
+    if k <= 0:
+        return []
+    if k >= count:
+        return list(pks)
+
+    field = queryset.model._meta.pk
+    while field.is_relation:
+        field = field.target_field
+
+    found = set()
+    if TYPECODES.get(field.get_internal_type()) == 'q' and low is not None:
+        span = high - low + 1
+        density = count / span
+        for _ in range(MAX_ROUNDS):
+            needed = k - len(found)
+            size = min(span, int(math.ceil(needed / density * 1.2)))
+            if size > needed * MAX_CANDIDATES_PER_ROW:
+                break
+            candidates = random.sample(range(low, high + 1), size)
+            found.update(pks.filter(pk__in=candidates))
+            if len(found) >= k:
+                return random.sample(sorted(found), k)
+
+    found.update(pks.exclude(pk__in=found).order_by('?')[:k - len(found)])
+    return list(found)
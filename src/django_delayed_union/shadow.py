@@ -0,0 +1,240 @@
+from collections import OrderedDict
+
+from django.db import router
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+
+from .routing import get_write_db
+
+
+class ShadowTable(object):
+    """
+    A denormalized table with the primary keys of the rows of a delayed
+    queryset, which is kept up to date when the rows change so that reads do
+    not need to apply the delayed operation::
+
+        class StaffOrMember(models.Model):
+            object_id = models.IntegerField(unique=True)
+
+        staff_or_members = registry.register(ShadowTable(
+            'staff_or_members',
+            lambda: DelayedUnionQuerySet(
+                User.objects.filter(is_staff=True),
+                User.objects.filter(groups__name='members'),
+            ),
+            StaffOrMember,
+        ))
+
+        >>> staff_or_members.all().filter(is_active=True)
+
+    When an instance of the model of the delayed queryset is saved or
+    deleted, or one of its many-to-many relations changes, whether it is in
+    the delayed queryset is checked again with a single query and its row
+    in the shadow table is added or removed.  The shadow table is updated
+    from the databases for writes so that it does not depend on how far
+    behind the read replicas are.
+
+    :param str name: the name used by the ``shadow_tables`` management
+       command
+    :param get_queryset: a function which returns the delayed queryset
+    :param model: the model for the shadow table, which has a unique field
+       *field* for the primary keys
+    :param str field: the name of the field of *model* with the primary keys
+    :param dict dependencies: maps other models which the delayed queryset
+       depends on to a function which takes a saved or deleted instance of
+       that model and returns the primary keys of the rows which might be
+       affected, or ``None`` to rebuild the shadow table
+    """
+    def __init__(self, name, get_queryset, model, field='object_id',
+                 dependencies=None):
+        self.name = name
+        self.get_queryset = get_queryset
+        self.model = model
+        self.field = field
+        self.dependencies = dict(dependencies or {})
+
+    def __repr__(self):
+        return '<{}: {}>'.format(type(self).__name__, self.name)
+
+    @property
+    def source_model(self):
+        """
+        Returns the model of the rows of the delayed queryset.
+        """
+        return self.get_queryset().model
+
+    def all(self):
+        """
+        Returns a :class:`django.db.models.QuerySet` of the rows of the
+        delayed queryset which reads their primary keys from the shadow
+        table.
+        """
+        return self.source_model._default_manager.filter(
+            pk__in=self.model._base_manager.values(self.field)
+        )
+
+    def get_manager(self):
+        """
+        Returns the manager for the shadow table on the database for writes.
+        """
+        return self.model._base_manager.db_manager(
+            router.db_for_write(self.model)
+        )
+
+    def get_source_queryset(self):
+        """
+        Returns the delayed queryset on the database for writes, which has
+        the rows that were just saved even when the replicas lag behind.
+        """
+        queryset = self.get_queryset()
+        return queryset.using(get_write_db(queryset._querysets[0]))
+
+    def get_shadow_pks(self):
+        return set(self.get_manager().values_list(self.field, flat=True))
+
+    def get_source_pks(self):
+        return set(self.get_source_queryset().values_list('pk', flat=True))
+
+    def rebuild(self):
+        """
+        Replaces the contents of the shadow table with the primary keys of
+        the rows of the delayed queryset.  Returns the number of rows.
+        """
+        pks = self.get_source_pks()
+        manager = self.get_manager()
+        with transaction.atomic(using=manager.db):
+            manager.all().delete()
+            manager.bulk_create(
+                [self.model(**{self.field: pk}) for pk in pks],
+                ignore_conflicts=True
+            )
+        return len(pks)
+
+    def check(self):
+        """
+        Returns a tuple ``(missing, extra)`` with the sets of the primary
+        keys which are in the delayed queryset but not in the shadow table,
+        and the other way around.
+        """
+        source_pks = self.get_source_pks()
+        shadow_pks = self.get_shadow_pks()
+        return source_pks - shadow_pks, shadow_pks - source_pks
+
+    def refresh(self, pks):
+        """
+        Adds or removes the rows in the shadow table for *pks* depending on
+        whether they are in the delayed queryset.
+        """
+        pks = set(pks)
+        if not pks:
+            return
+        present = set(
+            self.get_source_queryset().filter(pk__in=pks).values_list('pk', flat=True)
+        )
+        manager = self.get_manager()
+        manager.filter(**{
+            self.field + '__in': pks - present
+        }).delete()
+        existing = set(manager.filter(**{
+            self.field + '__in': present
+        }).values_list(self.field, flat=True))
+        # The rows may be added by another process after they were read,
+        # so the conflicts are ignored.
+        manager.bulk_create([
+            self.model(**{self.field: pk}) for pk in present - existing
+        ], ignore_conflicts=True)
+
+    def connect(self):
+        """
+        Connects the signal receivers which keep the shadow table up to
+        date.
+        """
+        dispatch_uid = self.get_dispatch_uid()
+        source_model = self.source_model
+        post_save.connect(self.handle_source_change, sender=source_model, dispatch_uid=dispatch_uid)
+        post_delete.connect(self.handle_source_change, sender=source_model, dispatch_uid=dispatch_uid)
+        m2m_changed.connect(self.handle_m2m_change, dispatch_uid=dispatch_uid)
+        for model in self.dependencies:
+            post_save.connect(self.handle_dependency_change, sender=model, dispatch_uid=dispatch_uid)
+            post_delete.connect(self.handle_dependency_change, sender=model, dispatch_uid=dispatch_uid)
+
+    def disconnect(self):
+        """
+        Disconnects the signal receivers from :meth:`connect`.
+        """
+        dispatch_uid = self.get_dispatch_uid()
+        source_model = self.source_model
+        post_save.disconnect(sender=source_model, dispatch_uid=dispatch_uid)
+        post_delete.disconnect(sender=source_model, dispatch_uid=dispatch_uid)
+        m2m_changed.disconnect(dispatch_uid=dispatch_uid)
+        for model in self.dependencies:
+            post_save.disconnect(sender=model, dispatch_uid=dispatch_uid)
+            post_delete.disconnect(sender=model, dispatch_uid=dispatch_uid)
+
+    def get_dispatch_uid(self):
+        return 'django_delayed_union.shadow.{}'.format(self.name)
+
+    def handle_source_change(self, sender, instance, **kwargs):
+        self.refresh([instance.pk])
+
+    def handle_m2m_change(self, sender, instance, action, model, pk_set, **kwargs):
+        if action not in ('post_add', 'post_remove', 'post_clear'):
+            return
+        source_model = self.source_model
+        if isinstance(instance, source_model):
+            self.refresh([instance.pk])
+        elif model is source_model:
+            # The primary keys are not given when clearing the reverse side.
+            if pk_set is None:
+                self.rebuild()
+            else:
+                self.refresh(pk_set)
+
+    def handle_dependency_change(self, sender, instance, **kwargs):
+        pks = self.dependencies[sender](instance)
+        if pks is None:
+            self.rebuild()
+        else:
+            self.refresh(pks)
+
+
+class ShadowRegistry(object):
+    """
+    The registered :class:`ShadowTable` instances, by name.
+    """
+    def __init__(self):
+        self._shadow_tables = OrderedDict()
+
+    def register(self, shadow_table):
+        """
+        Registers *shadow_table* and connects its signal receivers.  Returns
+        *shadow_table*.
+        """
+        if shadow_table.name in self._shadow_tables:
+            raise ValueError(
+                'a shadow table named {!r} is already registered'.format(
+                    shadow_table.name
+                )
+            )
+        self._shadow_tables[shadow_table.name] = shadow_table
+        shadow_table.connect()
+        return shadow_table
+
+    def unregister(self, name):
+        """
+        Disconnects and removes the :class:`ShadowTable` named *name*.
+        """
+        self._shadow_tables.pop(name).disconnect()
+
+    def __getitem__(self, name):
+        return self._shadow_tables[name]
+
+    def __iter__(self):
+        return iter(self._shadow_tables.values())
+
+
+#: The default registry, which is used by the ``shadow_tables`` management
+#: command.
+registry = ShadowRegistry()
@@ -0,0 +1,620 @@
+import heapq
+import itertools
+from collections import OrderedDict
+from functools import partial
+
+from django.db import connections
+from django.db.models import prefetch_related_objects
+from django.db.models.query import REPR_OUTPUT_SIZE
+from django.db.models.query import ModelIterable
+
+from .execution import run_all
+from .execution import run_branches
+from .routing import get_read_db
+from .routing import get_write_db
+from .routing import pin
+from .routing import route_for_read
+from .streaming import chunked
+from .streaming import execute_chunks
+from .streaming import get_column_names
+from .union import DelayedUnionQuerySet
+from .utils import get_hidden_columns_iterable
+from .utils import get_merge_ordering
+from .utils import get_ordering_annotations
+from .utils import get_ordering_key
+
+
+class DelayedShardedUnionQuerySet(DelayedUnionQuerySet):
+    """
+    A :class:`DelayedUnionQuerySet` whose component querysets may use
+    different databases, such as when rows are sharded across several
+    database aliases::
+
+        >>> DelayedShardedUnionQuerySet(
+        ...     User.objects.using('shard_a').filter(is_active=True),
+        ...     User.objects.using('shard_b').filter(is_active=True),
+        ...     parallel=True,
+        ... ).order_by('-date_joined')[:20]
+
+    The component querysets for the same database are combined with a
+    ``UNION`` on that database, so each database plans its own query.  When
+    more than one database is involved, the results from each database are
+    merged in Python with the global ordering, slicing, and ``count()``
+    applied across all of them.
+
+    :param bool all: passed through to
+       :meth:`django.db.models.QuerySet.union`.  Without it, duplicates are
+       also removed across the replicas of a database, which are the
+       databases with the same ``db_for_write()``.  Rows on different
+       databases from :meth:`using`, such as shards, are different rows.
+    :param bool parallel: if True, the queries for each database are run
+       concurrently in separate threads
+    :param float timeout: if given, the query on each database is cancelled
+       after this many seconds.  The query is run separately even if all of
+       the component querysets use the same database.
+    :param bool partial_ok: if True, the results are built from the
+       databases whose queries finished within *timeout*, and
+       :attr:`dropped_branches` has the indexes of the other component
+       querysets.  Otherwise, a cancelled query raises
+       :class:`~django_delayed_union.execution.StatementTimeout`.
+    """
+    __slots__ = ()
+    allowed_kwargs = ('all', 'parallel', 'timeout', 'partial_ok')
+
+    def get_indexes_by_db(self):
+        """
+        Returns an :class:`OrderedDict` mapping each database alias to the
+        list of the indexes of the component querysets which use it.
+
+        The component querysets without :meth:`using` are routed with the
+        database routers, which are passed the index of each component
+        queryset as the
+        :data:`~django_delayed_union.routing.BRANCH_HINT` hint so that they
+        can be spread across replicas.
+        """
+        indexes_by_db = OrderedDict()
+        for index, queryset in enumerate(self._querysets):
+            indexes_by_db.setdefault(get_read_db(queryset, index), []).append(index)
+        return indexes_by_db
+
+    def get_querysets_by_db(self):
+        """
+        Returns an :class:`OrderedDict` mapping each database alias to the
+        list of component querysets which use it.  Any labels from
+        :meth:`with_branch_label` are only deduplicated within each database.
+        """
+        return OrderedDict(
+            (db, self._get_labeled_querysets(indexes))
+            for db, indexes in self.get_indexes_by_db().items()
+        )
+
+    @property
+    def dropped_branches(self):
+        """
+        Returns a tuple of the indexes of the component querysets whose
+        query was cancelled with *partial_ok* when this
+        :class:`DelayedShardedUnionQuerySet` was evaluated.
+
+        :rtype: tuple
+        """
+        return getattr(self._apply(), 'dropped_branches', ())
+
+    def _apply(self):
+        """
+        Returns a :class:`django.db.models.QuerySet` if all of the component
+        querysets use the same database and there is no *timeout*, and a
+        :class:`MergedQuerySet` otherwise.
+        """
+        if self._applied is not None:
+            return self._applied
+
+        indexes_by_db = self.get_indexes_by_db()
+        timeout = self._kwargs.get('timeout')
+        if len(indexes_by_db) == 1 and timeout is None:
+            return super(DelayedShardedUnionQuerySet, self)._apply()
+
+        components = [
+            self._get_labeled_querysets(indexes)
+            for indexes in indexes_by_db.values()
+        ]
+        self._applied = MergedQuerySet(
+            [
+                union_querysets(db, querysets, self._kwargs['all'])
+                for db, querysets in zip(indexes_by_db, components)
+            ],
+            order_by=self._order_by,
+            standard_ordering=self._standard_ordering,
+            parallel=self._kwargs.get('parallel', False),
+            prefetch_related_lookups=(
+                self._querysets[0]._prefetch_related_lookups
+            ),
+            branches=list(indexes_by_db.values()),
+            timeout=timeout,
+            partial_ok=self._kwargs.get('partial_ok', False),
+            components=components,
+            all=self._kwargs['all'],
+            sources=[
+                {get_write_db(self._querysets[index]) for index in indexes}
+                for indexes in indexes_by_db.values()
+            ],
+        )
+        return self._applied
+
+    def _apply_operation(self):
+        querysets = self._get_labeled_querysets()
+        return querysets[0].union(*querysets[1:], all=self._kwargs['all'])
+
+    def _execute_chunks(self, chunk_size):
+        """
+        Returns a tuple ``(typecodes, chunks)`` for :meth:`stream`.  When
+        more than one database is involved, the rows from each database are
+        merged with :meth:`MergedQuerySet.execute_chunks`.
+        """
+        applied = self._apply()
+        if isinstance(applied, MergedQuerySet):
+            return applied.execute_chunks(chunk_size)
+        return super(DelayedShardedUnionQuerySet, self)._execute_chunks(chunk_size)
+
+    def _get_interleave_branches(self, per_branch, order_by):
+        """
+        Returns a list with the rows for :meth:`interleave` from each of the
+        component querysets.  When more than one database is involved, each
+        component queryset is ordered and limited with its own query, and the
+        component querysets which are dropped with *partial_ok* have no rows.
+        """
+        if len(self.get_querysets_by_db()) == 1:
+            return super(
+                DelayedShardedUnionQuerySet,
+                self
+            )._get_interleave_branches(per_branch, order_by)
+
+        querysets = [
+            route_for_read(queryset, index).order_by(*order_by)[:per_branch]
+            for index, queryset in enumerate(self._get_labeled_querysets())
+        ]
+        branches, _ = run_branches(
+            [partial(list, queryset) for queryset in querysets],
+            [queryset.db for queryset in querysets],
+            timeout=self._kwargs.get('timeout'),
+            partial_ok=self._kwargs.get('partial_ok', False),
+            parallel=self._kwargs.get('parallel', False)
+        )
+        return [rows or [] for rows in branches]
+
+    def update(self, **kwargs):
+        """
+        Updates all elements in the component querysets, each on its own
+        database.  Returns the total number of (not-necessarily distinct)
+        rows updated.
+        """
+        counts = run_all(
+            [partial(qs.update, **kwargs) for qs in self._querysets],
+            parallel=self._kwargs.get('parallel', False)
+        )
+        pin(self.model)
+        return sum(counts)
+
+    def select_for_update(self, **kwargs):
+        """
+        Returns a :class:`django.db.models.QuerySet` which will lock the
+        rows in this :class:`DelayedShardedUnionQuerySet`.  This is only
+        supported when all of the component querysets use the same database.
+        """
+        if len(self.get_querysets_by_db()) > 1:
+            raise NotImplementedError(
+                'select_for_update() cannot lock rows on more than one database'
+            )
+        return super(DelayedShardedUnionQuerySet, self).select_for_update(
+            **kwargs
+        )
+
+    def _get_semi_join_queryset(self):
+        if len(self.get_querysets_by_db()) > 1:
+            raise NotImplementedError(
+                'a queryset on more than one database cannot be used in a subquery'
+            )
+        return super(DelayedShardedUnionQuerySet, self)._get_semi_join_queryset()
+
+
+def union_querysets(db, querysets, all=False):
+    """
+    Returns the union of *querysets* on the database *db*.  Any
+    ``prefetch_related()`` lookups are removed since they are applied to
+    the merged results instead.
+    """
+    queryset = querysets[0]
+    if len(querysets) > 1:
+        queryset = queryset.union(*querysets[1:], all=all)
+    queryset = queryset.using(db)
+    queryset._prefetch_related_lookups = ()
+    return queryset
+
+
+def get_source_groups(sources):
+    """
+    Returns a list with a number for each of *sources*, which are sets of
+    the databases which hold the rows of each queryset.  The querysets which
+    may return the same rows, since their sources overlap, get the same
+    number.
+    """
+    groups = list(range(len(sources)))
+    for index, source in enumerate(sources):
+        for other in range(index):
+            if source & sources[other] and groups[index] != groups[other]:
+                old = groups[index]
+                groups = [groups[other] if group == old else group for group in groups]
+    return groups
+
+
+def get_row_key(row):
+    """
+    Returns a hashable value which is equal for duplicate rows.  Model
+    instances compare by primary key.
+    """
+    if isinstance(row, dict):
+        return tuple(row.items())
+    return row
+
+
+class MergedQuerySet(object):
+    """
+    A read-only stand-in for :class:`django.db.models.QuerySet` which merges
+    the results of querysets on different databases in Python.
+
+    Each queryset is ordered by *order_by* in its own database and, when the
+    results are sliced, only fetches the rows up to the end of the slice.
+    The sorted results are then merged with :func:`heapq.merge`.
+
+    *branches* has the indexes of the component querysets for each of
+    *querysets*, which are used for :attr:`dropped_branches` when the queries
+    which take longer than *timeout* are dropped with *partial_ok*.
+
+    The database's ordering of text and ``NULL`` values may differ from
+    Python's, so the ordering is adjusted for each database with
+    :func:`~django_delayed_union.utils.get_merge_ordering`.  The
+    expressions are added as annotations to the *components* of each of
+    *querysets*, which are combined with a union using *all*, and removed
+    from the results.
+
+    *sources* has the databases which hold the rows of each of *querysets*,
+    such as the database for writes of a replica.  Without *all*, the
+    duplicate rows from querysets with the same sources are removed when
+    merging.
+    """
+    def __init__(self, querysets, order_by=(), standard_ordering=True,
+                 parallel=False, prefetch_related_lookups=(), branches=None,
+                 timeout=None, partial_ok=False, components=None,
+                 all=False, sources=None):
+        self.querysets = querysets
+        self.model = querysets[0].model
+        self.order_by = order_by
+        self.standard_ordering = standard_ordering
+        self.parallel = parallel
+        self.prefetch_related_lookups = prefetch_related_lookups
+        self.branches = branches or [[index] for index in range(len(querysets))]
+        self.timeout = timeout
+        self.partial_ok = partial_ok
+        self.components = components or [[queryset] for queryset in querysets]
+        self.all = all
+        self.sources = sources or [{queryset.db} for queryset in querysets]
+        self.groups = (
+            list(range(len(querysets))) if all
+            else get_source_groups(self.sources)
+        )
+        self.dropped_branches = ()
+        self.low_mark = 0
+        self.high_mark = None
+        self._result_cache = None
+
+    def _clone(self):
+        clone = MergedQuerySet(
+            self.querysets,
+            order_by=self.order_by,
+            standard_ordering=self.standard_ordering,
+            parallel=self.parallel,
+            prefetch_related_lookups=self.prefetch_related_lookups,
+            branches=self.branches,
+            timeout=self.timeout,
+            partial_ok=self.partial_ok,
+            components=self.components,
+            all=self.all,
+            sources=self.sources,
+        )
+        clone.low_mark = self.low_mark
+        clone.high_mark = self.high_mark
+        return clone
+
+    @property
+    def has_shared_sources(self):
+        """
+        Returns True if the same rows may be returned by more than one of
+        the querysets, so that the duplicates are removed when merging.
+        """
+        return len(set(self.groups)) < len(self.groups)
+
+    @property
+    def is_sliced(self):
+        return self.low_mark != 0 or self.high_mark is not None
+
+    def _get_querysets(self):
+        """
+        Returns the querysets to evaluate on each database, with the
+        ordering applied and sliced to the end of the merged slice.
+        """
+        querysets = []
+        for queryset, components in zip(self.querysets, self.components):
+            annotations, ordering = get_ordering_annotations(get_merge_ordering(
+                self.model,
+                self.order_by,
+                connections[queryset.db].vendor
+            ))
+            if annotations:
+                iterable_class = queryset._iterable_class
+                queryset = union_querysets(
+                    queryset.db,
+                    [qs.annotate(**annotations) for qs in components],
+                    self.all
+                )
+                queryset._iterable_class = get_hidden_columns_iterable(
+                    iterable_class,
+                    annotations
+                )
+            queryset = queryset.order_by(*ordering)
+            queryset.query.standard_ordering = self.standard_ordering
+            if self.high_mark is not None:
+                queryset = queryset[:self.high_mark]
+            querysets.append(queryset)
+        return querysets
+
+    def _run_all(self, functions):
+        """
+        Returns a list of the results of calling each of *functions*, which
+        query the database of the queryset with the same index, with the
+        *timeout*.  The results of the dropped functions are left out and
+        their component querysets are added to :attr:`dropped_branches`.
+        """
+        results, dropped = run_branches(
+            functions,
+            [queryset.db for queryset in self.querysets],
+            timeout=self.timeout,
+            partial_ok=self.partial_ok,
+            parallel=self.parallel
+        )
+        self.dropped_branches = tuple(sorted(set(self.dropped_branches).union(
+            *[self.branches[index] for index in dropped]
+        )))
+        return [
+            result for index, result in enumerate(results)
+            if index not in dropped
+        ]
+
+    def _fetch_all(self):
+        if self._result_cache is not None:
+            return
+
+        querysets = self._get_querysets()
+        key = self._get_ordering_key(querysets[0])
+        results = self._run_all([
+            partial(get_tagged_rows, queryset, group)
+            for queryset, group in zip(querysets, self.groups)
+        ])
+        self._result_cache = list(self._merge(results, key))
+        if (self.prefetch_related_lookups and
+                querysets[0]._iterable_class is ModelIterable):
+            self._prefetch_related_objects()
+
+    def execute_chunks(self, chunk_size):
+        """
+        Returns a tuple ``(typecodes, chunks)`` like
+        :func:`~django_delayed_union.streaming.execute_chunks` where the
+        queryset for each database is executed and the row tuples are merged
+        with the ordering and slicing.  The *timeout* is not applied.
+        """
+        querysets = self._get_querysets()
+        results = [execute_chunks(queryset, chunk_size) for queryset in querysets]
+        rows = [
+            ((group, row) for row in itertools.chain.from_iterable(chunks))
+            for group, (_, chunks) in zip(self.groups, results)
+        ]
+        key = self._get_ordering_key(
+            querysets[0],
+            get_column_names(self.querysets[0])
+        )
+        return results[0][0], chunked(self._merge(rows, key), chunk_size)
+
+    def _merge(self, results, key):
+        """
+        Returns an iterator over the rows in *results*, which are iterables
+        of ``(group, row)`` tuples for each queryset, merged with the ordering
+        *key*, without duplicates from the same sources and sliced.
+        """
+        if key is not None:
+            rows = heapq.merge(*results, key=lambda item: key(item[1]))
+        else:
+            rows = itertools.chain.from_iterable(results)
+        if self.has_shared_sources:
+            rows = iter_unique_rows(rows)
+        rows = (row for _, row in rows)
+        return itertools.islice(rows, self.low_mark, self.high_mark)
+
+    def _get_ordering_key(self, queryset, fields=None):
+        """
+        Returns a key function which sorts the rows of *queryset* by
+        :attr:`order_by`, or ``None`` if the results are not ordered.
+        *fields* are the names of the values in tuple rows, which default to
+        those of *queryset*.
+        """
+        if not self.order_by:
+            return None
+
+        opts = self.model._meta
+        order_by = [
+            name.replace('pk', opts.pk.attname)
+            if isinstance(name, str) and name.lstrip('-') == 'pk' else name
+            for name in self.order_by
+        ]
+        if fields is None:
+            fields = queryset._fields or [
+                field.attname for field in opts.concrete_fields
+            ]
+        return get_ordering_key(order_by, self.standard_ordering, fields)
+
+    def _prefetch_related_objects(self):
+        """
+        Prefetches the related objects for the merged results, separately
+        for each database.
+        """
+        instances_by_db = OrderedDict()
+        for instance in self._result_cache:
+            instances_by_db.setdefault(instance._state.db, []).append(instance)
+        for instances in instances_by_db.values():
+            prefetch_related_objects(
+                instances,
+                *self.prefetch_related_lookups
+            )
+
+    def __repr__(self):
+        data = list(self[:REPR_OUTPUT_SIZE + 1])
+        if len(data) > REPR_OUTPUT_SIZE:
+            data[-1] = '...(remaining elements truncated)...'
+        return '<{} {!r}>'.format(type(self).__name__, data)
+
+    def __len__(self):
+        self._fetch_all()
+        return len(self._result_cache)
+
+    def __iter__(self):
+        self._fetch_all()
+        return iter(self._result_cache)
+
+    def __bool__(self):
+        self._fetch_all()
+        return bool(self._result_cache)
+
+    def __getitem__(self, k):
+        if not isinstance(k, (int, slice)):
+            raise TypeError(
+                'QuerySet indices must be integers or slices, not {}.'.format(
+                    type(k).__name__
+                )
+            )
+        if ((isinstance(k, int) and k < 0) or
+                (isinstance(k, slice) and (
+                    (k.start is not None and k.start < 0) or
+                    (k.stop is not None and k.stop < 0)))):
+            raise ValueError('Negative indexing is not supported.')
+
+        if self._result_cache is not None:
+            return self._result_cache[k]
+
+        if isinstance(k, slice):
+            clone = self._clone()
+            clone._set_limits(k.start, k.stop)
+            return list(clone)[::k.step] if k.step else clone
+
+        clone = self._clone()
+        clone._set_limits(k, k + 1)
+        return list(clone)[0]
+
+    def _set_limits(self, low=None, high=None):
+        """
+        Narrows the slice of the merged results in the same way as
+        :meth:`django.db.models.sql.Query.set_limits`.
+        """
+        if high is not None:
+            if self.high_mark is not None:
+                self.high_mark = min(self.high_mark, self.low_mark + high)
+            else:
+                self.high_mark = self.low_mark + high
+        if low is not None:
+            if self.high_mark is not None:
+                self.low_mark = min(self.high_mark, self.low_mark + low)
+            else:
+                self.low_mark = self.low_mark + low
+
+    def iterator(self, chunk_size=None):
+        return iter(self)
+
+    def count(self):
+        """
+        Returns the number of rows.  Unless the results have already been
+        fetched or are sliced, the rows are counted on each database and
+        the counts are added together.  The rows are fetched instead if the
+        same rows may come from more than one database.
+        """
+        if (self._result_cache is not None or self.is_sliced or
+                self.has_shared_sources):
+            return len(self)
+        return sum(self._run_all(
+            [queryset.count for queryset in self.querysets]
+        ))
+
+    def exists(self):
+        if self._result_cache is not None or self.is_sliced:
+            return bool(self)
+        if self.timeout is not None:
+            return any(self._run_all(
+                [queryset.exists for queryset in self.querysets]
+            ))
+        return any(queryset.exists() for queryset in self.querysets)
+
+    def contains(self, obj):
+        return obj in list(self)
+
+    def first(self):
+        clone = self if self.order_by else self._ordered('pk')
+        for obj in clone[:1]:
+            return obj
+
+    def last(self):
+        clone = self._ordered(*(self.order_by or ('pk',)))
+        clone.standard_ordering = not clone.standard_ordering
+        for obj in clone[:1]:
+            return obj
+
+    def earliest(self, *fields):
+        return self._get_single(self._ordered(*fields))
+
+    def latest(self, *fields):
+        clone = self._ordered(*fields)
+        clone.standard_ordering = not clone.standard_ordering
+        return self._get_single(clone)
+
+    def _ordered(self, *field_names):
+        clone = self._clone()
+        clone.order_by = field_names
+        return clone
+
+    def _get_single(self, clone):
+        for obj in clone[:1]:
+            return obj
+        raise self.model.DoesNotExist(
+            '{} matching query does not exist.'.format(
+                self.model._meta.object_name
+            )
+        )
+
+    def delete(self):
+        raise NotImplementedError(
+            'delete() is not supported across more than one database'
+        )
+
+
+def get_tagged_rows(queryset, group):
+    """
+    Returns a list of ``(group, row)`` tuples for the rows of *queryset*.
+    """
+    return [(group, row) for row in queryset]
+
+
+def iter_unique_rows(rows):
+    """
+    Yields the ``(group, row)`` tuples from *rows* except for the rows which
+    were already yielded for the same group.
+    """
+    seen = set()
+    for group, row in rows:
+        key = (group, get_row_key(row))
+        if key not in seen:
+            seen.add(key)
+            yield group, row
@@ -0,0 +1,128 @@
+import array
+import itertools
+
+from django.db.models.sql.constants import MULTI
+
+#: The :mod:`array` type codes used for the columns of fields with these
+#: internal types when streaming columns.
+TYPECODES = {
+    'AutoField': 'q',
+    'BigAutoField': 'q',
+    'BigIntegerField': 'q',
+    'IntegerField': 'q',
+    'PositiveBigIntegerField': 'q',
+    'PositiveIntegerField': 'q',
+    'PositiveSmallIntegerField': 'q',
+    'SmallAutoField': 'q',
+    'SmallIntegerField': 'q',
+    'FloatField': 'd',
+}
+
+
+def get_typecode(expression):
+    """
+    Returns the :mod:`array` type code for the values of the selected
+    *expression*, or ``None`` if they cannot be stored in an array.
+    """
+    field = getattr(expression, 'output_field', None)
+    while field is not None and field.is_relation:
+        field = field.target_field
+    if field is None:
+        return None
+    return TYPECODES.get(field.get_internal_type())
+
+
+def get_column_names(queryset):
+    """
+    Returns the names of the columns selected by *queryset*, in the order in
+    which they are selected.
+    """
+    query = queryset.query
+    if query.values_select:
+        names = list(query.values_select)
+    elif query.default_cols:
+        names = [field.attname for field in queryset.model._meta.concrete_fields]
+    else:
+        names = []
+    return list(query.extra_select) + names + list(query.annotation_select)
+
+
+def execute_chunks(queryset, chunk_size):
+    """
+    Executes *queryset* and returns a tuple ``(typecodes, chunks)`` where
+    *chunks* is an iterator over lists of up to *chunk_size* tuples fetched
+    from the cursor, and *typecodes* has the :mod:`array` type code for each
+    column.  The database values are only converted when the backend needs
+    it for the selected fields.  The columns which the iterable class of
+    *queryset* hides, such as the annotations for ordering by expressions,
+    are removed.
+    """
+    compiler = queryset.query.get_compiler(using=queryset.db)
+    results = compiler.execute_sql(
+        MULTI,
+        chunked_fetch=True,
+        chunk_size=chunk_size
+    )
+    fields = [s[0] for s in (compiler.select or ())[0:compiler.col_count]]
+    converters = compiler.get_converters(fields)
+    typecodes = [get_typecode(field) for field in fields]
+
+    hidden_columns = getattr(queryset._iterable_class, 'hidden_columns', ())
+    indexes = None
+    if hidden_columns:
+        indexes = [
+            index for index, name in enumerate(get_column_names(queryset))
+            if name not in hidden_columns
+        ]
+        typecodes = [typecodes[index] for index in indexes]
+
+    def iter_chunks():
+        for rows in results:
+            if converters:
+                rows = list(map(tuple, compiler.apply_converters(rows, converters)))
+            if indexes is not None:
+                rows = [tuple(row[index] for index in indexes) for row in rows]
+            yield rows
+    return typecodes, iter_chunks()
+
+
+def iter_unique(rows):
+    """
+    Yields each of the distinct *rows* the first time it is seen.
+    """
+    seen = set()
+    for row in rows:
+        if row not in seen:
+            seen.add(row)
+            yield row
+
+
+def chunked(rows, chunk_size):
+    """
+    Yields lists of up to *chunk_size* rows from the iterable *rows*.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def to_columns(rows, typecodes):
+    """
+    Returns a list with a column for each of the *typecodes* from the list of
+    row tuples *rows*.  A column is an :class:`array.array` if it has a type
+    code and does not contain ``None``, and a list otherwise.
+    """
+    columns = []
+    for values, typecode in zip(zip(*rows), typecodes):
+        if typecode is not None:
+            try:
+                values = array.array(typecode, values)
+            except TypeError:
+                values = list(values)
+        else:
+            values = list(values)
+        columns.append(values)
+    return columns
@@ -1,10 +1,52 @@
+import itertools
+import operator
+import random
+from collections import namedtuple
+from functools import partial
+from functools import reduce
+
+from django.db import connections
+from django.db.models import Case
+from django.db.models import Count
+from django.db.models import Exists
+from django.db.models import IntegerField
+from django.db.models import Max
+from django.db.models import Min
+from django.db.models import OuterRef
+from django.db.models import Value
+from django.db.models import When
+from django.db.models.query import FlatValuesListIterable
+from django.db.models.query import NamedValuesListIterable
+from django.db.models.query import ValuesListIterable
+
 from .base import DelayedQuerySet
+from .counting import get_estimated_count
+from .execution import run_all
+from .interleaving import check_policy
+from .interleaving import interleave_rows
+from .routing import get_write_db
+from .routing import pin
+from .sampling import MAX_ROUNDS
+from .sampling import allocate
+from .sampling import sample_pks
+from .streaming import iter_unique
+from .utils import get_ordering_key
+from .utils import get_values_list_names
+
+INTERLEAVE_COLUMN = 'delayed_union_interleave'
 
 
 class DelayedUnionQuerySet(DelayedQuerySet):
+    __slots__ = ('_branch_label',)
+    _clone_attrs = DelayedQuerySet._clone_attrs + ('_branch_label',)
+    allowed_kwargs = ('all',)
+
     def __init__(self, *querysets, **kwargs):
         kwargs.setdefault('all', False)
-        unexpected_kwarg = next((k for k in kwargs.keys() if k != 'all'), None)
+        unexpected_kwarg = next(
+            (k for k in kwargs.keys() if k not in self.allowed_kwargs),
+            None
+        )
         if unexpected_kwarg:
             raise TypeError(
                 "received an unexpected keyword argument '{}'".format(
@@ -22,16 +64,311 @@ class DelayedUnionQuerySet(DelayedQuerySet):
             else:
                 expanded_querysets.append(queryset)
 
-        return super(DelayedUnionQuerySet, self).__init__(
+        super(DelayedUnionQuerySet, self).__init__(
             *expanded_querysets,
             **kwargs
         )
+        self._branch_label = None
 
     def _apply_operation(self):
         """
         Returs the union of all of the component querysets.
         """
-        return self._querysets[0].union(*self._querysets[1:], **self._kwargs)
+        querysets = self._get_labeled_querysets()
+        return querysets[0].union(*querysets[1:], **self._kwargs)
+
+    def _estimate_count(self):
+        """
+        Returns the sum of the query planner's estimates for each of the
+        component querysets, or ``None`` if any of them has no estimate.
+        Rows which are in more than one component queryset are counted
+        more than once.
+        """
+        total = 0
+        for queryset in self._querysets:
+            estimate = get_estimated_count(queryset)
+            if estimate is None:
+                return None
+            total += estimate
+        return total
+
+    def _get_truncated_dates(self, method, *args, **kwargs):
+        """
+        Returns the sorted list of the distinct values from calling the
+        :class:`django.db.models.QuerySet` method *method* (``'dates'`` or
+        ``'datetimes'``) on each of the component querysets.  Each component
+        queryset only returns its distinct truncated values, which are
+        merged in Python.  They are fetched concurrently if the ``parallel``
+        keyword argument was passed when creating this queryset.
+        """
+        querysets = [
+            getattr(queryset, method)(*args, **kwargs)
+            for queryset in self._querysets
+        ]
+        results = run_all(
+            [partial(list, queryset) for queryset in querysets],
+            parallel=self._kwargs.get('parallel', False)
+        )
+        return sorted(
+            set(itertools.chain.from_iterable(results)),
+            reverse=kwargs.get('order', 'ASC') == 'DESC'
+        )
+
+    def sample(self, n):
+        """
+        Returns a list of *n* random rows from this
+        :class:`DelayedUnionQuerySet` in a random order, or all of the rows
+        if there are fewer than *n*.
+
+        This avoids ``order_by('?')`` on the union, which sorts every row.
+        Instead, the rows are sampled from each component queryset in
+        proportion to its number of rows, using random primary keys which
+        are looked up with the primary key index where possible.  The
+        sampled rows are then fetched with a single query.
+
+        .. note::
+
+           Without ``all=True``, the rows which have already been sampled
+           are excluded when sampling from the other component querysets,
+           and the sampling is repeated (up to three times) if some of them
+           ran out of rows.
+        """
+        stats = [
+            queryset.order_by().aggregate(
+                count=Count('pk'),
+                low=Min('pk'),
+                high=Max('pk')
+            )
+            for queryset in self._querysets
+        ]
+        chosen = [set() for _ in self._querysets]
+        missing = n
+        for _ in range(MAX_ROUNDS):
+            remaining = [
+                stat['count'] - len(pks) for stat, pks in zip(stats, chosen)
+            ]
+            allocation = allocate(missing, remaining)
+            if not any(allocation):
+                break
+            for queryset, k, stat, pks in zip(
+                    self._querysets, allocation, stats, chosen):
+                if not k:
+                    continue
+                # Without all=True, the rows which have already been sampled
+                # from any component queryset are excluded so that each
+                # sampled row is distinct.
+                excluded = pks if self._kwargs['all'] else set().union(*chosen)
+                if excluded:
+                    queryset = queryset.exclude(pk__in=excluded)
+                # The sampled rows from the other component querysets may or
+                # may not be in this one, so the rows are counted again to
+                # get the sampling right.
+                count = (
+                    stat['count'] - len(pks) if excluded == pks
+                    else queryset.order_by().count()
+                )
+                pks.update(sample_pks(
+                    queryset,
+                    k,
+                    count,
+                    stat['low'],
+                    stat['high']
+                ))
+            if self._kwargs['all']:
+                break
+            missing = n - len(set().union(*chosen))
+            if missing <= 0:
+                break
+
+        querysets = [
+            queryset.filter(pk__in=pks)
+            for queryset, pks in zip(self._querysets, chosen)
+        ]
+        results = list(self._clone(querysets=querysets).order_by())
+        random.shuffle(results)
+        return results[:n]
+
+    def interleave(self, per_branch, *order_by, policy='ordered', weights=None):
+        """
+        Returns a list with at most *per_branch* rows from each of the
+        component querysets, as ordered by *order_by*, merged with *policy*::
+
+            >>> DelayedUnionQuerySet(
+            ...     Article.objects.filter(topic='news'),
+            ...     Article.objects.filter(topic='sports'),
+            ... ).interleave(5, '-score', policy='round_robin')
+
+        The ordering and limit are applied to each component queryset in
+        the database, so only the rows which can be returned are fetched.
+        The limited component querysets are combined with a single
+        ``UNION ALL`` when the database supports ``LIMIT`` on them, and with
+        a ``pk__in`` subquery on each of them otherwise.
+
+        :param int per_branch: the most rows to take from each component
+           queryset
+        :param order_by: the field names, optionally prefixed with ``'-'``,
+           which order the rows within each component queryset.  These must
+           be selected by the component querysets.
+        :param str policy: one of
+
+           * ``'ordered'``: all of the rows ordered by *order_by*
+           * ``'round_robin'``: the first row from each component queryset,
+             then the second row from each, and so on
+           * ``'weighted'``: like ``'round_robin'``, but each component
+             queryset appears in proportion to its weight in *weights*
+
+        :param weights: a weight for each of the component querysets when
+           *policy* is ``'weighted'``
+
+        .. note::
+
+           Without ``all=True``, a row which is in more than one component
+           queryset only appears the first time it is merged, so each
+           component queryset can contribute fewer than *per_branch* rows.
+        """
+        check_policy(policy, weights, len(self._querysets))
+        fields = get_values_list_names(self._querysets[0])
+        key = get_ordering_key(order_by, fields=fields) if order_by else None
+        branches = self._get_interleave_branches(per_branch, order_by)
+        return list(interleave_rows(
+            branches,
+            policy,
+            key=key,
+            weights=weights,
+            unique=not self._kwargs['all']
+        ))
+
+    def _get_interleave_branches(self, per_branch, order_by):
+        """
+        Returns a list with the rows for :meth:`interleave` from each of the
+        component querysets.  These are fetched with a single query which
+        selects an extra column with the index of each component queryset.
+        """
+        querysets = [
+            limit_queryset(
+                queryset.annotate(**{
+                    INTERLEAVE_COLUMN: Value(index, output_field=IntegerField())
+                }),
+                per_branch,
+                order_by
+            )
+            for index, queryset in enumerate(self._get_labeled_querysets())
+        ]
+        qs = querysets[0].union(*querysets[1:], all=True).order_by(
+            INTERLEAVE_COLUMN,
+            *order_by
+        )
+
+        # The index is always the last value of each tuple, so tuples are
+        # fetched instead of flat values or named tuples.
+        iterable_class = qs._iterable_class
+        if issubclass(iterable_class, (FlatValuesListIterable, NamedValuesListIterable)):
+            qs._iterable_class = ValuesListIterable
+        if issubclass(iterable_class, NamedValuesListIterable):
+            named_tuple = namedtuple('Row', get_values_list_names(qs)[:-1])
+
+        branches = [[] for _ in querysets]
+        for row in qs:
+            if isinstance(row, dict):
+                index = row.pop(INTERLEAVE_COLUMN)
+            elif isinstance(row, tuple):
+                index, row = row[-1], row[:-1]
+                if issubclass(iterable_class, FlatValuesListIterable):
+                    row = row[0]
+                elif issubclass(iterable_class, NamedValuesListIterable):
+                    row = named_tuple(*row)
+            else:
+                index = row.__dict__.pop(INTERLEAVE_COLUMN)
+            branches[index].append(row)
+        return branches
+
+    def with_branch_label(self, name='branch', labels=None):
+        """
+        Returns a new :class:`DelayedUnionQuerySet` where each result has an
+        annotation *name* with the label of the component queryset it came
+        from.  This is computed in the same query as the union.
+
+        :param str name: the name of the annotation
+        :param labels: the labels for each of the component querysets.  By
+           default, these are the indexes of the component querysets.
+
+        .. note::
+
+           When ``all=False`` and a row is in more than one component
+           queryset, it gets the label of the first of those component
+           querysets so that the duplicate rows are still removed.  This is
+           done with an ``EXISTS`` subquery on each of the earlier
+           component querysets.
+        """
+        if labels is None:
+            labels = range(len(self._querysets))
+        labels = tuple(labels)
+        if len(labels) != len(self._querysets):
+            raise ValueError(
+                'expected {} labels, got {}'.format(
+                    len(self._querysets),
+                    len(labels)
+                )
+            )
+        clone = self._clone()
+        clone._branch_label = (name, labels)
+        return clone
+
+    def _get_labeled_querysets(self, indexes=None):
+        """
+        Returns the component querysets with the given *indexes* (by default
+        all of them), annotated with their labels if
+        :meth:`with_branch_label` has been used.
+        """
+        if indexes is None:
+            indexes = range(len(self._querysets))
+        if self._branch_label is None:
+            return [self._querysets[index] for index in indexes]
+
+        name, labels = self._branch_label
+        labeled = []
+        for position, index in enumerate(indexes):
+            label = Value(labels[index])
+            earlier = indexes[:position]
+            if earlier and not self._kwargs['all']:
+                label = Case(
+                    *[
+                        When(
+                            Exists(self._querysets[i].filter(pk=OuterRef('pk'))),
+                            then=Value(labels[i])
+                        )
+                        for i in earlier
+                    ],
+                    default=label
+                )
+            labeled.append(self._querysets[index].annotate(**{name: label}))
+        return labeled
+
+    def _get_pk_projection(self):
+        """
+        Returns the union of the primary keys of the component querysets,
+        without any labels from :meth:`with_branch_label`.
+        """
+        clone = self._clone()
+        clone._branch_label = None
+        return super(DelayedUnionQuerySet, clone)._get_pk_projection()
+
+    def _get_exists_condition(self, conditions):
+        """
+        Returns a condition which is true for the rows in any of the
+        component querysets.
+        """
+        return reduce(operator.or_, conditions)
+
+    def _merge_rows(self, branches):
+        """
+        Returns the rows from all of the component querysets, without
+        duplicates unless ``all=True``.
+        """
+        rows = itertools.chain.from_iterable(branches)
+        if self._kwargs['all']:
+            return rows
+        return iter_unique(rows)
 
     def distinct(self):
         """
@@ -51,4 +388,47 @@ class DelayedUnionQuerySet(DelayedQuerySet):
         total_count = 0
         for queryset in self._querysets:
             total_count += queryset.update(**kwargs)
+        pin(self.model)
         return total_count
+
+    def select_for_update(self, **kwargs):
+        """
+        Returns a :class:`django.db.models.QuerySet` which will lock the
+        rows in this :class:`DelayedUnionQuerySet` until the end of the
+        transaction.  The keyword arguments (such as *nowait* and
+        *skip_locked*) are passed through to
+        :meth:`django.db.models.QuerySet.select_for_update`.
+
+        .. note::
+
+           The rows are locked in ascending primary key order with a
+           single ``SELECT ... FOR UPDATE`` which filters by this
+           :class:`DelayedUnionQuerySet` as a subquery, so the component
+           querysets are checked again when the rows are locked.  Locking
+           rows in a consistent order avoids deadlocks between
+           transactions which lock overlapping sets of rows.
+
+           The rows are locked on the database for writes.
+        """
+        pin(self.model)
+        queryset = self._querysets[0]
+        db = get_write_db(queryset)
+        # The subquery must use the same database as the locking query,
+        # which is not the one the routers choose for reads.
+        return queryset.model._base_manager.using(db).filter(
+            pk__in=self.using(db).order_by()
+        ).order_by('pk').select_for_update(**kwargs)
+
+
+def limit_queryset(queryset, limit, order_by):
+    """
+    Returns *queryset* ordered by *order_by* and limited to *limit* rows so
+    that it can be a component of a compound query.  Databases which do not
+    support ``LIMIT`` on the components (such as SQLite) use a ``pk__in``
+    subquery instead.
+    """
+    features = connections[queryset.db].features
+    ordered = queryset.order_by(*order_by)
+    if features.supports_slicing_ordering_in_compound:
+        return ordered[:limit]
+    return queryset.filter(pk__in=ordered.values('pk')[:limit])
@@ -1,7 +1,357 @@
 import inspect
+import operator
 import re
+from collections import OrderedDict
+from collections import namedtuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Case
+from django.db.models import CharField
+from django.db.models import F
+from django.db.models import Func
+from django.db.models import IntegerField
+from django.db.models import TextField
+from django.db.models import Value
+from django.db.models import When
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.expressions import Expression
+from django.db.models.expressions import OrderBy
+from django.db.models.expressions import RawSQL
+from django.db.models.query import FlatValuesListIterable
+from django.db.models.query import ModelIterable
+from django.db.models.query import NamedValuesListIterable
+from django.db.models.query import ValuesIterable
+from django.db.models.query import ValuesListIterable
+
+ORDERING_ALIAS = 'delayed_union_ordering_{}'
+
+#: The database vendors which sort ``NULL`` after every other value in
+#: ascending order, unlike :class:`OrderingValue`.
+NULLS_LAST_VENDORS = ('postgresql', 'oracle')
 
 
 def get_formatted_function_signature(func):
     signature = str(inspect.signature(func))
     return re.sub('self(, )?', '', signature).replace('()', '( )')
+
+
+def get_queryset_state(queryset):
+    """
+    Returns a picklable dictionary describing *queryset* without
+    evaluating it.  This is the inverse of :func:`get_queryset_from_state`.
+
+    .. note::
+
+       We cannot just pickle the queryset since
+       :meth:`django.db.models.QuerySet.__getstate__` evaluates it.
+    """
+    return {
+        'class': type(queryset),
+        'model': queryset.model,
+        'query': queryset.query,
+        'using': queryset._db,
+        'hints': queryset._hints,
+        'iterable_class': queryset._iterable_class,
+        'fields': queryset._fields,
+        'prefetch_related_lookups': queryset._prefetch_related_lookups,
+    }
+
+
+def get_queryset_from_state(state):
+    """
+    Returns a new queryset from a dictionary returned by
+    :func:`get_queryset_state`.
+    """
+    queryset = state['class'](
+        model=state['model'],
+        query=state['query'],
+        using=state['using'],
+        hints=state['hints'],
+    )
+    queryset._iterable_class = state['iterable_class']
+    queryset._fields = state['fields']
+    queryset._prefetch_related_lookups = state['prefetch_related_lookups']
+    return queryset
+
+
+class ColumnPosition(Expression):
+    """
+    An expression which compiles to the 1-based *position* of a column in
+    the result of a query, for use in an ``ORDER BY`` clause.
+    """
+    def __init__(self, position):
+        super(ColumnPosition, self).__init__()
+        self.position = position
+
+    def as_sql(self, compiler, connection):
+        return str(self.position), []
+
+
+def get_ordering_sql(compiler):
+    """
+    Returns the SQL (without the ``ORDER BY`` keyword) and the parameters
+    for the ordering of the combined query of *compiler*.  The columns are
+    referred to by their position in the result so that the ordering can be
+    applied to a query which selects from the combined query.
+    """
+    compiler.setup_query()
+    sqls, params = [], []
+    for expr, _ in compiler.get_order_by():
+        source = expr.get_source_expressions()[0]
+        if isinstance(source, RawSQL):
+            expr = expr.copy()
+            expr.set_source_expressions([ColumnPosition(source.sql)])
+        expr_sql, expr_params = compiler.compile(expr)
+        sqls.append(expr_sql)
+        params.extend(expr_params)
+    return ', '.join(sqls), params
+
+
+class OrderingValue(object):
+    """
+    A wrapper around a value from a row which compares like it would in an
+    ``ORDER BY`` clause, so that rows from different databases can be merged
+    in Python.  ``None`` sorts before every other value in ascending order,
+    as it does on SQLite and MySQL.  See :func:`get_merge_ordering` for the
+    ordering which matches this on other databases.
+    """
+    __slots__ = ('value', 'descending')
+
+    def __init__(self, value, descending=False):
+        self.value = value
+        self.descending = descending
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        a, b = self.value, other.value
+        if self.descending:
+            a, b = b, a
+        if a is None:
+            return b is not None
+        if b is None:
+            return False
+        return a < b
+
+
+class BinaryOrder(Func):
+    """
+    An expression for a text column which sorts by code point, as Python
+    compares strings, rather than with the collation of the column, such as
+    a case-insensitive MySQL collation or a PostgreSQL locale.  SQLite
+    already compares text by code point.
+    """
+    template = '%(expressions)s'
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='CAST(%(expressions)s AS BINARY)',
+            **extra_context
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='(%(expressions)s) COLLATE "C"',
+            **extra_context
+        )
+
+    def as_oracle(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template="NLSSORT(%(expressions)s, 'NLS_SORT=BINARY')",
+            **extra_context
+        )
+
+
+def get_merge_ordering(model, field_names, vendor):
+    """
+    Returns *field_names* for ordering the rows of *model* on a database of
+    *vendor* so that they are sorted in the same way as by
+    :func:`get_ordering_key`.  Text fields are ordered with
+    :class:`BinaryOrder`, and nullable fields have their ``NULL`` values
+    placed explicitly on databases in :data:`NULLS_LAST_VENDORS`.  The
+    other names are returned unchanged.
+    """
+    opts = model._meta
+    ordering = []
+    for name in field_names:
+        if not isinstance(name, str):
+            ordering.append(name)
+            continue
+        descending = name.startswith('-')
+        field_name = name.lstrip('-')
+        try:
+            field = opts.pk if field_name == 'pk' else opts.get_field(field_name)
+        except FieldDoesNotExist:
+            ordering.append(name)
+            continue
+
+        is_text = isinstance(field, (CharField, TextField)) and vendor != 'sqlite'
+        nulls = field.null and vendor in NULLS_LAST_VENDORS
+        if not is_text and not nulls:
+            ordering.append(name)
+            continue
+
+        expression = BinaryOrder(F(field_name)) if is_text else F(field_name)
+        if descending:
+            kwargs = {'nulls_last': True} if nulls else {}
+            ordering.append(expression.desc(**kwargs))
+        else:
+            kwargs = {'nulls_first': True} if nulls else {}
+            ordering.append(expression.asc(**kwargs))
+    return ordering
+
+
+def get_row_value(row, name, fields):
+    """
+    Returns the value of the field *name* from *row*, which is a model
+    instance, a dictionary, a tuple with the values of *fields*, or a
+    single value from ``values_list(flat=True)``.  Relations in *name* are
+    followed for model instances.
+    """
+    if isinstance(row, dict):
+        return row[name]
+    if isinstance(row, tuple):
+        return row[fields.index(name)]
+    if not hasattr(row, '_meta'):
+        return row
+
+    value = row
+    for part in name.split(LOOKUP_SEP):
+        if value is None:
+            break
+        value = getattr(value, part)
+    return value
+
+
+def get_ordering_key(field_names, standard_ordering=True, fields=()):
+    """
+    Returns a key function for :func:`sorted` and :func:`heapq.merge` which
+    orders rows in the same way that ``order_by(*field_names)`` does in the
+    database.
+
+    :param field_names: the field names, optionally prefixed with ``'-'``
+    :param bool standard_ordering: False if the ordering is reversed
+    :param fields: the names of the values in each row when the rows are
+       tuples as returned by ``values_list()``
+    """
+    ordering = []
+    for name in field_names:
+        if not isinstance(name, str) or name == '?':
+            raise ValueError(
+                'cannot order by {!r} in Python'.format(name)
+            )
+        descending = name.startswith('-')
+        ordering.append((name.lstrip('-'), descending == standard_ordering))
+
+    def key(row):
+        return tuple(
+            OrderingValue(get_row_value(row, name, fields), descending)
+            for name, descending in ordering
+        )
+    return key
+
+
+def get_ordering_annotations(order_by):
+    """
+    Returns a tuple ``(annotations, ordering)`` for the global ordering
+    *order_by* where each expression (such as ``F('name').desc()`` or
+    ``Lower('name')``) is replaced by the name of an annotation in the
+    :class:`OrderedDict` *annotations*.  When the annotations are added to
+    each of the component querysets, the combined query can be ordered by
+    *ordering* since it only refers to selected columns.
+
+    ``nulls_first`` and ``nulls_last`` are handled with an additional
+    annotation which is 1 for ``NULL`` values, so that they work on every
+    backend.
+    """
+    annotations = OrderedDict()
+    ordering = []
+    for index, field in enumerate(order_by):
+        if isinstance(field, str):
+            ordering.append(field)
+            continue
+
+        if not isinstance(field, OrderBy):
+            field = field.asc()
+        alias = ORDERING_ALIAS.format(index)
+        annotations[alias] = field.expression
+        if field.nulls_first or field.nulls_last:
+            null_alias = alias + '_isnull'
+            annotations[null_alias] = Case(
+                When(**{alias + '__isnull': True}, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField()
+            )
+            ordering.append(('' if field.nulls_last else '-') + null_alias)
+        ordering.append(('-' if field.descending else '') + alias)
+    return annotations, ordering
+
+
+def get_values_list_names(queryset):
+    """
+    Returns the names of the values in the tuples returned by
+    :class:`django.db.models.query.ValuesListIterable` for *queryset*.
+    """
+    query = queryset.query
+    if queryset._fields:
+        return [*queryset._fields, *(
+            name for name in query.annotation_select
+            if name not in queryset._fields
+        )]
+    return [*query.extra_select, *query.values_select, *query.annotation_select]
+
+
+class HiddenColumnsIterable(object):
+    """
+    A mixin for the iterable classes of
+    :class:`django.db.models.QuerySet` which removes the columns in
+    :attr:`hidden_columns` from the results.  See
+    :func:`get_hidden_columns_iterable`.
+    """
+    hidden_columns = frozenset()
+
+    def __iter__(self):
+        hidden_columns = self.hidden_columns
+        if isinstance(self, FlatValuesListIterable):
+            yield from super(HiddenColumnsIterable, self).__iter__()
+        elif isinstance(self, (ModelIterable, ValuesIterable)):
+            for obj in super(HiddenColumnsIterable, self).__iter__():
+                values = obj if isinstance(obj, dict) else obj.__dict__
+                for name in hidden_columns:
+                    values.pop(name, None)
+                yield obj
+        else:
+            names = get_values_list_names(self.queryset)
+            indexes = [
+                index for index, name in enumerate(names)
+                if name not in hidden_columns
+            ]
+            rows = ValuesListIterable.__iter__(self)
+            if len(indexes) == 1:
+                rows = ((row[indexes[0]],) for row in rows)
+            else:
+                rows = map(operator.itemgetter(*indexes), rows)
+
+            if isinstance(self, NamedValuesListIterable):
+                row_class = namedtuple(
+                    'Row',
+                    [names[index] for index in indexes]
+                )
+                rows = (row_class._make(row) for row in rows)
+            yield from rows
+
+
+def get_hidden_columns_iterable(iterable_class, hidden_columns):
+    """
+    Returns a subclass of *iterable_class* which removes the
+    *hidden_columns* from the results.
+    """
+    return type(
+        iterable_class.__name__,
+        (HiddenColumnsIterable, iterable_class),
+        {'hidden_columns': frozenset(hidden_columns)}
+    )
@@ -1,13 +1,28 @@
 import abc
+import array
+import copy
+import datetime
+import pickle
+from unittest import mock
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache import caches
+from django.db import DatabaseError
+from django.db import connection
+from django.db import transaction
 from django.db.models import F
 from django.db.models import Q
 from django.db.models import QuerySet
 from django.db.models import sql
+from django.db.models.functions import Length
+from django.db.models.functions import Lower
 from django.utils.functional import cached_property
 
-from django_delayed_union.base import DelayedQuerySetDescriptor
+from django_delayed_union import base
+from django_delayed_union import counting
+from django_delayed_union.counting import get_version_key
+from django_delayed_union.counting import track_counts
 
 from .factories import UserFactory
 
@@ -44,11 +59,9 @@ class DelayedQuerySetMetaTestsMixin(abc.ABC):
 
     def test_all_descriptors_have_docstrings(self):
         cls = self.get_class()
-        for attr in dir(cls):
-            descriptor = getattr(cls, attr)
-            if not isinstance(descriptor, DelayedQuerySetDescriptor):
-                continue
-            self.assertIsNotNone(descriptor.__doc__)
+        for name, descriptor in cls._descriptors.items():
+            self.assertTrue(descriptor.docstring)
+            self.assertTrue(getattr(cls, name).__doc__)
 
 
 class DelayedQuerySetTestsMixin(abc.ABC):
@@ -168,6 +181,39 @@ class DelayedQuerySetTestsMixin(abc.ABC):
             self.expected_count - excluded_count
         )
 
+    def test_filter_with_many_values(self):
+        ids = list(self.expected_ids) + list(range(-2000, 0))
+        qs = self.qs.filter(id__in=ids)
+        self.assertEqual(qs.count(), self.expected_count)
+        applied = qs._apply()
+        _, params = applied.query.get_compiler(applied.db).as_sql()
+        self.assertLess(len(params), 100)
+
+    def test_exclude_with_many_values(self):
+        ids = [self.user.id] + list(range(-2000, 0))
+        self.assertEqual(
+            self.qs.exclude(id__in=ids).count(),
+            self.qs.exclude(id=self.user.id).count()
+        )
+
+    def test_filter_by_pk_in(self):
+        self.assertEqual(
+            set(User.objects.filter(pk__in=self.qs)),
+            set(self.expected_models)
+        )
+
+    def test_filter_by_pk_in_with_exists(self):
+        with mock.patch.dict(base.SEMI_JOIN_STRATEGIES, {connection.vendor: 'exists'}):
+            qs = User.objects.filter(pk__in=self.qs.order_by('-id'))
+            self.assertIn('EXISTS', str(qs.query))
+            self.assertEqual(set(qs), set(self.expected_models))
+
+    def test_filter_by_pk_in_values_list(self):
+        self.assertEqual(
+            set(User.objects.filter(pk__in=self.qs.values_list('id', flat=True))),
+            set(self.expected_models)
+        )
+
     def test_filtering_after_ordering(self):
         second = UserFactory.create()
         user = self.qs.order_by('-pk').exclude(id=self.bad_id).first()
@@ -185,6 +231,144 @@ class DelayedQuerySetTestsMixin(abc.ABC):
             self.expected_ids
         )
 
+    def get_streamed_rows(self, qs, *fields, **kwargs):
+        return [row for rows in qs.stream(*fields, **kwargs) for row in rows]
+
+    def test_stream(self):
+        self.assertEqual(
+            sorted(self.get_streamed_rows(self.qs, 'id')),
+            [(u.id,) for u in self.expected_models_sorted_by_id]
+        )
+
+    def test_stream_converts_values(self):
+        rows = self.get_streamed_rows(self.qs, 'id', 'date_joined')
+        self.assertIsInstance(rows[0][1], datetime.datetime)
+
+    def test_stream_chunk_size(self):
+        chunks = list(self.qs.stream('id', chunk_size=1))
+        self.assertEqual(len(chunks), self.expected_count)
+
+    def test_stream_columnar(self):
+        chunks = list(self.qs.order_by('id').stream('id', 'username', columnar=True))
+        self.assertEqual(len(chunks), 1)
+        ids, usernames = chunks[0]
+        self.assertIsInstance(ids, array.array)
+        self.assertEqual(list(ids), [u.id for u in self.expected_models_sorted_by_id])
+        self.assertEqual(usernames, [u.username for u in self.expected_models_sorted_by_id])
+
+    def test_stream_merge(self):
+        self.assertEqual(
+            self.get_streamed_rows(self.qs.order_by('-id'), 'id', strategy='merge'),
+            [(u.id,) for u in self.expected_models_sorted_by_id[::-1]]
+        )
+
+    def test_stream_drops_ordering_columns(self):
+        qs = self.qs.order_by(Lower('username'), F('id').desc(nulls_last=True))
+        rows = self.get_streamed_rows(qs, 'id')
+        self.assertEqual(
+            sorted(rows),
+            [(u.id,) for u in self.expected_models_sorted_by_id]
+        )
+        chunks = list(qs.stream('id', 'username', columnar=True))
+        self.assertEqual(len(chunks[0]), 2)
+
+    def test_stream_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            self.qs.stream(strategy='unknown')
+
+    def test_order_by_expression(self):
+        self.assertEqual(
+            list(self.qs.order_by(F('id').desc())),
+            self.expected_models_sorted_by_id[::-1]
+        )
+
+    def test_order_by_function(self):
+        self.assertEqual(
+            list(self.qs.order_by(Lower('username'), 'id')),
+            sorted(self.expected_models, key=lambda u: (u.username.lower(), u.id))
+        )
+
+    def test_order_by_annotation_expression(self):
+        qs = self.qs.annotate(length=Length('username'))
+        self.assertEqual(
+            list(qs.order_by(F('length').desc(), 'id')),
+            sorted(self.expected_models, key=lambda u: (-len(u.username), u.id))
+        )
+
+    def test_order_by_expression_with_nulls_last(self):
+        UserFactory.create()
+        User.objects.filter(id=self.user.id).update(last_login=datetime.datetime(2020, 1, 1))
+        qs = self.qs.order_by(F('last_login').asc(nulls_last=True), 'id')
+        self.assertEqual(qs.first(), self.user)
+        self.assertEqual(qs.reverse().last(), self.user)
+
+    def test_order_by_expression_with_nulls_first(self):
+        User.objects.filter(id=self.user.id).update(last_login=datetime.datetime(2020, 1, 1))
+        qs = self.qs.order_by(F('last_login').desc(nulls_first=True), 'id')
+        self.assertEqual(list(qs)[-1], self.user)
+
+    def test_order_by_expression_slice(self):
+        self.assertEqual(
+            list(self.qs.order_by(F('id').desc())[:1]),
+            self.expected_models_sorted_by_id[-1:]
+        )
+
+    def test_order_by_expression_does_not_add_attributes(self):
+        user = self.qs.order_by(Lower('username')).first()
+        self.assertFalse(
+            [name for name in vars(user) if name.startswith('delayed_union')]
+        )
+
+    def test_order_by_expression_values(self):
+        self.assertEqual(
+            list(self.qs.order_by(F('id').desc()).values('id')),
+            [{'id': u.id} for u in self.expected_models_sorted_by_id[::-1]]
+        )
+
+    def test_order_by_expression_values_list(self):
+        self.assertEqual(
+            list(self.qs.order_by(F('id').desc()).values_list('id', 'username')),
+            [(u.id, u.username) for u in self.expected_models_sorted_by_id[::-1]]
+        )
+
+    def test_order_by_expression_values_list_flat(self):
+        self.assertEqual(
+            list(self.qs.order_by(Lower('username')).values_list('id', flat=True)),
+            [u.id for u in sorted(self.expected_models, key=lambda u: u.username.lower())]
+        )
+
+    def test_order_by_expression_values_list_named(self):
+        row = self.qs.order_by(F('id').desc()).values_list('id', named=True)[0]
+        self.assertEqual(row._fields, ('id',))
+        self.assertEqual(row.id, self.expected_models_sorted_by_id[-1].id)
+
+    def test_dates(self):
+        self.assertEqual(
+            self.qs.dates('date_joined', 'day'),
+            sorted({u.date_joined.date() for u in self.expected_models})
+        )
+
+    def test_dates_descending(self):
+        self.assertEqual(
+            self.qs.dates('date_joined', 'month', order='DESC'),
+            sorted(
+                {u.date_joined.date().replace(day=1) for u in self.expected_models},
+                reverse=True
+            )
+        )
+
+    def test_dates_filtered(self):
+        self.assertEqual(self.qs.filter(id=self.bad_id).dates('date_joined', 'year'), [])
+
+    def test_datetimes(self):
+        self.assertEqual(
+            self.qs.datetimes('date_joined', 'hour'),
+            sorted({
+                u.date_joined.replace(minute=0, second=0, microsecond=0)
+                for u in self.expected_models
+            })
+        )
+
     def test_prefetch_related(self):
         for user in self.qs.prefetch_related('groups'):
             with self.assertNumQueries(0):
@@ -359,3 +543,141 @@ class DelayedQuerySetTestsMixin(abc.ABC):
     def test_count_with_select_related(self):
         qs = self.qs.select_related('user_profile')
         self.assertEqual(qs.count(), self.expected_count)
+
+    def test_count_with_values_list(self):
+        qs = self.qs.values_list('id', flat=True)
+        self.assertEqual(qs.count(), self.expected_count)
+
+    def test_count_approximate(self):
+        count = self.qs.count(approximate=True)
+        if connection.vendor in ('postgresql', 'mysql'):
+            self.assertIsInstance(count, int)
+        else:
+            self.assertEqual(count, self.expected_count)
+
+    def test_count_is_cached(self):
+        cache.clear()
+        self.assertEqual(self.qs.count(cache_timeout=60), self.expected_count)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.qs.count(cache_timeout=60), self.expected_count)
+
+    def test_count_cache_is_invalidated_on_save(self):
+        cache.clear()
+        self.qs.count(cache_timeout=60)
+        user = UserFactory.create()
+        with self.assertNumQueries(1):
+            self.qs.count(cache_timeout=60)
+        user.delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.qs.count(cache_timeout=60), self.expected_count)
+
+    def test_count_cache_is_invalidated_for_tracked_model(self):
+        # The count may have been cached by another process, so a save
+        # changes the version once the model is tracked, even if no counts
+        # were cached here.
+        cache.clear()
+        with mock.patch.dict(counting._versioned_models, clear=True):
+            track_counts(self.qs.model)
+            key = get_version_key(self.qs.model)
+            cache.set(key, 'other', None)
+            UserFactory.create()
+            self.assertNotEqual(cache.get(key), 'other')
+
+    def test_save_of_untracked_model_does_not_write_to_cache(self):
+        with mock.patch.dict(counting._versioned_models, clear=True):
+            with mock.patch.object(caches['default'], 'set') as cache_set:
+                UserFactory.create()
+        cache_set.assert_not_called()
+
+    def test_pickle(self):
+        qs = pickle.loads(pickle.dumps(self.qs.order_by('-id')))
+        self.assertEqual(list(qs), self.expected_models_sorted_by_id[::-1])
+
+    def test_pickle_does_not_evaluate(self):
+        with self.assertNumQueries(0):
+            pickle.dumps(self.qs)
+        self.assertIsNone(self.qs._applied)
+
+    def test_pickle_evaluated(self):
+        list(self.qs)
+        qs = pickle.loads(pickle.dumps(self.qs))
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                sorted(qs, key=lambda u: u.id),
+                self.expected_models_sorted_by_id
+            )
+
+    def test_pickle_values_list(self):
+        qs = pickle.loads(pickle.dumps(self.qs.values_list('id', flat=True)))
+        self.assertEqual(set(qs), self.expected_ids)
+
+    def test_pickle_preserves_filtering(self):
+        qs = pickle.loads(pickle.dumps(self.qs.filter(id=self.bad_id)))
+        self.assertFalse(qs.exists())
+
+    def test_deepcopy(self):
+        list(self.qs)
+        with self.assertNumQueries(0):
+            qs = copy.deepcopy(self.qs)
+        self.assertIsNot(qs, self.qs)
+        self.assertIsNone(qs._applied)
+        self.assertEqual(
+            sorted(qs, key=lambda u: u.id),
+            self.expected_models_sorted_by_id
+        )
+
+    def test_freeze(self):
+        frozen = self.qs.order_by('id').freeze()
+        self.assertEqual(list(frozen), self.expected_models_sorted_by_id)
+        self.assertEqual(frozen.count(), self.expected_count)
+        self.assertEqual(frozen[0], self.expected_models_sorted_by_id[0])
+        self.assertEqual(frozen.filter(id=self.bad_id).count(), 0)
+
+    def test_freeze_does_not_rebuild_query(self):
+        frozen = self.qs.freeze()
+        with mock.patch.object(type(self.qs), '_apply_operation') as apply_operation:
+            self.assertEqual(len(list(frozen)), self.expected_count)
+        apply_operation.assert_not_called()
+
+    def test_freeze_has_no_result_cache(self):
+        frozen = self.qs.freeze()
+        list(frozen)
+        with self.assertNumQueries(1):
+            list(frozen)
+        self.assertIsNot(frozen.thaw()._applied, frozen.thaw()._applied)
+
+    def test_freeze_is_immutable(self):
+        frozen = self.qs.freeze()
+        with self.assertRaises(AttributeError):
+            frozen._template = None
+        self.assertIs(frozen.freeze(), frozen)
+
+    def test_materialize(self):
+        with self.qs.order_by('-id').materialize() as materialized:
+            with self.assertNumQueries(1):
+                self.assertEqual(
+                    list(materialized),
+                    self.expected_models_sorted_by_id[::-1]
+                )
+            self.assertEqual(materialized.count(), self.expected_count)
+            self.assertEqual(
+                list(materialized[1:]),
+                self.expected_models_sorted_by_id[::-1][1:]
+            )
+            self.assertEqual(materialized.filter(id=self.bad_id).count(), 0)
+
+    def test_materialize_in_batches(self):
+        with self.qs.order_by('id').materialize(batch_size=1) as materialized:
+            self.assertEqual(list(materialized), self.expected_models_sorted_by_id)
+
+    def test_materialize_drops_table(self):
+        with self.qs.materialize() as materialized:
+            table = materialized.query.extra_tables[0]
+        with self.assertRaises(DatabaseError):
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT * FROM {}'.format(table))
+
+    def test_pickle_frozen(self):
+        frozen = pickle.loads(pickle.dumps(self.qs.order_by('-id').freeze()))
+        self.assertEqual(list(frozen), self.expected_models_sorted_by_id[::-1])
@@ -0,0 +1,53 @@
+"""
+A minimal stand-in for the parts of Django REST Framework's pagination
+module which are used by :mod:`django_delayed_union.pagination`.  It is
+only installed when Django REST Framework is not available.
+"""
+import sys
+import types
+
+from django.core.paginator import Paginator
+
+
+class PageNumberPagination(object):
+    django_paginator_class = Paginator
+    page_size = None
+    page_query_param = 'page'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        paginator = self.django_paginator_class(queryset, self.page_size)
+        page_number = request.query_params.get(self.page_query_param, 1)
+        self.page = paginator.page(page_number)
+        return list(self.page)
+
+
+class CursorPagination(object):
+    ordering = '-created'
+    page_size = None
+
+    def get_ordering(self, request, queryset, view):
+        if isinstance(self.ordering, str):
+            return (self.ordering,)
+        return tuple(self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = self.get_ordering(request, queryset, view)
+        queryset = queryset.order_by(*self.ordering)
+        return list(queryset[:self.page_size])
+
+
+def install():
+    """
+    Installs the stub as ``rest_framework.pagination`` unless Django
+    REST Framework is installed.
+    """
+    try:
+        import rest_framework.pagination  # noqa: F401
+    except ImportError:
+        package = types.ModuleType('rest_framework')
+        pagination = types.ModuleType('rest_framework.pagination')
+        pagination.PageNumberPagination = PageNumberPagination
+        pagination.CursorPagination = CursorPagination
+        package.pagination = pagination
+        sys.modules['rest_framework'] = package
+        sys.modules['rest_framework.pagination'] = pagination
@@ -4,6 +4,7 @@ SECRET_KEY = 'roverdotcom'
 INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.auth',
+    'django_delayed_union',
     'user_profile',
 ]
 ROOT_URLCONF = []
@@ -22,6 +23,7 @@ if TEST_DATABASE == 'mysql':
             'PORT': 33306,
         }
     }
+    DATABASES['other'] = dict(DATABASES['default'], NAME='otherdb')
 elif TEST_DATABASE == 'postgresql':
     DATABASES = {
         'default': {
@@ -33,9 +35,13 @@ elif TEST_DATABASE == 'postgresql':
             'PORT': 5432,
         }
     }
+    DATABASES['other'] = dict(DATABASES['default'], NAME='otherdb')
 else:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3'
-        }
+        },
+        'other': {
+            'ENGINE': 'django.db.backends.sqlite3'
+        },
     }
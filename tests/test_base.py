@@ -1,8 +1,43 @@
+import os
+import subprocess
+import sys
+from types import FunctionType
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
 from django.test import TestCase
 
 from django_delayed_union import DelayedUnionQuerySet
+from django_delayed_union.base import DelayedQuerySet
 from django_delayed_union.base import DelayedQuerySetBase
 from django_delayed_union.base import DelayedQuerySetDescriptor
+from django_delayed_union.base import DelayedQuerySetMethod
+from django_delayed_union.base import NotImplementedMethod
+from django_delayed_union.base import PassthroughMethod
+from django_delayed_union.base import PostApplyProperty
+
+
+class UserQuerySet(QuerySet):
+    def active(self):
+        return self.filter(is_active=True)
+
+
+class ExclaimMethod(DelayedQuerySetMethod):
+    def __call__(self, obj, value):
+        return '{}!'.format(value)
+
+    def get_base_docstring(self):
+        return ""
+
+
+class CustomDelayedUnionQuerySet(DelayedUnionQuerySet):
+    active = PassthroughMethod()
+    exclaim = ExclaimMethod()
+    distinct = NotImplementedMethod()
+
+    def filter(self, *args, **kwargs):
+        return super(CustomDelayedUnionQuerySet, self).filter(*args, **kwargs)
 
 
 class DelayedQuerySetBaseTests(TestCase):
@@ -16,8 +51,106 @@ class DelayedQuerySetBaseTests(TestCase):
         )
 
     def test_descriptors_have_names_set(self):
-        for name in dir(self.cls):
-            descriptor = getattr(self.cls, name)
-            if not isinstance(descriptor, DelayedQuerySetDescriptor):
-                continue
+        self.assertTrue(self.cls._descriptors)
+        for name, descriptor in self.cls._descriptors.items():
             self.assertEqual(descriptor.name, name)
+
+    def test_descriptors_are_replaced_with_methods(self):
+        self.assertIsInstance(self.cls.__dict__.get('update'), FunctionType)
+        for name in ('filter', 'count', '__iter__', 'create'):
+            method = getattr(self.cls, name)
+            self.assertIsInstance(method, FunctionType)
+            self.assertEqual(method.__name__, name)
+            self.assertEqual(
+                method.__doc__,
+                self.cls._descriptors[name].get_short_docstring()
+            )
+
+    def test_post_apply_properties_are_replaced_with_properties(self):
+        self.assertIsInstance(self.cls.query, property)
+        self.assertIsInstance(self.cls._descriptors['query'], PostApplyProperty)
+
+    def test_qualname(self):
+        self.assertEqual(
+            self.cls.filter.__qualname__,
+            'DelayedQuerySet.filter'
+        )
+
+    def test_instances_do_not_have_dict(self):
+        qs = self.cls(User.objects.all(), User.objects.all())
+        self.assertFalse(hasattr(qs, '__dict__'))
+
+
+class CustomDelayedQuerySetTests(TestCase):
+    def test_custom_passthrough_method(self):
+        qs = CustomDelayedUnionQuerySet(UserQuerySet(User), UserQuerySet(User))
+        active = qs.active()
+        self.assertIsInstance(active, CustomDelayedUnionQuerySet)
+        for queryset in active._querysets:
+            self.assertIn('is_active', str(queryset.query))
+
+    def test_custom_method_with_call(self):
+        qs = CustomDelayedUnionQuerySet(User.objects.all(), User.objects.all())
+        self.assertEqual(qs.exclaim('rover'), 'rover!')
+
+    def test_inherits_descriptors(self):
+        descriptors = CustomDelayedUnionQuerySet._descriptors
+        self.assertIs(
+            descriptors['exclude'],
+            DelayedUnionQuerySet._descriptors['exclude']
+        )
+        self.assertIn('active', descriptors)
+
+    def test_overridden_descriptors(self):
+        descriptors = CustomDelayedUnionQuerySet._descriptors
+        self.assertNotIn('filter', descriptors)
+        self.assertNotIn('distinct', DelayedUnionQuerySet._descriptors)
+        self.assertIsInstance(descriptors['distinct'], NotImplementedMethod)
+        qs = CustomDelayedUnionQuerySet(User.objects.all(), User.objects.all())
+        with self.assertRaises(NotImplementedError):
+            qs.distinct()
+
+
+class DescriptorDocstringTests(TestCase):
+    def make_class(self):
+        attrs = {
+            name: type(descriptor)()
+            for name, descriptor in DelayedQuerySet._descriptors.items()
+        }
+        attrs['__module__'] = __name__
+        return DelayedQuerySetBase(
+            'DocumentedDelayedQuerySet',
+            (DelayedUnionQuerySet,),
+            attrs
+        )
+
+    def test_class_creation_does_not_build_docstrings(self):
+        with mock.patch.object(DelayedQuerySetDescriptor, 'get_docstring') as get_docstring:
+            self.make_class()
+        get_docstring.assert_not_called()
+
+    def test_import_does_not_build_docstrings(self):
+        # The package is imported in a new interpreter since it has already
+        # been imported by the tests.
+        code = (
+            'from django_delayed_union.base import DelayedQuerySet\n'
+            'print(sum(\n'
+            '    "docstring" in descriptor.__dict__\n'
+            '    for descriptor in DelayedQuerySet._descriptors.values()\n'
+            '))\n'
+        )
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        output = subprocess.check_output([sys.executable, '-c', code], env=env)
+        self.assertEqual(output.strip(), b'0')
+
+    def test_docstring_is_computed_lazily(self):
+        descriptor = self.make_class()._descriptors['filter']
+        self.assertNotIn('docstring', descriptor.__dict__)
+        self.assertIn('Documentation for *filter*', descriptor.docstring)
+        self.assertIn('docstring', descriptor.__dict__)
+
+    def test_set_name_resets_docstring(self):
+        descriptor = PassthroughMethod('filter')
+        self.assertIn('*filter*', descriptor.docstring)
+        descriptor.set_name('exclude')
+        self.assertIn('*exclude*', descriptor.docstring)
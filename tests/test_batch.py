@@ -0,0 +1,100 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.test import TransactionTestCase
+
+from django_delayed_union import DelayedDifferenceQuerySet
+from django_delayed_union import DelayedIntersectionQuerySet
+from django_delayed_union import DelayedShardedUnionQuerySet
+from django_delayed_union import DelayedUnionQuerySet
+from django_delayed_union.batch import evaluate_many
+
+from .factories import UserFactory
+
+
+class EvaluateManyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(EvaluateManyTests, cls).setUpTestData()
+        cls.user_a, cls.user_b, cls.user_c = UserFactory.create_batch(3)
+
+    def setUp(self):
+        super(EvaluateManyTests, self).setUp()
+        self.first_two = User.objects.filter(id__in=[self.user_a.id, self.user_b.id])
+        self.last_two = User.objects.filter(id__in=[self.user_b.id, self.user_c.id])
+
+    def test_counts_and_exists_in_single_query(self):
+        union = DelayedUnionQuerySet(self.first_two, self.last_two)
+        union_all = DelayedUnionQuerySet(self.first_two, self.last_two, all=True)
+        intersection = DelayedIntersectionQuerySet(self.first_two, self.last_two)
+        difference = DelayedDifferenceQuerySet(self.first_two, self.last_two)
+        with self.assertNumQueries(1):
+            results = evaluate_many([
+                (union, 'count'),
+                (union_all, 'count'),
+                (intersection, 'count'),
+                (difference, 'exists'),
+                (difference.filter(id=self.user_c.id), 'exists'),
+                (self.first_two, 'count'),
+            ])
+        self.assertEqual(results, [3, 4, 1, True, False, 2])
+
+    def test_ordered_and_sliced_querysets(self):
+        union = DelayedUnionQuerySet(self.first_two, self.last_two).order_by('-id')
+        results = evaluate_many([
+            (union, 'count'),
+            (User.objects.order_by('id')[1:], 'count'),
+        ])
+        self.assertEqual(results, [3, User.objects.count() - 1])
+
+    def test_select_related(self):
+        union = DelayedUnionQuerySet(self.first_two, self.last_two)
+        with self.assertNumQueries(1) as context:
+            results = evaluate_many([
+                (union.select_related('user_profile'), 'count'),
+                (self.first_two.select_related('user_profile'), 'exists'),
+            ])
+        self.assertEqual(results, [3, True])
+        self.assertNotIn('user_profile', context.captured_queries[0]['sql'])
+
+    def test_empty_result_set(self):
+        union = DelayedUnionQuerySet(self.first_two.none(), self.last_two.none())
+        with self.assertNumQueries(0):
+            self.assertEqual(evaluate_many([(union, 'count'), (union, 'exists')]), [0, False])
+
+    def test_fills_result_cache_when_empty(self):
+        union = DelayedUnionQuerySet(self.first_two, self.last_two).filter(id=0)
+        self.assertEqual(evaluate_many([(union, 'exists')]), [False])
+        with self.assertNumQueries(0):
+            self.assertEqual(list(union), [])
+
+    def test_uses_result_cache(self):
+        union = DelayedUnionQuerySet(self.first_two, self.last_two)
+        list(union)
+        with self.assertNumQueries(0):
+            self.assertEqual(evaluate_many([(union, 'count')]), [3])
+
+    def test_unknown_operation(self):
+        with self.assertRaises(ValueError):
+            evaluate_many([(self.first_two, 'first')])
+
+
+class EvaluateManyMultipleDatabasesTests(TransactionTestCase):
+    databases = {'default', 'other'}
+
+    def test_queries_each_database_once(self):
+        UserFactory.build().save(using='other')
+        sharded = DelayedShardedUnionQuerySet(
+            User.objects.using('default').all(),
+            User.objects.using('other').all(),
+        )
+        # The sharded union is merged in Python, so it runs its own query on
+        # each database.
+        with self.assertNumQueries(2, using='default'), \
+                self.assertNumQueries(2, using='other'):
+            results = evaluate_many([
+                (User.objects.using('default'), 'exists'),
+                (User.objects.using('other'), 'count'),
+                (User.objects.using('other').filter(id=0), 'exists'),
+                (sharded, 'count'),
+            ])
+        self.assertEqual(results, [False, 1, False, 1])
@@ -19,7 +19,9 @@ class DelayedDifferenceQuerySetMetaTests(
 
 
 class DelayedDifferenceQuerySetTestsMixin(DelayedQuerySetTestsMixin):
-    pass
+    def test_dates_uses_single_query(self):
+        with self.assertNumQueries(1):
+            self.qs.dates('date_joined', 'day')
 
 
 @skip_for_mysql
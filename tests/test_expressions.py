@@ -0,0 +1,84 @@
+from django.contrib.auth.models import Permission
+from django.contrib.auth.models import User
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import F
+from django.db.models import Q
+from django.test import TestCase
+
+from django_delayed_union.expressions import MAX_IN_PARAMETERS
+from django_delayed_union.expressions import ValueList
+from django_delayed_union.expressions import factor_in_lookups
+
+from .factories import UserFactory
+
+
+class ValueListTests(TestCase):
+    def test_filter(self):
+        users = UserFactory.create_batch(3)
+        ids = [users[0].id, users[2].id, None, users[0].id]
+        self.assertEqual(
+            list(User.objects.filter(pk__in=ValueList(ids, User._meta.pk)).order_by('id')),
+            [users[0], users[2]]
+        )
+
+    def test_filter_on_text_field(self):
+        users = UserFactory.create_batch(2)
+        self.assertEqual(
+            list(User.objects.filter(
+                username__in=ValueList([users[1].username], User._meta.get_field('username'))
+            )),
+            [users[1]]
+        )
+
+    def test_empty(self):
+        UserFactory.create_batch(2)
+        empty = ValueList([None], User._meta.pk)
+        self.assertFalse(User.objects.filter(pk__in=empty).exists())
+        self.assertEqual(User.objects.exclude(pk__in=empty).count(), 2)
+        self.assertEqual(User.objects.exclude(pk__in=ValueList([], User._meta.pk)).count(), 2)
+
+    def test_empty_without_json(self):
+        with self.assertRaises(EmptyResultSet):
+            ValueList([None], User._meta.pk).as_sql(None, connection)
+
+
+class FactorInLookupsTests(TestCase):
+    def setUp(self):
+        super(FactorInLookupsTests, self).setUp()
+        self.many = list(range(MAX_IN_PARAMETERS + 1))
+
+    def test_replaces_large_in_lookups(self):
+        _, kwargs = factor_in_lookups(User.objects.all(), (), {'id__in': self.many})
+        self.assertIsInstance(kwargs['id__in'], ValueList)
+        self.assertEqual(kwargs['id__in'].output_field, User._meta.pk)
+
+    def test_keeps_small_in_lookups(self):
+        _, kwargs = factor_in_lookups(User.objects.all(), (), {'id__in': [1, 2]})
+        self.assertEqual(kwargs, {'id__in': [1, 2]})
+
+    def test_uses_target_field_of_relations(self):
+        _, kwargs = factor_in_lookups(
+            Permission.objects.all(),
+            (),
+            {'content_type__in': self.many}
+        )
+        self.assertEqual(kwargs['content_type__in'].output_field.model.__name__, 'ContentType')
+
+    def test_replaces_lookups_on_annotations(self):
+        user = UserFactory.create()
+        qs = User.objects.annotate(other_id=F('id'))
+        _, kwargs = factor_in_lookups(qs, (), {'other_id__in': self.many + [user.id]})
+        self.assertEqual(list(qs.filter(**kwargs)), [user])
+
+    def test_keeps_lookups_with_transforms(self):
+        _, kwargs = factor_in_lookups(User.objects.all(), (), {'date_joined__year__in': self.many})
+        self.assertIs(kwargs['date_joined__year__in'], self.many)
+
+    def test_replaces_lookups_in_q_objects(self):
+        q = Q(username='a') | Q(id__in=self.many)
+        (factored,), _ = factor_in_lookups(User.objects.all(), (q,), {})
+        self.assertEqual(factored.connector, Q.OR)
+        self.assertEqual(factored.children[0], ('username', 'a'))
+        self.assertIsInstance(factored.children[1][1], ValueList)
+        self.assertIs(q.children[1][1], self.many)
@@ -0,0 +1,126 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.test import TestCase
+from user_profile.models import Post
+
+from django_delayed_union.heterogeneous import DelayedHeterogeneousUnionQuerySet
+
+from .factories import UserFactory
+
+
+class DelayedHeterogeneousUnionQuerySetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(DelayedHeterogeneousUnionQuerySetTests, cls).setUpTestData()
+        start = datetime.datetime(2020, 1, 1)
+        cls.user = UserFactory.create(date_joined=start)
+        cls.other_user = UserFactory.create(
+            date_joined=start + datetime.timedelta(days=3)
+        )
+        cls.posts = [
+            Post.objects.create(
+                user=cls.user,
+                title='Post {}'.format(days),
+                created=start + datetime.timedelta(days=days)
+            )
+            for days in (1, 2, 4)
+        ]
+
+    def get_queryset(self, **kwargs):
+        return DelayedHeterogeneousUnionQuerySet(
+            User.objects.annotate(created=F('date_joined')),
+            Post.objects.all(),
+            fields=['created'],
+            **kwargs
+        )
+
+    def test_hydrates_each_model(self):
+        with self.assertNumQueries(1):
+            feed = list(self.get_queryset().order_by('created'))
+        self.assertEqual(
+            feed,
+            [
+                self.user,
+                self.posts[0],
+                self.posts[1],
+                self.other_user,
+                self.posts[2],
+            ]
+        )
+        self.assertIsInstance(feed[0], User)
+        self.assertIsInstance(feed[1], Post)
+
+    def test_projected_fields_are_loaded(self):
+        feed = list(self.get_queryset().order_by('-created'))
+        with self.assertNumQueries(0):
+            self.assertEqual(feed[0].created, self.posts[2].created)
+            self.assertEqual(feed[1].created, self.other_user.date_joined)
+
+    def test_other_fields_are_deferred(self):
+        post = self.get_queryset().order_by('-created')[0]
+        self.assertEqual(post.get_deferred_fields(), {'user_id', 'title'})
+        self.assertEqual(post.title, 'Post 4')
+
+    def test_load(self):
+        qs = self.get_queryset(load=True).order_by('-created')
+        with self.assertNumQueries(3):
+            feed = list(qs)
+            self.assertEqual(feed[0].title, 'Post 4')
+            self.assertEqual(feed[1].username, self.other_user.username)
+            self.assertEqual(feed[1].created, self.other_user.date_joined)
+
+    def test_load_applies_select_related(self):
+        qs = DelayedHeterogeneousUnionQuerySet(
+            Post.objects.select_related('user'),
+            User.objects.annotate(created=F('date_joined')),
+            fields=['created'],
+            load=True
+        ).order_by('created')
+        feed = list(qs)
+        with self.assertNumQueries(0):
+            self.assertEqual(feed[1].user, self.user)
+
+    def test_filter_and_slice(self):
+        qs = self.get_queryset().filter(
+            created__gte=datetime.datetime(2020, 1, 3)
+        ).order_by('created')
+        self.assertEqual(list(qs[1:]), [self.other_user, self.posts[2]])
+
+    def test_reverse(self):
+        qs = self.get_queryset().order_by('created').reverse()
+        self.assertEqual(qs.first(), self.posts[2])
+
+    def test_count(self):
+        self.assertEqual(self.get_queryset().count(), 5)
+
+    def test_union_all_is_default(self):
+        qs = DelayedHeterogeneousUnionQuerySet(
+            Post.objects.all(),
+            Post.objects.all(),
+        )
+        self.assertEqual(qs.count(), 6)
+
+    def test_distinct_keeps_rows_from_different_querysets(self):
+        qs = DelayedHeterogeneousUnionQuerySet(
+            Post.objects.all(),
+            Post.objects.all(),
+        ).distinct()
+        self.assertEqual(qs.count(), 6)
+
+    def test_ordering_by_unprojected_field_is_not_supported(self):
+        with self.assertRaises(ValueError):
+            list(self.get_queryset().order_by('title'))
+
+    def test_with_branch_label_is_not_supported(self):
+        with self.assertRaises(NotImplementedError):
+            self.get_queryset().with_branch_label()
+
+    def test_interleave_is_not_supported(self):
+        with self.assertRaises(NotImplementedError):
+            self.get_queryset().interleave(2, 'created')
+
+    def test_materialize_is_not_supported(self):
+        with self.assertRaises(NotImplementedError):
+            self.get_queryset().materialize()
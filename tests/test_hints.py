@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+
+from django_delayed_union import DelayedIntersectionQuerySet
+from django_delayed_union import DelayedUnionQuerySet
+from django_delayed_union.hints import ForceIndex
+from django_delayed_union.hints import OptimizerHint
+from django_delayed_union.hints import UseIndex
+from django_delayed_union.hints import add_hints
+from django_delayed_union.hints import get_hints
+
+from .factories import UserFactory
+
+
+class AddHintsTests(TestCase):
+    def test_optimizer_hint(self):
+        qs = add_hints(User.objects.all(), OptimizerHint('MAX_EXECUTION_TIME(100)'))
+        self.assertTrue(str(qs.query).startswith('SELECT /*+ MAX_EXECUTION_TIME(100) */ '))
+
+    def test_does_not_change_queryset(self):
+        qs = User.objects.all()
+        add_hints(qs, OptimizerHint('X'))
+        self.assertEqual(get_hints(qs), ())
+        self.assertNotIn('/*+', str(qs.query))
+
+    def test_kept_after_chaining(self):
+        hint = OptimizerHint('X')
+        qs = add_hints(User.objects.all(), hint).filter(is_staff=True).values('id')
+        self.assertEqual(get_hints(qs), (hint,))
+        self.assertIn('/*+ X */', str(qs.query))
+
+    def test_index_hint_on_mysql(self):
+        qs = add_hints(User.objects.all(), UseIndex('a', 'b'), ForceIndex('c'))
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            sql = str(qs.query)
+        self.assertIn(
+            'FROM {} USE INDEX ({}, {}) FORCE INDEX ({})'.format(
+                *map(connection.ops.quote_name, ['auth_user', 'a', 'b', 'c'])
+            ),
+            sql
+        )
+
+    def test_index_hint_ignored_on_other_databases(self):
+        qs = add_hints(User.objects.all(), UseIndex('a'))
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            self.assertNotIn('INDEX', str(qs.query))
+
+    def test_invalid_hints(self):
+        with self.assertRaises(ValueError):
+            OptimizerHint('X */ DROP TABLE auth_user; /*')
+        with self.assertRaises(ValueError):
+            UseIndex()
+        with self.assertRaises(TypeError):
+            add_hints(User.objects.all(), 'USE INDEX (a)')
+
+
+class DelayedQuerySetHintTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(DelayedQuerySetHintTests, cls).setUpTestData()
+        cls.staff = UserFactory.create(is_staff=True)
+        cls.user = UserFactory.create(username='user')
+
+    def get_queryset(self):
+        return DelayedUnionQuerySet(
+            User.objects.filter(is_staff=True),
+            User.objects.filter(username='user'),
+        ).hint(0, OptimizerHint('first')).hint(1, OptimizerHint('second'))
+
+    def test_hints_each_branch(self):
+        sql = str(self.get_queryset()._apply().query)
+        self.assertEqual(sql.count('SELECT /*+ first */ '), 1)
+        self.assertEqual(sql.count('SELECT /*+ second */ '), 1)
+        self.assertLess(sql.index('first'), sql.index('second'))
+
+    def test_kept_after_passthrough_and_clone(self):
+        qs = self.get_queryset().filter(is_active=True).order_by('id')._clone()
+        self.assertEqual(get_hints(qs._querysets[1]), (OptimizerHint('second'),))
+        self.assertIn('/*+ second */', str(qs._apply().query))
+
+    def test_results(self):
+        qs = self.get_queryset().order_by('id')
+        self.assertEqual(list(qs), [self.staff, self.user])
+        self.assertEqual(qs.count(), 2)
+
+    def test_subquery(self):
+        qs = User.objects.filter(id__in=self.get_queryset())
+        self.assertIn('/*+ second */', str(qs.query))
+        self.assertEqual(qs.count(), 2)
+
+    def test_intersection(self):
+        qs = DelayedIntersectionQuerySet(
+            User.objects.all(),
+            User.objects.filter(is_staff=True),
+        ).hint(1, OptimizerHint('staff'))
+        self.assertEqual(list(qs), [self.staff])
+
+    def test_negative_index(self):
+        qs = self.get_queryset().hint(-1, OptimizerHint('third'))
+        self.assertEqual(
+            get_hints(qs._querysets[1]),
+            (OptimizerHint('second'), OptimizerHint('third'))
+        )
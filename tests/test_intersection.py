@@ -20,6 +20,10 @@ class DelayedIntersectionQuerySetMetaTests(
 
 @skip_for_mysql
 class DelayedIntersectionQuerySetTestsMixin(DelayedQuerySetTestsMixin):
+    def test_dates_uses_single_query(self):
+        with self.assertNumQueries(1):
+            self.qs.dates('date_joined', 'day')
+
     def test_select_related(self):
         base_qs = Permission.objects.all()
         qs = DelayedIntersectionQuerySet(base_qs, base_qs)
@@ -0,0 +1,100 @@
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import TestCase
+
+from django_delayed_union import DelayedUnionQuerySet
+from django_delayed_union.memo import MemoizeMiddleware
+from django_delayed_union.memo import memoize
+
+from .factories import UserFactory
+
+
+class MemoizeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(MemoizeTests, cls).setUpTestData()
+        cls.user_a, cls.user_b = UserFactory.create_batch(2)
+
+    def get_queryset(self):
+        return DelayedUnionQuerySet(
+            User.objects.filter(id=self.user_a.id),
+            User.objects.filter(id=self.user_b.id),
+        ).order_by('id')
+
+    def test_iter(self):
+        with memoize():
+            with self.assertNumQueries(1):
+                first = list(self.get_queryset())
+                second = list(self.get_queryset())
+        self.assertEqual(first, [self.user_a, self.user_b])
+        self.assertEqual(second, first)
+        self.assertIsNot(second[0], first[0])
+
+    def test_values(self):
+        with memoize():
+            with self.assertNumQueries(2):
+                users = list(self.get_queryset())
+                ids = list(self.get_queryset().values_list('id', flat=True))
+                self.assertEqual(list(self.get_queryset().values_list('id', flat=True)), ids)
+        self.assertEqual(ids, [user.id for user in users])
+
+    def test_count_exists_and_first(self):
+        with memoize():
+            with self.assertNumQueries(3):
+                for _ in range(2):
+                    self.assertEqual(self.get_queryset().count(), 2)
+                    self.assertTrue(self.get_queryset().exists())
+                    self.assertEqual(self.get_queryset().first(), self.user_a)
+
+    def test_first_returns_copies(self):
+        with memoize():
+            user = self.get_queryset().first()
+            user.username = 'changed'
+            self.assertEqual(
+                self.get_queryset().first().username,
+                self.user_a.username
+            )
+
+    def test_different_filters(self):
+        with memoize():
+            with self.assertNumQueries(2):
+                self.assertEqual(self.get_queryset().count(), 2)
+                self.assertEqual(self.get_queryset().filter(id=self.user_a.id).count(), 1)
+
+    def test_cleared_after_write(self):
+        with memoize():
+            self.assertEqual(self.get_queryset().count(), 2)
+            User.objects.filter(id=self.user_b.id).delete()
+            with self.assertNumQueries(1):
+                self.assertEqual(self.get_queryset().count(), 1)
+
+    def test_cleared_after_update(self):
+        with memoize():
+            self.assertEqual(self.get_queryset().first().first_name, self.user_a.first_name)
+            User.objects.filter(id=self.user_a.id).update(first_name='Rover')
+            self.assertEqual(self.get_queryset().first().first_name, 'Rover')
+
+    def test_nested(self):
+        with memoize():
+            self.get_queryset().count()
+            with memoize():
+                with self.assertNumQueries(0):
+                    self.get_queryset().count()
+
+    def test_not_memoized_outside_context(self):
+        with memoize():
+            self.get_queryset().count()
+        with self.assertNumQueries(2):
+            self.get_queryset().count()
+            self.get_queryset().count()
+
+    def test_middleware(self):
+        def view(request):
+            return HttpResponse(str(
+                self.get_queryset().count() + self.get_queryset().count()
+            ))
+
+        middleware = MemoizeMiddleware(view)
+        with self.assertNumQueries(1):
+            response = middleware(None)
+        self.assertEqual(response.content, b'4')
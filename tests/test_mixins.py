@@ -0,0 +1,139 @@
+from django.contrib.auth.models import Group
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.db.models import QuerySet
+from django.test import TestCase
+
+from django_delayed_union import DelayedQuerySetMixin
+from django_delayed_union import DelayedUnionQuerySet
+from django_delayed_union.mixins import is_condition_indexed
+from django_delayed_union.mixins import split_disjunction
+
+from .factories import UserFactory
+
+
+class UserQuerySet(DelayedQuerySetMixin, QuerySet):
+    pass
+
+
+class SplitDisjunctionTests(TestCase):
+    def test_top_level_or(self):
+        shared, disjuncts = split_disjunction(Q(a=1) | Q(b=2, c=3))
+        self.assertEqual(shared, [])
+        self.assertEqual(disjuncts, [Q(a=1), Q(b=2, c=3)])
+
+    def test_and_with_or(self):
+        shared, disjuncts = split_disjunction(Q(a=1) & (Q(b=2) | Q(c=3)))
+        self.assertEqual(shared, [Q(a=1)])
+        self.assertEqual(disjuncts, [Q(b=2), Q(c=3)])
+
+    def test_no_disjunction(self):
+        q = Q(a=1, b=2)
+        self.assertEqual(split_disjunction(q), ([], [q]))
+
+    def test_negated_disjunction(self):
+        q = ~(Q(a=1) | Q(b=2))
+        self.assertEqual(split_disjunction(q), ([], [q]))
+
+
+class IsConditionIndexedTests(TestCase):
+    def assertIndexed(self, condition):
+        self.assertTrue(is_condition_indexed(User, condition))
+
+    def assertNotIndexed(self, condition):
+        self.assertFalse(is_condition_indexed(User, condition))
+
+    def test_primary_key(self):
+        self.assertIndexed(('pk', 1))
+        self.assertIndexed(('id__in', [1, 2]))
+
+    def test_unique_field(self):
+        self.assertIndexed(('username', 'rover'))
+        self.assertIndexed(('username__startswith', 'rover'))
+
+    def test_unindexed_field(self):
+        self.assertNotIndexed(('email', 'rover@rover.com'))
+
+    def test_unindexable_lookup(self):
+        self.assertNotIndexed(('username__icontains', 'rover'))
+
+    def test_relation(self):
+        self.assertIndexed(('groups', 1))
+        self.assertIndexed(('groups__name', 'dogs'))
+        self.assertNotIndexed(('groups__permissions__codename', 'bark'))
+
+    def test_and(self):
+        self.assertIndexed(Q(username='rover', email='rover@rover.com'))
+
+    def test_or(self):
+        self.assertNotIndexed(Q(username='rover') | Q(email='rover@rover.com'))
+
+    def test_negated(self):
+        self.assertNotIndexed(~Q(username='rover'))
+
+
+class DelayedQuerySetMixinTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(DelayedQuerySetMixinTests, cls).setUpTestData()
+        cls.group = Group.objects.create(name='dogs')
+        cls.user_a, cls.user_b, cls.user_c = UserFactory.create_batch(3)
+        cls.user_b.groups.add(cls.group)
+        cls.qs = UserQuerySet(User)
+
+    def test_split_or(self):
+        qs = self.qs.split_or(
+            Q(username=self.user_a.username) | Q(groups=self.group)
+        )
+        self.assertIsInstance(qs, DelayedUnionQuerySet)
+        self.assertEqual(len(qs._querysets), 2)
+        self.assertEqual(list(qs.order_by('id')), [self.user_a, self.user_b])
+
+    def test_split_or_keeps_shared_conditions(self):
+        qs = self.qs.split_or(
+            Q(is_active=True),
+            Q(id=self.user_a.id) | Q(id=self.user_b.id),
+        )
+        self.assertEqual(len(qs._querysets), 2)
+        for queryset in qs._querysets:
+            self.assertIn('is_active', str(queryset.query))
+
+    def test_split_or_keeps_existing_filters(self):
+        qs = self.qs.exclude(id=self.user_a.id).split_or(
+            id=self.user_a.id
+        )
+        self.assertFalse(qs.exists())
+
+    def test_split_or_with_kwargs(self):
+        qs = self.qs.split_or(
+            Q(id=self.user_a.id) | Q(id=self.user_c.id),
+            is_active=True
+        )
+        self.assertEqual(list(qs.order_by('id')), [self.user_a, self.user_c])
+
+    def test_split_or_deduplicates(self):
+        qs = self.qs.split_or(Q(id=self.user_a.id) | Q(username=self.user_a.username))
+        self.assertEqual(qs.count(), 1)
+
+    def test_split_or_all(self):
+        qs = self.qs.split_or(
+            Q(id=self.user_a.id) | Q(username=self.user_a.username),
+            all=True
+        )
+        self.assertEqual(qs.count(), 2)
+
+    def test_split_or_indexed_only(self):
+        qs = self.qs.split_or(
+            Q(id=self.user_a.id) |
+            Q(email=self.user_b.email) |
+            Q(first_name=self.user_c.first_name),
+            indexed_only=True
+        )
+        self.assertEqual(len(qs._querysets), 2)
+        self.assertEqual(
+            list(qs.order_by('id')),
+            [self.user_a, self.user_b, self.user_c]
+        )
+
+    def test_split_or_on_manager(self):
+        self.assertTrue(hasattr(UserQuerySet.as_manager(), 'split_or'))
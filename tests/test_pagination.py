@@ -0,0 +1,121 @@
+import importlib
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.test import TestCase
+
+from django_delayed_union import DelayedUnionQuerySet
+
+from . import rest_framework_stub
+from .factories import UserFactory
+
+
+class Request(object):
+    def __init__(self, **query_params):
+        self.query_params = query_params
+
+
+class DelayedPaginationTestsMixin(object):
+    @classmethod
+    def setUpClass(cls):
+        super(DelayedPaginationTestsMixin, cls).setUpClass()
+        rest_framework_stub.install()
+        cls.pagination_module = importlib.import_module(
+            'django_delayed_union.pagination'
+        )
+
+    @classmethod
+    def setUpTestData(cls):
+        super(DelayedPaginationTestsMixin, cls).setUpTestData()
+        cls.users = UserFactory.create_batch(5)
+
+    def setUp(self):
+        super(DelayedPaginationTestsMixin, self).setUp()
+        cache.clear()
+        self.qs = DelayedUnionQuerySet(
+            User.objects.filter(id__lte=self.users[2].id),
+            User.objects.filter(id__gte=self.users[1].id),
+        )
+
+
+class DelayedPageNumberPaginationTests(DelayedPaginationTestsMixin, TestCase):
+    def get_pagination(self, **attrs):
+        pagination = self.pagination_module.DelayedPageNumberPagination()
+        pagination.page_size = 2
+        for key, value in attrs.items():
+            setattr(pagination, key, value)
+        return pagination
+
+    def test_paginate_queryset_in_single_query(self):
+        pagination = self.get_pagination()
+        with self.assertNumQueries(1):
+            results = pagination.paginate_queryset(
+                self.qs.order_by('id'),
+                Request(page='2')
+            )
+            self.assertEqual(results, self.users[2:4])
+            self.assertEqual(pagination.page.paginator.count, 5)
+
+    def test_count_cache_timeout(self):
+        self.get_pagination(count_cache_timeout=60).paginate_queryset(
+            self.qs.order_by('id'),
+            Request(page='1')
+        )
+        pagination = self.get_pagination(count_cache_timeout=60)
+        pagination.paginate_queryset(self.qs.order_by('id'), Request(page='3'))
+        with self.assertNumQueries(0):
+            self.assertEqual(pagination.page.paginator.count, 5)
+
+
+class DelayedCursorPaginationTests(DelayedPaginationTestsMixin, TestCase):
+    def setUp(self):
+        super(DelayedCursorPaginationTests, self).setUp()
+        self.pagination = self.pagination_module.DelayedCursorPagination()
+        self.pagination.ordering = 'id'
+        self.pagination.page_size = 2
+
+    def test_get_ordering_uses_delayed_ordering(self):
+        self.assertEqual(
+            self.pagination.get_ordering(Request(), self.qs.order_by('-id'), None),
+            ('-id',)
+        )
+
+    def test_get_ordering_with_reversed_delayed_ordering(self):
+        self.assertEqual(
+            self.pagination.get_ordering(
+                Request(),
+                self.qs.order_by('-id', 'username').reverse(),
+                None
+            ),
+            ('id', '-username')
+        )
+
+    def test_get_ordering_with_expressions(self):
+        qs = self.qs.order_by(F('username').desc(), F('id'))
+        self.assertEqual(
+            self.pagination.get_ordering(Request(), qs, None),
+            ('-username', 'id')
+        )
+        self.assertEqual(
+            self.pagination.get_ordering(Request(), qs.reverse(), None),
+            ('username', '-id')
+        )
+
+    def test_get_ordering_rejects_other_expressions(self):
+        for ordering in (Lower('username').asc(), F('last_login').asc(nulls_first=True)):
+            with self.assertRaises(ValueError):
+                self.pagination.get_ordering(Request(), self.qs.order_by(ordering), None)
+
+    def test_get_ordering_falls_back_to_ordering(self):
+        self.assertEqual(
+            self.pagination.get_ordering(Request(), self.qs, None),
+            ('id',)
+        )
+
+    def test_paginate_queryset(self):
+        self.assertEqual(
+            self.pagination.paginate_queryset(self.qs.order_by('-id'), Request()),
+            self.users[:-3:-1]
+        )
@@ -0,0 +1,120 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.core.paginator import PageNotAnInteger
+from django.test import TestCase
+
+from django_delayed_union import DelayedUnionQuerySet
+from django_delayed_union.paginator import DelayedPaginator
+
+from .factories import UserFactory
+
+
+class DelayedPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(DelayedPaginatorTests, cls).setUpTestData()
+        cls.users = UserFactory.create_batch(7)
+
+    def setUp(self):
+        super(DelayedPaginatorTests, self).setUp()
+        cache.clear()
+        self.qs = DelayedUnionQuerySet(
+            User.objects.filter(id__lte=self.users[3].id),
+            User.objects.filter(id__gte=self.users[2].id),
+        ).order_by('-id')
+        self.expected = self.users[::-1]
+
+    def test_page_fetches_count_in_single_query(self):
+        paginator = DelayedPaginator(self.qs, 3)
+        with self.assertNumQueries(1):
+            page = paginator.page(2)
+            self.assertEqual(list(page), self.expected[3:6])
+            self.assertEqual(paginator.count, 7)
+            self.assertEqual(paginator.num_pages, 3)
+            self.assertTrue(page.has_next())
+
+    def test_page_does_not_include_count_attribute(self):
+        page = DelayedPaginator(self.qs, 3).page(1)
+        self.assertFalse(hasattr(page[0], 'delayed_union_count'))
+
+    def test_last_page_with_orphans(self):
+        paginator = DelayedPaginator(self.qs, 3, orphans=1)
+        with self.assertNumQueries(1):
+            page = paginator.page(2)
+            self.assertEqual(list(page), self.expected[3:])
+            self.assertEqual(paginator.num_pages, 2)
+
+    def test_page_out_of_range(self):
+        paginator = DelayedPaginator(self.qs, 3)
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+
+    def test_page_not_an_integer(self):
+        with self.assertRaises(PageNotAnInteger):
+            DelayedPaginator(self.qs, 3).page('a')
+
+    def test_page_with_known_count(self):
+        paginator = DelayedPaginator(self.qs, 3)
+        self.assertEqual(paginator.count, 7)
+        with self.assertNumQueries(1):
+            self.assertEqual(list(paginator.page(3)), self.expected[6:])
+
+    def test_page_with_select_related(self):
+        paginator = DelayedPaginator(self.qs.select_related('user_profile'), 3)
+        with self.assertNumQueries(2):
+            self.assertEqual(list(paginator.page(1)), self.expected[:3])
+
+    def test_page_with_values(self):
+        paginator = DelayedPaginator(self.qs.values_list('id', flat=True), 3)
+        self.assertEqual(
+            list(paginator.page(1)),
+            [u.id for u in self.expected[:3]]
+        )
+
+    def test_page_with_querysets(self):
+        paginator = DelayedPaginator(User.objects.order_by('id'), 3)
+        self.assertEqual(list(paginator.page(1)), self.users[:3])
+        self.assertEqual(paginator.count, 7)
+
+    def test_count_is_cached(self):
+        self.assertEqual(
+            DelayedPaginator(self.qs, 3, count_cache_timeout=60).count,
+            7
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                DelayedPaginator(self.qs, 3, count_cache_timeout=60).count,
+                7
+            )
+
+    def test_count_from_page_is_cached(self):
+        DelayedPaginator(self.qs, 3, count_cache_timeout=60).page(1)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                DelayedPaginator(self.qs, 3, count_cache_timeout=60).count,
+                7
+            )
+
+    def test_page_uses_cached_count(self):
+        DelayedPaginator(self.qs, 3, count_cache_timeout=60).page(1)
+        paginator = DelayedPaginator(self.qs, 3, count_cache_timeout=60)
+        with self.assertNumQueries(1) as context:
+            page = paginator.page(2)
+            self.assertEqual(list(page), self.expected[3:6])
+            self.assertEqual(paginator.count, 7)
+        self.assertNotIn('OVER', context.captured_queries[0]['sql'])
+
+    def test_count_is_cached_per_query(self):
+        DelayedPaginator(self.qs, 3, count_cache_timeout=60).page(1)
+        paginator = DelayedPaginator(
+            self.qs.filter(id=self.users[0].id),
+            3,
+            count_cache_timeout=60
+        )
+        self.assertEqual(paginator.count, 1)
+
+    def test_count_is_not_cached_by_default(self):
+        DelayedPaginator(self.qs, 3).count
+        with self.assertNumQueries(1):
+            DelayedPaginator(self.qs, 3).count
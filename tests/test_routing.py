@@ -0,0 +1,147 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase
+from django.test import override_settings
+
+from django_delayed_union import DelayedShardedUnionQuerySet
+from django_delayed_union import DelayedUnionQuerySet
+from django_delayed_union import base
+from django_delayed_union.routing import BRANCH_HINT
+from django_delayed_union.routing import ReadYourWritesMiddleware
+from django_delayed_union.routing import read_your_writes
+
+from .factories import UserFactory
+
+
+class ReplicaRouter(object):
+    """
+    Reads from the ``'other'`` database, or from the database for the
+    branch, and writes to ``'default'``.
+    """
+    def db_for_read(self, model, **hints):
+        branch = hints.get(BRANCH_HINT)
+        if branch is not None:
+            return ['default', 'other'][branch % 2]
+        return 'other'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+
+@override_settings(DATABASE_ROUTERS=[ReplicaRouter()])
+class RoutingTests(TestCase):
+    databases = {'default', 'other'}
+
+    @classmethod
+    def setUpTestData(cls):
+        super(RoutingTests, cls).setUpTestData()
+        cls.primary_user = UserFactory.build(username='primary')
+        cls.primary_user.save(using='default')
+        cls.replica_user = UserFactory.build(
+            username='replica',
+            id=cls.primary_user.id + 1
+        )
+        cls.replica_user.save(using='other')
+
+    def get_queryset(self):
+        return DelayedUnionQuerySet(
+            User.objects.filter(username='primary'),
+            User.objects.filter(username='replica'),
+        )
+
+    def get_usernames(self, qs):
+        return sorted(user.username for user in qs)
+
+    def test_reads_from_replica(self):
+        with self.assertNumQueries(0, using='default'), \
+                self.assertNumQueries(1, using='other'):
+            self.assertEqual(self.get_usernames(self.get_queryset()), ['replica'])
+
+    def test_using_is_kept(self):
+        qs = self.get_queryset().using('default')
+        self.assertEqual(self.get_usernames(qs), ['primary'])
+
+    def test_create_writes_to_primary(self):
+        self.get_queryset().create(username='created')
+        self.assertTrue(User.objects.using('default').filter(username='created').exists())
+        self.assertFalse(User.objects.using('other').filter(username='created').exists())
+
+    def test_update_writes_to_primary(self):
+        self.assertEqual(self.get_queryset().update(first_name='Rover'), 1)
+        self.assertEqual(User.objects.using('default').get(username='primary').first_name, 'Rover')
+
+    def test_read_your_writes_after_update(self):
+        with read_your_writes():
+            self.get_queryset().update(first_name='Rover')
+            self.assertEqual(self.get_usernames(self.get_queryset()), ['primary'])
+        self.assertEqual(self.get_usernames(self.get_queryset()), ['replica'])
+
+    def test_read_your_writes_after_create(self):
+        with read_your_writes():
+            self.assertEqual(self.get_usernames(self.get_queryset()), ['replica'])
+            self.get_queryset().create(username='created')
+            self.assertEqual(self.get_usernames(self.get_queryset()), ['primary'])
+
+    def test_not_pinned_without_write(self):
+        with read_your_writes():
+            self.assertEqual(self.get_usernames(self.get_queryset()), ['replica'])
+
+    def test_select_for_update_uses_primary(self):
+        qs = self.get_queryset().select_for_update()
+        self.assertEqual(qs.db, 'default')
+        self.assertEqual(self.get_usernames(qs), ['primary'])
+
+    def test_select_for_update_with_exists_subquery(self):
+        strategies = {connection.vendor: 'exists'}
+        with mock.patch.dict(base.SEMI_JOIN_STRATEGIES, strategies):
+            qs = self.get_queryset().select_for_update()
+            self.assertEqual(self.get_usernames(qs), ['primary'])
+
+    def test_materialize_uses_primary(self):
+        with self.assertNumQueries(0, using='other'):
+            with self.get_queryset().materialize() as materialized:
+                self.assertEqual(self.get_usernames(materialized), ['primary'])
+
+    def test_sharded_routes_each_branch(self):
+        qs = DelayedShardedUnionQuerySet(
+            User.objects.filter(username='primary'),
+            User.objects.filter(username='replica'),
+        )
+        with self.assertNumQueries(1, using='default'), \
+                self.assertNumQueries(1, using='other'):
+            self.assertEqual(self.get_usernames(qs), ['primary', 'replica'])
+
+    def get_replicated_queryset(self, **kwargs):
+        # The same row on both databases, as on a primary and its replica.
+        user = UserFactory.build(username='replicated', id=1000)
+        user.save(using='default')
+        user.save(using='other', force_insert=True)
+        return DelayedShardedUnionQuerySet(
+            User.objects.filter(username='replicated'),
+            User.objects.filter(id=1000),
+            **kwargs
+        )
+
+    def test_sharded_removes_duplicates_across_replicas(self):
+        qs = self.get_replicated_queryset()
+        self.assertEqual(qs.count(), 1)
+        self.assertEqual(self.get_usernames(qs), ['replicated'])
+        self.assertEqual(list(qs.values_list('username', flat=True)), ['replicated'])
+        rows = [row for rows in qs.order_by('id').stream('id') for row in rows]
+        self.assertEqual(rows, [(1000,)])
+
+    def test_sharded_keeps_duplicates_with_all(self):
+        qs = self.get_replicated_queryset(all=True)
+        self.assertEqual(qs.count(), 2)
+        self.assertEqual(self.get_usernames(qs), ['replicated', 'replicated'])
+
+    def test_middleware(self):
+        def view(request):
+            self.get_queryset().update(first_name='Rover')
+            return HttpResponse(' '.join(self.get_usernames(self.get_queryset())))
+
+        response = ReadYourWritesMiddleware(view)(None)
+        self.assertEqual(response.content, b'primary')
@@ -0,0 +1,188 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.test import override_settings
+from user_profile.models import Post
+from user_profile.models import StaffOrNamedUser
+
+from django_delayed_union import DelayedUnionQuerySet
+from django_delayed_union.shadow import ShadowRegistry
+from django_delayed_union.shadow import ShadowTable
+from django_delayed_union.shadow import registry
+
+from .factories import UserFactory
+
+
+def get_queryset():
+    return DelayedUnionQuerySet(
+        User.objects.filter(is_staff=True),
+        User.objects.filter(groups__name='members'),
+        User.objects.filter(posts__title='pinned'),
+    )
+
+
+class ShadowTableTests(TestCase):
+    def setUp(self):
+        super(ShadowTableTests, self).setUp()
+        self.registry = ShadowRegistry()
+        self.shadow_table = self.registry.register(ShadowTable(
+            'staff_or_named',
+            get_queryset,
+            StaffOrNamedUser,
+            dependencies={
+                Post: lambda post: [post.user_id],
+                Group: lambda group: None,
+            }
+        ))
+        self.addCleanup(self.registry.unregister, 'staff_or_named')
+        self.members = Group.objects.create(name='members')
+
+    def assertConsistent(self):
+        self.assertEqual(self.shadow_table.check(), (set(), set()))
+        self.assertEqual(set(self.shadow_table.all()), set(get_queryset()))
+
+    def test_save(self):
+        staff = UserFactory.create(is_staff=True)
+        UserFactory.create()
+        self.assertEqual(list(self.shadow_table.all()), [staff])
+        staff.is_staff = False
+        staff.save()
+        self.assertEqual(list(self.shadow_table.all()), [])
+
+    def test_delete(self):
+        staff = UserFactory.create(is_staff=True)
+        staff.delete()
+        self.assertFalse(StaffOrNamedUser.objects.exists())
+
+    def test_m2m(self):
+        user, other = UserFactory.create_batch(2)
+        user.groups.add(self.members)
+        self.members.user_set.add(other)
+        self.assertConsistent()
+        user.groups.remove(self.members)
+        self.assertConsistent()
+        self.members.user_set.clear()
+        self.assertEqual(list(self.shadow_table.all()), [])
+
+    def test_dependencies(self):
+        user = UserFactory.create()
+        post = Post.objects.create(user=user, title='pinned', created=datetime.datetime(2020, 1, 1))
+        self.assertEqual(list(self.shadow_table.all()), [user])
+        post.delete()
+        self.assertEqual(list(self.shadow_table.all()), [])
+
+    def test_dependency_rebuild(self):
+        user = UserFactory.create()
+        user.groups.add(self.members)
+        self.members.delete()
+        self.assertEqual(list(self.shadow_table.all()), [])
+
+    def test_check_and_rebuild(self):
+        staff = UserFactory.create(is_staff=True)
+        User.objects.filter(id=staff.id).update(is_staff=False)
+        other = UserFactory.create()
+        User.objects.filter(id=other.id).update(is_staff=True)
+        self.assertEqual(self.shadow_table.check(), ({other.id}, {staff.id}))
+        self.assertEqual(self.shadow_table.rebuild(), 1)
+        self.assertConsistent()
+
+    def test_refresh_ignores_concurrent_inserts(self):
+        staff = UserFactory.create(is_staff=True)
+        StaffOrNamedUser.objects.all().delete()
+        manager = self.shadow_table.get_manager()
+        bulk_create = manager.bulk_create
+
+        def concurrent_bulk_create(objs, **kwargs):
+            # Another process adds the row after it was read.
+            StaffOrNamedUser.objects.create(object_id=staff.id)
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(manager, 'bulk_create', concurrent_bulk_create), \
+                mock.patch.object(self.shadow_table, 'get_manager', return_value=manager):
+            self.shadow_table.refresh([staff.id])
+        self.assertConsistent()
+
+    def test_reads_from_shadow_table(self):
+        UserFactory.create(is_staff=True)
+        with self.assertNumQueries(1) as context:
+            list(self.shadow_table.all())
+        self.assertNotIn('UNION', context.captured_queries[0]['sql'])
+
+    def test_duplicate_name(self):
+        with self.assertRaises(ValueError):
+            self.registry.register(ShadowTable('staff_or_named', get_queryset, StaffOrNamedUser))
+
+
+class LaggingReplicaRouter(object):
+    """
+    Reads from the ``'other'`` database, which does not have the rows
+    written to ``'default'``.
+    """
+    def db_for_read(self, model, **hints):
+        return 'other'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+
+@override_settings(DATABASE_ROUTERS=[LaggingReplicaRouter()])
+class ShadowTableReplicaTests(TestCase):
+    databases = {'default', 'other'}
+
+    def setUp(self):
+        super(ShadowTableReplicaTests, self).setUp()
+        self.registry = ShadowRegistry()
+        self.shadow_table = self.registry.register(
+            ShadowTable('staff_or_named', get_queryset, StaffOrNamedUser)
+        )
+        self.addCleanup(self.registry.unregister, 'staff_or_named')
+
+    def test_refreshes_from_primary(self):
+        staff = UserFactory.create(is_staff=True)
+        self.assertEqual(
+            list(StaffOrNamedUser.objects.using('default').values_list('object_id', flat=True)),
+            [staff.id]
+        )
+        self.assertEqual(self.shadow_table.check(), (set(), set()))
+        staff.delete()
+        self.assertFalse(StaffOrNamedUser.objects.using('default').exists())
+
+    def test_rebuild_from_primary(self):
+        staff = UserFactory.create(is_staff=True)
+        StaffOrNamedUser.objects.using('default').delete()
+        self.assertEqual(self.shadow_table.rebuild(), 1)
+        self.assertEqual(self.shadow_table.get_shadow_pks(), {staff.id})
+
+
+class ShadowTablesCommandTests(TestCase):
+    def setUp(self):
+        super(ShadowTablesCommandTests, self).setUp()
+        self.shadow_table = registry.register(
+            ShadowTable('staff_or_named', get_queryset, StaffOrNamedUser)
+        )
+        self.addCleanup(registry.unregister, 'staff_or_named')
+        self.staff = UserFactory.create(is_staff=True)
+        StaffOrNamedUser.objects.all().delete()
+
+    def call_command(self, *args):
+        stdout = StringIO()
+        call_command('shadow_tables', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_check(self):
+        with self.assertRaises(CommandError):
+            self.call_command('--check')
+
+    def test_rebuild(self):
+        self.assertIn('1 rows', self.call_command('staff_or_named'))
+        self.assertIn('0 missing, 0 extra', self.call_command('--check'))
+
+    def test_unknown_name(self):
+        with self.assertRaises(CommandError):
+            self.call_command('unknown')
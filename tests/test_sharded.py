@@ -0,0 +1,451 @@
+import time
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.contrib.auth.models import Permission
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.db import connection
+from django.db.models import F
+from django.db.models.expressions import OrderBy
+from django.test import TestCase
+from django.test import TransactionTestCase
+
+from django_delayed_union.execution import StatementTimeout
+from django_delayed_union.execution import call_branch
+from django_delayed_union.sharded import DelayedShardedUnionQuerySet
+from django_delayed_union.sharded import MergedQuerySet
+from django_delayed_union.utils import BinaryOrder
+from django_delayed_union.utils import get_merge_ordering
+
+from .factories import UserFactory
+from .markers import skip_for_mysql
+from .mixins import DelayedQuerySetMetaTestsMixin
+from .test_union import DelayedUnionQuerySetTestsMixin
+
+#: A condition which takes far longer than the timeouts in the tests.
+SLOW_CONDITION = (
+    '(WITH RECURSIVE counter(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM counter '
+    'WHERE x < 100000000) SELECT COUNT(*) FROM counter) > 0'
+)
+
+
+def create_users(db, usernames):
+    users = []
+    for username in usernames:
+        user = UserFactory.build(username=username)
+        user.save(using=db)
+        users.append(user)
+    return users
+
+
+class DelayedShardedUnionQuerySetMetaTests(DelayedQuerySetMetaTestsMixin, TestCase):
+    def get_class(self):
+        return DelayedShardedUnionQuerySet
+
+    def test_accepts_parallel_as_kwarg(self):
+        qs = DelayedShardedUnionQuerySet(
+            User.objects.all(),
+            User.objects.all(),
+            parallel=True
+        )
+        self.assertTrue(qs._clone()._kwargs['parallel'])
+
+    def test_does_not_accept_other_kwargs(self):
+        with self.assertRaises(TypeError):
+            DelayedShardedUnionQuerySet(User.objects.all(), foo=42)
+
+
+class DelayedShardedUnionQuerySetSingleDatabaseTests(
+        DelayedUnionQuerySetTestsMixin,
+        TestCase):
+
+    def get_queryset(self):
+        return DelayedShardedUnionQuerySet(
+            User.objects.filter(id=self.user.id),
+            User.objects.all(),
+        )
+
+    def get_expected_models(self):
+        return [self.user]
+
+    def test_applies_union_on_single_database(self):
+        self.assertNotIsInstance(self.qs._apply(), MergedQuerySet)
+
+
+class DelayedShardedUnionQuerySetTests(TestCase):
+    databases = {'default', 'other'}
+
+    @classmethod
+    def setUpTestData(cls):
+        super(DelayedShardedUnionQuerySetTests, cls).setUpTestData()
+        cls.default_users = create_users('default', ['b', 'd', 'f'])
+        cls.other_users = create_users('other', ['a', 'c', 'e'])
+
+    def setUp(self):
+        super(DelayedShardedUnionQuerySetTests, self).setUp()
+        self.qs = DelayedShardedUnionQuerySet(
+            User.objects.using('default').all(),
+            User.objects.using('default').filter(username='b'),
+            User.objects.using('other').all(),
+        )
+
+    def get_usernames(self, qs):
+        return [user.username for user in qs]
+
+    def test_applies_merge_for_multiple_databases(self):
+        self.assertIsInstance(self.qs._apply(), MergedQuerySet)
+
+    def test_iter(self):
+        self.assertEqual(
+            sorted((u._state.db, u.username) for u in self.qs),
+            [
+                ('default', 'b'),
+                ('default', 'd'),
+                ('default', 'f'),
+                ('other', 'a'),
+                ('other', 'c'),
+                ('other', 'e'),
+            ]
+        )
+
+    def test_queries_each_database_once(self):
+        with self.assertNumQueries(1, using='default'), \
+                self.assertNumQueries(1, using='other'):
+            list(self.qs)
+
+    def test_order_by(self):
+        self.assertEqual(
+            self.get_usernames(self.qs.order_by('username')),
+            ['a', 'b', 'c', 'd', 'e', 'f']
+        )
+
+    def test_order_by_descending(self):
+        self.assertEqual(
+            self.get_usernames(self.qs.order_by('-username')),
+            ['f', 'e', 'd', 'c', 'b', 'a']
+        )
+
+    def test_reverse(self):
+        self.assertEqual(
+            self.get_usernames(self.qs.order_by('username').reverse()),
+            ['f', 'e', 'd', 'c', 'b', 'a']
+        )
+
+    def test_slice(self):
+        self.assertEqual(
+            self.get_usernames(self.qs.order_by('username')[1:4]),
+            ['b', 'c', 'd']
+        )
+
+    def test_slice_limits_each_database(self):
+        qs = self.qs.order_by('username')[:2]
+        for queryset in qs._get_querysets():
+            self.assertEqual(queryset.query.high_mark, 2)
+
+    def test_getitem(self):
+        self.assertEqual(self.qs.order_by('-username')[1].username, 'e')
+
+    def test_getitem_out_of_range(self):
+        with self.assertRaises(IndexError):
+            self.qs.order_by('username')[6]
+
+    def test_values_list(self):
+        self.assertEqual(
+            list(self.qs.order_by('username').values_list('username', flat=True)),
+            ['a', 'b', 'c', 'd', 'e', 'f']
+        )
+
+    def test_values(self):
+        self.assertEqual(
+            [row['username'] for row in self.qs.order_by('-username').values('username')],
+            ['f', 'e', 'd', 'c', 'b', 'a']
+        )
+
+    def test_count(self):
+        with self.assertNumQueries(1, using='default'), \
+                self.assertNumQueries(1, using='other'):
+            self.assertEqual(self.qs.count(), 6)
+
+    def test_count_after_slice(self):
+        self.assertEqual(self.qs.order_by('username')[4:].count(), 2)
+
+    def test_len(self):
+        self.assertEqual(len(self.qs), 6)
+
+    def test_union_all_keeps_duplicates_within_database(self):
+        qs = DelayedShardedUnionQuerySet(*self.qs._querysets, all=True)
+        self.assertEqual(qs.count(), 7)
+
+    def test_exists(self):
+        self.assertTrue(self.qs.exists())
+        self.assertFalse(self.qs.filter(username='z').exists())
+
+    def test_bool(self):
+        self.assertTrue(self.qs.filter(username='a'))
+        self.assertFalse(self.qs.filter(username='z'))
+
+    def test_first_and_last(self):
+        qs = self.qs.order_by('username')
+        self.assertEqual(qs.first().username, 'a')
+        self.assertEqual(qs.last().username, 'f')
+
+    def test_earliest_and_latest(self):
+        self.assertEqual(self.qs.earliest('username').username, 'a')
+        self.assertEqual(self.qs.latest('username').username, 'f')
+
+    def test_earliest_does_not_exist(self):
+        with self.assertRaises(User.DoesNotExist):
+            self.qs.filter(username='z').earliest('username')
+
+    def test_get(self):
+        user = self.qs.get(username='c')
+        self.assertEqual(user._state.db, 'other')
+
+    def test_repr(self):
+        self.assertEqual(
+            repr(self.qs.order_by('username').values_list('username', flat=True)),
+            "<MergedQuerySet ['a', 'b', 'c', 'd', 'e', 'f']>"
+        )
+
+    def test_prefetch_related(self):
+        group = Group(name='shard')
+        group.save(using='other')
+        self.other_users[0].groups.add(group)
+        users = list(self.qs.order_by('username').prefetch_related('groups'))
+        with self.assertNumQueries(0, using='default'), \
+                self.assertNumQueries(0, using='other'):
+            self.assertEqual(list(users[0].groups.all()), [group])
+            self.assertEqual(list(users[1].groups.all()), [])
+
+    def test_update(self):
+        self.assertEqual(self.qs.update(first_name='Rover'), 7)
+        self.assertEqual(
+            {user.first_name for user in self.qs},
+            {'Rover'}
+        )
+
+    def test_with_branch_label(self):
+        qs = self.qs.with_branch_label(labels=['all', 'b', 'other'])
+        self.assertEqual(
+            sorted((user.username, user.branch) for user in qs),
+            [
+                ('a', 'other'),
+                ('b', 'all'),
+                ('c', 'other'),
+                ('d', 'all'),
+                ('e', 'other'),
+                ('f', 'all'),
+            ]
+        )
+
+    def test_interleave(self):
+        users = self.qs.interleave(2, 'username', policy='round_robin')
+        self.assertEqual(
+            [(user._state.db, user.username) for user in users],
+            [
+                ('default', 'b'),
+                ('other', 'a'),
+                ('default', 'd'),
+                ('other', 'c'),
+            ]
+        )
+
+    def test_materialize_is_not_supported(self):
+        with self.assertRaises(NotImplementedError):
+            with self.qs.materialize():
+                pass
+
+    def test_select_for_update_is_not_supported(self):
+        with self.assertRaises(NotImplementedError):
+            self.qs.select_for_update()
+
+    def test_subquery_is_not_supported(self):
+        with self.assertRaises(NotImplementedError):
+            list(User.objects.filter(id__in=self.qs))
+
+    def test_stream(self):
+        chunks = list(self.qs.order_by('-username').stream('username', chunk_size=4))
+        self.assertEqual(
+            [row for rows in chunks for row in rows],
+            [('f',), ('e',), ('d',), ('c',), ('b',), ('a',)]
+        )
+        self.assertEqual([len(rows) for rows in chunks], [4, 2])
+
+    def test_stream_model_columns(self):
+        rows = [row for rows in self.qs.order_by('username').stream() for row in rows]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0][0], self.other_users[0].id)
+
+    def test_stream_columnar(self):
+        chunks = list(self.qs.order_by('username').stream('username', 'id', columnar=True))
+        usernames, ids = chunks[0]
+        self.assertEqual(usernames, ['a', 'b', 'c', 'd', 'e', 'f'])
+
+    def test_order_by_random_is_not_supported(self):
+        with self.assertRaises(ValueError):
+            list(self.qs.order_by('?'))
+
+    def test_select_related(self):
+        base_qs = Permission.objects.all()
+        qs = DelayedShardedUnionQuerySet(base_qs, base_qs.using('other'))
+        for permission in qs.select_related('content_type'):
+            with self.assertNumQueries(0, using='default'), \
+                    self.assertNumQueries(0, using='other'):
+                self.assertIsNotNone(permission.content_type.id)
+
+
+class DelayedShardedUnionQuerySetParallelTests(TransactionTestCase):
+    databases = {'default', 'other'}
+
+    def setUp(self):
+        super(DelayedShardedUnionQuerySetParallelTests, self).setUp()
+        create_users('default', ['b', 'd'])
+        create_users('other', ['a', 'c'])
+        self.qs = DelayedShardedUnionQuerySet(
+            User.objects.using('default').all(),
+            User.objects.using('other').all(),
+            parallel=True
+        )
+
+    def test_iter(self):
+        self.assertEqual(
+            [user.username for user in self.qs.order_by('username')],
+            ['a', 'b', 'c', 'd']
+        )
+
+    def test_count(self):
+        self.assertEqual(self.qs.count(), 4)
+
+    def test_update(self):
+        self.assertEqual(self.qs.update(first_name='Rover'), 4)
+
+    def test_dates(self):
+        self.assertEqual(len(self.qs.dates('date_joined', 'year')), 1)
+
+
+class MergeOrderingTests(TestCase):
+    databases = {'default', 'other'}
+
+    @classmethod
+    def setUpTestData(cls):
+        super(MergeOrderingTests, cls).setUpTestData()
+        for db, usernames in [('default', ['b', 'd']), ('other', ['a', 'c'])]:
+            for index, user in enumerate(create_users(db, usernames)):
+                if index:
+                    user.last_login = user.date_joined
+                    user.save(using=db)
+
+    def test_unchanged_on_sqlite(self):
+        self.assertEqual(
+            get_merge_ordering(User, ['-username', 'last_login', 'id'], 'sqlite'),
+            ['-username', 'last_login', 'id']
+        )
+
+    def test_text_is_ordered_by_code_point(self):
+        ordering = get_merge_ordering(User, ['-username', 'pk'], 'mysql')
+        self.assertIsInstance(ordering[0], OrderBy)
+        self.assertTrue(ordering[0].descending)
+        self.assertIsInstance(ordering[0].expression, BinaryOrder)
+        self.assertEqual(ordering[1], 'pk')
+
+    def test_nulls_are_placed_explicitly(self):
+        ascending, descending = get_merge_ordering(
+            User, ['last_login', '-last_login'], 'postgresql'
+        )
+        self.assertTrue(ascending.nulls_first)
+        self.assertTrue(descending.nulls_last)
+        self.assertEqual(get_merge_ordering(User, ['last_login'], 'mysql'), ['last_login'])
+
+    def test_binary_order_sql(self):
+        qs = User.objects.order_by(BinaryOrder(F('username')))
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            self.assertIn('COLLATE "C"', str(qs.query))
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            self.assertIn('AS BINARY)', str(qs.query))
+
+    def test_merge_with_explicit_nulls(self):
+        qs = DelayedShardedUnionQuerySet(
+            User.objects.using('default').all(),
+            User.objects.using('other').all(),
+        )
+        with mock.patch('django_delayed_union.utils.NULLS_LAST_VENDORS', ('sqlite',)):
+            users = list(qs.order_by('last_login', 'username'))
+            rows = list(qs.order_by('-last_login', 'username').values_list('username', 'last_login'))
+        self.assertEqual([user.username for user in users], ['a', 'b', 'd', 'c'])
+        self.assertFalse(any(
+            name.startswith('delayed_union') for user in users for name in vars(user)
+        ))
+        self.assertEqual([row[0] for row in rows], ['c', 'd', 'a', 'b'])
+        self.assertEqual(len(rows[0]), 2)
+
+
+@skip_for_mysql
+class DelayedShardedUnionQuerySetTimeoutTests(TestCase):
+    databases = {'default', 'other'}
+
+    @classmethod
+    def setUpTestData(cls):
+        super(DelayedShardedUnionQuerySetTimeoutTests, cls).setUpTestData()
+        create_users('default', ['b', 'd'])
+        create_users('other', ['a', 'c'])
+
+    def get_queryset(self, **kwargs):
+        return DelayedShardedUnionQuerySet(
+            User.objects.using('default').all(),
+            User.objects.using('other').extra(where=[SLOW_CONDITION]),
+            User.objects.using('default').filter(username='b'),
+            timeout=0.05,
+            **kwargs
+        )
+
+    def test_raises_without_partial_ok(self):
+        with self.assertRaises(StatementTimeout):
+            list(self.get_queryset())
+
+    def test_partial_results(self):
+        qs = self.get_queryset(partial_ok=True).order_by('username')
+        self.assertEqual([user.username for user in qs], ['b', 'd'])
+        self.assertEqual(qs.dropped_branches, (1,))
+
+    def test_partial_count(self):
+        qs = self.get_queryset(partial_ok=True)
+        self.assertEqual(qs.count(), 2)
+
+    def test_partial_slice(self):
+        page = self.get_queryset(partial_ok=True).order_by('username')[:1]
+        self.assertEqual([user.username for user in page], ['b'])
+        self.assertEqual(page.dropped_branches, (1,))
+
+    def test_finished_branches_are_not_dropped(self):
+        qs = DelayedShardedUnionQuerySet(
+            User.objects.using('default').all(),
+            User.objects.using('other').all(),
+            timeout=5,
+            partial_ok=True,
+        )
+        self.assertEqual(len(qs), 4)
+        self.assertEqual(qs.dropped_branches, ())
+
+    def test_single_database(self):
+        qs = DelayedShardedUnionQuerySet(
+            User.objects.using('other').extra(where=[SLOW_CONDITION]),
+            User.objects.using('other').all(),
+            timeout=0.05,
+            partial_ok=True,
+        )
+        self.assertEqual(list(qs), [])
+        self.assertEqual(qs.dropped_branches, (0, 1))
+
+    def test_other_errors_are_raised_with_partial_ok(self):
+        def fail():
+            time.sleep(0.1)
+            raise OperationalError('database is locked')
+
+        with self.assertRaisesMessage(OperationalError, 'database is locked') as context:
+            call_branch(fail, 'other', 0.05, True)
+        self.assertNotIsInstance(context.exception, StatementTimeout)
+
+    def test_connection_usable_after_timeout(self):
+        list(self.get_queryset(partial_ok=True))
+        self.assertEqual(User.objects.using('other').count(), 2)
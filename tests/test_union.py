@@ -1,10 +1,22 @@
+import pickle
+from functools import partial
+from unittest import mock
+
 from django.contrib.auth.models import Permission
 from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 
 from django_delayed_union import DelayedDifferenceQuerySet
 from django_delayed_union import DelayedIntersectionQuerySet
 from django_delayed_union import DelayedUnionQuerySet
+from django_delayed_union.execution import run_all
+from django_delayed_union.interleaving import merge_round_robin
+from django_delayed_union.interleaving import merge_weighted
+from django_delayed_union.sampling import allocate
+from django_delayed_union.sampling import sample_pks
 
 from .factories import UserFactory
 from .mixins import DelayedQuerySetMetaTestsMixin
@@ -65,11 +77,43 @@ class DelayedUnionQuerySetTestsMixin(DelayedQuerySetTestsMixin):
             with self.assertNumQueries(0):
                 self.assertIsNotNone(permission.content_type.id)
 
+    def test_dates_queries_each_component_queryset(self):
+        with self.assertNumQueries(len(self.qs._querysets)):
+            self.qs.dates('date_joined', 'day')
+
+    def test_count_approximate_sums_component_estimates(self):
+        with mock.patch('django_delayed_union.union.get_estimated_count', return_value=1000):
+            self.assertEqual(
+                self.qs.count(approximate=True),
+                1000 * len(self.qs._querysets)
+            )
+
+    def test_count_approximate_falls_back_to_exact_count(self):
+        with mock.patch('django_delayed_union.union.get_estimated_count', return_value=None):
+            self.assertEqual(self.qs.count(approximate=True), self.expected_count)
+
     def test_update(self):
         self.qs.update(first_name='Rover')
         for user in self.qs:
             self.assertEqual(user.first_name, 'Rover')
 
+    def test_select_for_update(self):
+        qs = self.qs.select_for_update()
+        self.assertTrue(qs.query.select_for_update)
+        self.assertEqual(
+            list(qs),
+            sorted(set(self.expected_models), key=lambda u: u.id)
+        )
+
+    def test_select_for_update_orders_by_pk(self):
+        qs = self.qs.order_by('-id').select_for_update()
+        self.assertEqual(qs.query.order_by, ('pk',))
+
+    def test_select_for_update_passes_through_kwargs(self):
+        qs = self.qs.select_for_update(skip_locked=True)
+        self.assertTrue(qs.query.select_for_update_skip_locked)
+        self.assertFalse(qs.query.select_for_update_nowait)
+
 
 class DelayedUnionQuerySetTests(DelayedUnionQuerySetTestsMixin, TestCase):
     def get_queryset(self):
@@ -82,6 +126,26 @@ class DelayedUnionQuerySetTests(DelayedUnionQuerySetTestsMixin, TestCase):
         return [self.user]
 
 
+class DelayedUnionQuerySetSelectForUpdateTests(TestCase):
+    def test_rechecks_rows_when_locking(self):
+        claimed, other = UserFactory.create_batch(2, is_staff=True)
+        qs = DelayedUnionQuerySet(
+            User.objects.filter(is_staff=True),
+            User.objects.filter(username='nobody'),
+        ).select_for_update(skip_locked=True)
+        User.objects.filter(id=claimed.id).update(is_staff=False)
+        self.assertEqual(list(qs), [other])
+
+    def test_does_not_inline_primary_keys(self):
+        UserFactory.create_batch(3, is_staff=True)
+        qs = DelayedUnionQuerySet(
+            User.objects.filter(is_staff=True),
+            User.objects.filter(username='nobody'),
+        ).select_for_update()
+        sql, params = qs.query.sql_with_params()
+        self.assertLess(len(params), 3)
+
+
 class DelayedUnionQuerySetMixedTests(
         DelayedUnionQuerySetTestsMixin,
         TestCase):
@@ -166,3 +230,300 @@ class DelayedUnionAllQuerySetTests(DelayedUnionQuerySetTestsMixin, TestCase):
     def test_get_with_duplicates(self):
         with self.assertRaises(User.MultipleObjectsReturned):
             self.qs.get(id=self.user_b.id)
+
+
+class DelayedUnionQuerySetBranchLabelTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(DelayedUnionQuerySetBranchLabelTests, cls).setUpTestData()
+        cls.user_a, cls.user_b, cls.user_c = UserFactory.create_batch(3)
+
+    def get_queryset(self, **kwargs):
+        return DelayedUnionQuerySet(
+            User.objects.filter(id__in=[self.user_a.id, self.user_b.id]),
+            User.objects.filter(id__in=[self.user_b.id, self.user_c.id]),
+            **kwargs
+        )
+
+    def get_labels(self, qs, name='branch'):
+        return sorted((user.id, getattr(user, name)) for user in qs)
+
+    def test_uses_first_label_for_duplicates(self):
+        qs = self.get_queryset().with_branch_label(
+            'matched_by',
+            labels=['tag', 'author']
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                self.get_labels(qs, 'matched_by'),
+                [
+                    (self.user_a.id, 'tag'),
+                    (self.user_b.id, 'tag'),
+                    (self.user_c.id, 'author'),
+                ]
+            )
+
+    def test_union_all_labels_each_row(self):
+        qs = self.get_queryset(all=True).with_branch_label()
+        self.assertEqual(
+            self.get_labels(qs),
+            [
+                (self.user_a.id, 0),
+                (self.user_b.id, 0),
+                (self.user_b.id, 1),
+                (self.user_c.id, 1),
+            ]
+        )
+
+    def test_label_is_preserved(self):
+        qs = self.get_queryset().with_branch_label()
+        qs = pickle.loads(pickle.dumps(qs.exclude(id=self.user_a.id).order_by('-id')))
+        self.assertEqual(
+            [(user.id, user.branch) for user in qs],
+            [(self.user_c.id, 1), (self.user_b.id, 0)]
+        )
+
+    def test_values_list(self):
+        qs = self.get_queryset().values_list('id').with_branch_label()
+        self.assertEqual(
+            sorted(qs),
+            [(self.user_a.id, 0), (self.user_b.id, 0), (self.user_c.id, 1)]
+        )
+
+    def test_count(self):
+        self.assertEqual(self.get_queryset().with_branch_label().count(), 3)
+
+    def test_filter_by_pk_in(self):
+        qs = User.objects.filter(pk__in=self.get_queryset().with_branch_label())
+        self.assertNotIn('password', str(qs.query).split('WHERE')[1])
+        self.assertEqual(
+            set(qs),
+            {self.user_a, self.user_b, self.user_c}
+        )
+
+    def test_wrong_number_of_labels(self):
+        with self.assertRaises(ValueError):
+            self.get_queryset().with_branch_label(labels=['tag'])
+
+
+class DelayedUnionQuerySetSampleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(DelayedUnionQuerySetSampleTests, cls).setUpTestData()
+        cls.users = UserFactory.create_batch(30)
+        cls.ids = [user.id for user in cls.users]
+
+    def get_queryset(self, **kwargs):
+        return DelayedUnionQuerySet(
+            User.objects.filter(id__in=self.ids[:20]),
+            User.objects.filter(id__in=self.ids[10:]),
+            **kwargs
+        )
+
+    def test_sample(self):
+        sample = self.get_queryset().sample(8)
+        self.assertEqual(len(sample), 8)
+        self.assertEqual(len(set(sample)), 8)
+        self.assertTrue(set(sample) <= set(self.users))
+
+    def test_sample_with_all(self):
+        sample = self.get_queryset(all=True).sample(8)
+        self.assertEqual(len(sample), 8)
+        self.assertTrue(set(sample) <= set(self.users))
+
+    def test_sample_more_than_count(self):
+        sample = self.get_queryset().sample(100)
+        self.assertEqual(sorted(sample, key=lambda u: u.id), self.users)
+
+    def test_sample_respects_filters(self):
+        sample = self.get_queryset().filter(id__in=self.ids[:3]).sample(2)
+        self.assertEqual(len(sample), 2)
+        self.assertTrue(set(sample) <= set(self.users[:3]))
+
+    def test_sample_empty(self):
+        self.assertEqual(self.get_queryset().filter(id=0).sample(5), [])
+
+    def test_sample_values(self):
+        sample = self.get_queryset().values_list('id', flat=True).sample(5)
+        self.assertEqual(len(sample), 5)
+        self.assertTrue(set(sample) <= set(self.ids))
+
+    def test_sample_counts_rows_after_exclusion(self):
+        calls = []
+
+        def record(queryset, k, count, low, high):
+            calls.append((count, queryset.count()))
+            return sample_pks(queryset, k, count, low, high)
+
+        with mock.patch('django_delayed_union.union.sample_pks', record):
+            self.assertEqual(len(self.get_queryset().sample(8)), 8)
+        self.assertEqual(len(calls), 2)
+        for count, actual in calls:
+            self.assertEqual(count, actual)
+
+    def test_sample_does_not_order_union_randomly(self):
+        with CaptureQueriesContext(connection) as context:
+            self.get_queryset().sample(5)
+        union_sql = [q['sql'] for q in context.captured_queries if 'UNION' in q['sql']]
+        self.assertEqual(len(union_sql), 1)
+        self.assertNotIn('RAND', union_sql[0].upper())
+
+
+class DelayedUnionQuerySetInterleaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(DelayedUnionQuerySetInterleaveTests, cls).setUpTestData()
+        for username in ['a1', 'a2', 'a3', 'a4', 'b1', 'b2', 'b3', 'c1']:
+            UserFactory.create(username=username)
+
+    def get_queryset(self, **kwargs):
+        return DelayedUnionQuerySet(
+            User.objects.filter(username__startswith='a'),
+            User.objects.filter(username__startswith='b'),
+            User.objects.filter(username__in=['a1', 'c1']),
+            **kwargs
+        )
+
+    def get_usernames(self, users):
+        return [user.username for user in users]
+
+    def test_ordered(self):
+        self.assertEqual(
+            self.get_usernames(self.get_queryset().interleave(2, '-username')),
+            ['c1', 'b3', 'b2', 'a4', 'a3', 'a1']
+        )
+
+    def test_round_robin(self):
+        self.assertEqual(
+            self.get_usernames(
+                self.get_queryset().interleave(3, 'username', policy='round_robin')
+            ),
+            ['a1', 'b1', 'a2', 'b2', 'c1', 'a3', 'b3']
+        )
+
+    def test_round_robin_with_all(self):
+        self.assertEqual(
+            self.get_usernames(
+                self.get_queryset(all=True).interleave(
+                    2,
+                    'username',
+                    policy='round_robin'
+                )
+            ),
+            ['a1', 'b1', 'a1', 'a2', 'b2', 'c1']
+        )
+
+    def test_weighted(self):
+        self.assertEqual(
+            self.get_usernames(
+                self.get_queryset(all=True).interleave(
+                    4,
+                    'username',
+                    policy='weighted',
+                    weights=[2, 1, 0]
+                )
+            ),
+            ['a1', 'b1', 'a2', 'a3', 'b2', 'a4', 'b3']
+        )
+
+    def test_weighted_requires_weights(self):
+        with self.assertRaises(ValueError):
+            self.get_queryset().interleave(2, policy='weighted', weights=[1])
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            self.get_queryset().interleave(2, policy='random')
+
+    def test_respects_filters(self):
+        qs = self.get_queryset().exclude(username='a1')
+        self.assertEqual(
+            self.get_usernames(qs.interleave(1, 'username')),
+            ['a2', 'b1', 'c1']
+        )
+
+    def test_values(self):
+        qs = self.get_queryset().values('username')
+        self.assertEqual(
+            qs.interleave(1, '-username', policy='round_robin'),
+            [{'username': 'a4'}, {'username': 'b3'}, {'username': 'c1'}]
+        )
+
+    def test_values_list(self):
+        qs = self.get_queryset().values_list('username', 'is_active')
+        self.assertEqual(
+            qs.interleave(1, 'username'),
+            [('a1', True), ('b1', True)]
+        )
+
+    def test_values_list_flat(self):
+        qs = self.get_queryset().values_list('username', flat=True)
+        self.assertEqual(qs.interleave(1, 'username'), ['a1', 'b1'])
+
+    def test_values_list_named(self):
+        qs = self.get_queryset().values_list('username', named=True)
+        rows = qs.interleave(1, 'username', policy='round_robin')
+        self.assertEqual([row.username for row in rows], ['a1', 'b1'])
+
+    def test_uses_single_query(self):
+        with self.assertNumQueries(1):
+            self.get_queryset().interleave(2, 'username')
+
+    def test_limits_each_component_queryset(self):
+        with CaptureQueriesContext(connection) as context:
+            self.get_queryset().interleave(2, 'username')
+        self.assertEqual(context.captured_queries[0]['sql'].count('LIMIT 2'), 3)
+
+
+class DelayedUnionQuerySetFreezeThreadTests(TransactionTestCase):
+    def test_evaluate_frozen_in_threads(self):
+        users = UserFactory.create_batch(4)
+        frozen = DelayedUnionQuerySet(
+            User.objects.filter(id__in=[user.id for user in users[:2]]),
+            User.objects.filter(id__in=[user.id for user in users[1:]]),
+        ).order_by('id').freeze()
+        results = run_all([partial(list, frozen)] * 8, parallel=True)
+        self.assertEqual(results, [users] * 8)
+
+
+class InterleavingTests(TestCase):
+    def test_merge_round_robin(self):
+        self.assertEqual(
+            list(merge_round_robin([[1, 2, 3], [], [4], [5, 6]])),
+            [1, 4, 5, 2, 6, 3]
+        )
+
+    def test_merge_weighted(self):
+        self.assertEqual(
+            list(merge_weighted([['a'] * 6, ['b'] * 6], [2, 1]))[:6],
+            ['a', 'b', 'a', 'a', 'b', 'a']
+        )
+
+    def test_merge_weighted_continues_after_branch_runs_out(self):
+        self.assertEqual(
+            list(merge_weighted([['a'], ['b', 'b', 'b']], [5, 1])),
+            ['a', 'b', 'b', 'b']
+        )
+
+
+class SamplingTests(TestCase):
+    def test_allocate(self):
+        self.assertEqual(allocate(10, [50, 30, 20]), [5, 3, 2])
+        self.assertEqual(allocate(2, [1, 1, 1]), [1, 1, 0])
+        self.assertEqual(allocate(10, [3, 0, 2]), [3, 0, 2])
+        self.assertEqual(allocate(5, [0, 0]), [0, 0])
+
+    def test_sample_pks_uses_primary_key_lookups(self):
+        users = UserFactory.create_batch(10)
+        ids = [user.id for user in users]
+        queryset = User.objects.filter(id__in=ids)
+        with CaptureQueriesContext(connection) as context:
+            pks = sample_pks(queryset, 3, 10, min(ids), max(ids))
+        self.assertEqual(len(set(pks)), 3)
+        self.assertTrue(set(pks) <= set(ids))
+        self.assertNotIn('RAND', context.captured_queries[0]['sql'].upper())
+
+    def test_sample_pks_falls_back_for_sparse_primary_keys(self):
+        users = UserFactory.create_batch(3)
+        queryset = User.objects.filter(id__in=[user.id for user in users])
+        pks = sample_pks(queryset, 2, 3, 1, 10 ** 9)
+        self.assertEqual(len(set(pks)), 2)
@@ -8,3 +8,17 @@ class UserProfile(models.Model):
         related_name='user_profile',
         on_delete=models.PROTECT
     )
+
+
+class Post(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='posts',
+        on_delete=models.CASCADE
+    )
+    title = models.CharField(max_length=100)
+    created = models.DateTimeField()
+
+
+class StaffOrNamedUser(models.Model):
+    object_id = models.IntegerField(unique=True)